@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
 from .forms import CustomUserCreationForm
-from .models import CustomUser
+from .models import CustomUser, PromotionCampaign
 
 
 class CustomUserAdmin(UserAdmin):
@@ -25,7 +25,14 @@ class CustomUserAdmin(UserAdmin):
     ordering = ('email',)
 
 
+class PromotionCampaignAdmin(admin.ModelAdmin):
+    """ Рекламные рассылки """
+    list_display = ('subject', 'sent', 'last_user_id', 'started_at', 'finished_at')
+    readonly_fields = ('last_user_id', 'sent', 'started_at', 'finished_at', 'created_at', 'updated_at')
+
+
 admin.site.register(CustomUser, CustomUserAdmin)
+admin.site.register(PromotionCampaign, PromotionCampaignAdmin)
 
 admin.site.site_title = 'Панель Админимтратора Отеля'
 admin.site.site_header = 'Панель Администратора Отеля'
@@ -0,0 +1,27 @@
+from rest_framework import authentication, exceptions
+
+from Account import tokens
+
+
+class BearerTokenAuthentication(authentication.BaseAuthentication):
+    """
+    Заголовок Authorization: Bearer <токен> (Account.tokens)
+    Токен проверяется HMAC и кэшем без хеширования пароля, в отличие от Basic-аутентификации
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Неверный заголовок Authorization')
+        try:
+            return tokens.authenticate_token(header[1].decode())
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Неверный заголовок Authorization')
+        except tokens.InvalidToken as e:
+            raise exceptions.AuthenticationFailed(e.message)
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,14 @@
+from django.contrib.auth import authenticate
+from rest_framework import serializers
+
+
+class TokenIssueSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    password = serializers.CharField(trim_whitespace=False, write_only=True)
+
+    def validate(self, data):
+        user = authenticate(self.context.get('request'), email=data['email'], password=data['password'])
+        if user is None:
+            raise serializers.ValidationError(detail={'message': 'Неверная почта или пароль'})
+        data['user'] = user
+        return data
@@ -1 +1,7 @@
+from django.urls import path
 
+from Account.api.views import TokenView
+
+urlpatterns = [
+    path('token', TokenView.as_view(), name='api_token'),
+]
@@ -0,0 +1,35 @@
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from Account import tokens
+from Account.api.authentication import BearerTokenAuthentication
+from Account.api.serializers import TokenIssueSerializer
+
+
+class TokenView(generics.GenericAPIView):
+    """
+    Выдача токена API (POST) {email, password} - пароль проверяется один раз, дальше запросы идут
+    с заголовком Authorization: Bearer <токен>
+    Отзыв токена, с которым пришел запрос (DELETE), ?all=1 - всех токенов пользователя
+    """
+    serializer_class = TokenIssueSerializer
+    authentication_classes = [BearerTokenAuthentication]
+
+    def get_permissions(self):
+        if self.request.method == 'DELETE':
+            return [IsAuthenticated()]
+        return super().get_permissions()
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token, api_token = tokens.issue_token(serializer.validated_data['user'])
+        return Response(data={'token': token, 'expires_at': api_token.expires_at}, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, *args, **kwargs):
+        if request.query_params.get('all'):
+            tokens.revoke_user_tokens(request.user)
+        else:
+            tokens.revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
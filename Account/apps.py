@@ -5,3 +5,5 @@ class AccountConfig(AppConfig):
     name = 'Account'
     verbose_name = "Учетные записи"
 
+    def ready(self):
+        from Account import signals  # noqa: F401
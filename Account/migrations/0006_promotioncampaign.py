@@ -0,0 +1,31 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Account', '0005_alter_customuser_first_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromotionCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('subject', models.CharField(max_length=255, verbose_name='Тема')),
+                ('body', models.TextField(verbose_name='Текст')),
+                ('last_user_id', models.BigIntegerField(default=0, verbose_name='Последний получатель')),
+                ('sent', models.PositiveIntegerField(default=0, verbose_name='Отправлено писем')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начало отправки')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Окончание отправки')),
+            ],
+            options={
+                'verbose_name': 'Рекламная рассылка',
+                'verbose_name_plural': 'Рекламные рассылки',
+            },
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -63,3 +66,56 @@ class CustomUser(AbstractUser, TimeStampedModel):
     class Meta:
         verbose_name_plural = 'Пользователи'
         verbose_name = 'Пользователь'
+        # Триграммные индексы под поиск админки (icontains - UPPER(поле) LIKE UPPER('%текст%'))
+        indexes = [GinIndex(OpClass(Upper(field), name='gin_trgm_ops'), name=f'customuser_{field}_trgm_idx')
+                   for field in ('email', 'first_name', 'last_name')]
+
+
+class PromotionCampaign(TimeStampedModel):
+    """
+    Рекламная рассылка. last_user_id - курсор по id пользователей: после сбоя рассылка продолжается с него
+    """
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст')
+    last_user_id = models.BigIntegerField(default=0, verbose_name='Последний получатель')
+    sent = models.PositiveIntegerField(default=0, verbose_name='Отправлено писем')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начало отправки')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Окончание отправки')
+
+    def __str__(self):
+        return f'{self.subject} ({self.created_at:%d.%m.%Y})'
+
+    def get_duration(self) -> float:
+        """ Длительность отправки в секундах, для незавершенной рассылки - до текущего момента """
+        if not self.started_at:
+            return 0.0
+        return ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+
+    def get_throughput(self) -> float:
+        """ Средняя скорость отправки, писем в секунду """
+        if not self.started_at:
+            return 0.0
+        seconds = self.get_duration()
+        return self.sent / seconds if seconds > 0 else float(self.sent)
+
+    class Meta:
+        verbose_name_plural = 'Рекламные рассылки'
+        verbose_name = 'Рекламная рассылка'
+
+
+class ApiToken(TimeStampedModel):
+    """
+    Выданный токен доступа к API (Account.tokens). Клиенту отдается подписанный ключ, отзыв токена -
+    удаление записи
+    """
+    key = models.CharField(max_length=64, unique=True, verbose_name='Ключ')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='api_tokens',
+                             verbose_name='Пользователь')
+    expires_at = models.DateTimeField(verbose_name='Действует до')
+
+    def __str__(self):
+        return f'{self.user} до {self.expires_at:%d.%m.%Y %H:%M}'
+
+    class Meta:
+        verbose_name_plural = 'Токены API'
+        verbose_name = 'Токен API'
@@ -0,0 +1,55 @@
+import logging
+import time
+from typing import Dict
+
+from django.conf import settings
+from django.core.mail import get_connection, send_mass_mail
+from django.utils import timezone
+
+from Account.models import CustomUser, PromotionCampaign
+
+logger = logging.getLogger(__name__)
+
+
+def send_chunk(campaign: PromotionCampaign, chunk_size: int = None, rate_limit: float = None) -> bool:
+    """
+    Отправить следующую пачку писем кампании через одно SMTP-соединение
+    Получатели выбираются по ключу (id > курсора) без загрузки всех пользователей в память.
+    Курсор сохраняется после успешной отправки пачки. rate_limit - не больше писем в секунду (0 - без ограничения).
+    Возвращает True, если получатели закончились
+    """
+    chunk_size = chunk_size or settings.PROMOTION_CHUNK_SIZE
+    rate_limit = settings.PROMOTION_RATE_LIMIT if rate_limit is None else rate_limit
+    recipients = list(CustomUser.objects.filter(is_active=True, pk__gt=campaign.last_user_id)
+                      .order_by('pk').values_list('pk', 'email')[:chunk_size])
+    if not recipients:
+        _finish(campaign)
+        return True
+    if campaign.started_at is None:
+        campaign.started_at = timezone.now()
+    started = time.monotonic()
+    sent = send_mass_mail(((campaign.subject, campaign.body, settings.EMAIL_HOST_USER, [email])
+                           for _, email in recipients), fail_silently=False, connection=get_connection())
+    campaign.last_user_id = recipients[-1][0]
+    campaign.sent += sent
+    campaign.save(update_fields=['last_user_id', 'sent', 'started_at', 'updated_at'])
+    if rate_limit:
+        time.sleep(max(0.0, len(recipients) / rate_limit - (time.monotonic() - started)))
+    if len(recipients) < chunk_size:
+        _finish(campaign)
+        return True
+    return False
+
+
+def _finish(campaign: PromotionCampaign):
+    campaign.finished_at = timezone.now()
+    campaign.save(update_fields=['finished_at', 'updated_at'])
+
+
+def get_report(campaign: PromotionCampaign) -> Dict[str, float]:
+    """ Итоги рассылки: отправлено писем, длительность и скорость """
+    report = {'sent': campaign.sent, 'seconds': round(campaign.get_duration(), 3),
+              'per_second': round(campaign.get_throughput(), 2)}
+    logger.info('Рассылка %s: отправлено %s писем за %s с (%s писем/с)', campaign.pk, report['sent'],
+                report['seconds'], report['per_second'])
+    return report
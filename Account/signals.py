@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from Account.models import CustomUser
+from Account.tokens import revoke_user_tokens
+
+
+@receiver(post_save, sender=CustomUser)
+def password_changed(sender, instance, created, **kwargs):
+    """ Смена или сброс пароля отзывает все токены API пользователя (set_password сохраняет пароль до save) """
+    if not created and instance._password is not None:
+        revoke_user_tokens(instance)
@@ -1,16 +1,32 @@
-from django.core.mail import send_mail
-
 from celery import shared_task
+from django.conf import settings
 
-from Account.models import CustomUser
-from settings import config
+from Account import promotion
+from Account.models import PromotionCampaign
 
 
 @shared_task
 def send_promotion():
-    """ Рассылка рекламных писем всем зарегистрированным пользователям """
-    users = CustomUser.objects.all()
-    email_theme = 'Рекламное письмо'
-    email_text = 'Посетите наш сайт'
-    for user in users:
-        send_mail(email_theme, email_text, config.EMAIL_HOST_USER, [str(user.email)], fail_silently=False)
+    """ Рассылка рекламных писем всем активным пользователям: создает кампанию и запускает отправку пачками """
+    campaign = PromotionCampaign.objects.create(subject='Рекламное письмо', body='Посетите наш сайт')
+    send_promotion_chunk.delay(campaign.pk)
+    return campaign.pk
+
+
+@shared_task(bind=True, max_retries=5)
+def send_promotion_chunk(self, campaign_id):
+    """
+    Отправить очередную пачку писем кампании и поставить в очередь следующую
+    Каждая пачка - отдельная задача, поэтому рассылка не упирается в CELERY_TASK_TIME_LIMIT.
+    При ошибке SMTP пачка повторяется с экспоненциальной задержкой с сохраненного курсора
+    """
+    campaign = PromotionCampaign.objects.get(pk=campaign_id)
+    if campaign.finished_at:
+        return promotion.get_report(campaign)
+    try:
+        finished = promotion.send_chunk(campaign)
+    except OSError as e:
+        raise self.retry(exc=e, countdown=settings.PROMOTION_RETRY_DELAY * 2 ** self.request.retries)
+    if finished:
+        return promotion.get_report(campaign)
+    send_promotion_chunk.delay(campaign_id)
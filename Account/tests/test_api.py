@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from Account.models import ApiToken, CustomUser
+
+
+class TokenApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                        first_name='Иван', last_name='Иванов')
+
+    def issue(self, password='Some_password123'):
+        return self.client.post(reverse('api_token'), data={'email': 'test@test.ru', 'password': password})
+
+    def get_reserves(self, token):
+        return self.client.get(reverse('api_all_reserves'), HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_issue(self):
+        """ Токен выдается по почте и паролю, неверный пароль - 400 """
+        resp = self.issue()
+        self.assertEqual(resp.status_code, 201)
+        self.assertTrue(resp.data['token'])
+        self.assertEqual(ApiToken.objects.get().user, self.user)
+        self.assertEqual(self.issue('wrong_password').status_code, 400)
+
+    def test_authenticate_without_password_check(self):
+        """ Запрос с токеном не проверяет пароль: пользователь с токеном - один запрос (плюс версия и выборка броней) """
+        token = self.issue().data['token']
+        with mock.patch.object(CustomUser, 'check_password', side_effect=AssertionError):
+            with self.assertNumQueries(3):
+                resp = self.get_reserves(token)
+            self.assertEqual(resp.status_code, 200)
+
+    def test_invalid(self):
+        """ Подделанный, истекший и токен неактивного пользователя не принимаются """
+        token = self.issue().data['token']
+        self.assertEqual(self.get_reserves(token[:-1] + ('A' if token[-1] != 'A' else 'B')).status_code, 403)
+        with override_settings(API_TOKEN_TTL=-1):
+            self.assertEqual(self.get_reserves(token).status_code, 403)
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get_reserves(token).status_code, 403)
+
+    def test_revoke(self):
+        """ Отозванный токен перестает действовать сразу, ?all=1 отзывает все токены пользователя """
+        first, second = self.issue().data['token'], self.issue().data['token']
+        resp = self.client.delete(reverse('api_token'), HTTP_AUTHORIZATION=f'Bearer {first}')
+        self.assertEqual(resp.status_code, 204)
+        self.assertEqual(self.get_reserves(first).status_code, 403)
+        self.assertEqual(self.get_reserves(second).status_code, 200)
+        self.client.delete(reverse('api_token') + '?all=1', HTTP_AUTHORIZATION=f'Bearer {second}')
+        self.assertEqual(self.get_reserves(second).status_code, 403)
+        self.assertFalse(ApiToken.objects.exists())
+        self.assertEqual(self.client.delete(reverse('api_token')).status_code, 401)
+
+    def test_revoke_on_password_change(self):
+        """ Смена и сброс пароля отзывают все токены пользователя, вход по сессии токены не трогает """
+        token = self.issue().data['token']
+        self.client.login(email='test@test.ru', password='Some_password123')
+        self.client.logout()
+        self.assertEqual(self.get_reserves(token).status_code, 200)
+        self.client.login(email='test@test.ru', password='Some_password123')
+        resp = self.client.post(reverse('password_change'), data={
+            'old_password': 'Some_password123', 'new_password1': 'NewPassword456', 'new_password2': 'NewPassword456'})
+        self.assertRedirects(resp, reverse('password_change_done'))
+        self.client.logout()
+        self.assertEqual(self.get_reserves(token).status_code, 403)
+        self.assertFalse(ApiToken.objects.exists())
+
+        # Сброс пароля (SetPasswordForm) - тот же set_password и save
+        token = self.issue('NewPassword456').data['token']
+        self.user.refresh_from_db()
+        self.user.set_password('Some_password123')
+        self.user.save()
+        self.assertEqual(self.get_reserves(token).status_code, 403)
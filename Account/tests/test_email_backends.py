@@ -0,0 +1,106 @@
+import asyncore
+import smtpd
+import threading
+import warnings
+
+from django.core.mail import EmailMessage, get_connection
+from django.test import SimpleTestCase, override_settings
+
+from settings import email_backends
+
+
+class RecordingSMTPServer(smtpd.SMTPServer):
+    """ Локальный SMTP-сервер: запоминает полученные письма и число открытых сессий """
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), None, decode_data=True)
+        self.port = self.socket.getsockname()[1]
+        self.sessions = 0
+        self.messages = []
+
+    def handle_accepted(self, conn, addr):
+        self.sessions += 1
+        super().handle_accepted(conn, addr)
+
+    def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+        self.messages.append((rcpttos, data))
+
+
+@override_settings(EMAIL_POOL_SIZE=2, EMAIL_POOL_IDLE_TIMEOUT=60, EMAIL_BATCH_WINDOW=0)
+class PooledEmailBackendTest(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            cls.server = RecordingSMTPServer()
+        cls.thread = threading.Thread(target=asyncore.loop, kwargs={'timeout': 0.05}, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+        cls.thread.join(timeout=2)
+        super().tearDownClass()
+
+    def setUp(self):
+        email_backends.reset_pools()
+        self.server.sessions = 0
+        self.server.messages.clear()
+        self.addCleanup(email_backends.reset_pools)
+
+    def get_backend(self):
+        return get_connection('settings.email_backends.PooledEmailBackend', host='127.0.0.1',
+                              port=self.server.port, username='', password='', use_tls=False, use_ssl=False)
+
+    def send(self, number):
+        message = EmailMessage('Тема', 'Текст', 'hotel@test.ru', [f'test{number}@test.ru'],
+                               connection=self.get_backend())
+        return message.send()
+
+    def get_stats(self):
+        return email_backends.get_stats()[('127.0.0.1', self.server.port, '', False, False)]
+
+    def test_connection_reused(self):
+        """ Письма, отправленные разными вызовами, идут через одно соединение из пула """
+        for i in range(5):
+            self.assertEqual(self.send(i), 1)
+        self.assertEqual(len(self.server.messages), 5)
+        self.assertEqual(self.server.sessions, 1)
+        stats = self.get_stats()
+        self.assertEqual((stats['sent'], stats['connections'], stats['sessions'], stats['idle']), (5, 1, 5, 1))
+        self.assertGreater(stats['latency_avg'], 0)
+
+    def test_reconnect(self):
+        """ Разорванное соединение из пула заменяется новым, письмо отправляется повторно """
+        self.send(0)
+        pool, _ = email_backends.get_pool(('127.0.0.1', self.server.port, '', False, False))
+        pool._idle[0][0].close()
+        self.assertEqual(self.send(1), 1)
+        self.assertEqual([rcpttos for rcpttos, _ in self.server.messages], [['test0@test.ru'], ['test1@test.ru']])
+        stats = self.get_stats()
+        self.assertEqual((stats['sent'], stats['reconnects'], stats['connections']), (2, 1, 1))
+
+    def test_connection_error(self):
+        """ Недоступный сервер: ошибка пробрасывается, при fail_silently письмо не считается отправленным """
+        backend = get_connection('settings.email_backends.PooledEmailBackend', host='127.0.0.1', port=1,
+                                 username='', password='', use_tls=False, use_ssl=False, fail_silently=True)
+        self.assertEqual(backend.send_messages([EmailMessage('Тема', 'Текст', 'hotel@test.ru', ['a@test.ru'])]), 0)
+        backend.fail_silently = False
+        with self.assertRaises(OSError):
+            backend.send_messages([EmailMessage('Тема', 'Текст', 'hotel@test.ru', ['a@test.ru'])])
+
+    @override_settings(EMAIL_BATCH_WINDOW=0.2)
+    def test_batch_window(self):
+        """ Письма потоков, отправленные в пределах окна, уходят в одной SMTP-сессии """
+        results = []
+        threads = [threading.Thread(target=lambda i=i: results.append(self.send(i))) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [1] * 4)
+        self.assertEqual(len(self.server.messages), 4)
+        stats = self.get_stats()
+        self.assertEqual((stats['sent'], stats['sessions'], stats['connections']), (4, 1, 1))
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
 
 from Account.models import CustomUser
@@ -14,3 +15,12 @@ class CustomUserModelTest(TestCase):
     def test_object_name(self):
         user = CustomUser.objects.get(email='test@test.ru')
         self.assertEquals(user.__str__(), 'Иванов Иван')
+
+    def test_admin_search_uses_trigram_index(self):
+        """ Поиск админки по подстроке (icontains) может идти по триграммному индексу """
+        queryset = CustomUser.objects.filter(last_name__icontains='ванов')
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        self.assertIn('customuser_last_name_trgm_idx', plan)
+        self.assertEqual(list(queryset.values_list('email', flat=True)), ['test@test.ru'])
@@ -0,0 +1,61 @@
+import smtplib
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from Account import promotion
+from Account.models import PromotionCampaign
+from Account.tasks import send_promotion, send_promotion_chunk
+
+
+def run_now(campaign_id):
+    return send_promotion_chunk.apply(args=(campaign_id,))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', PROMOTION_CHUNK_SIZE=4,
+                   PROMOTION_RATE_LIMIT=0)
+@mock.patch('Account.tasks.send_promotion_chunk.delay', side_effect=run_now)
+class SendPromotionTaskTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        get_user_model().objects.bulk_create(
+            get_user_model()(email=f'test{i}@test.ru', first_name='Иван', last_name='Иванов', is_active=i != 3)
+            for i in range(10))
+
+    def test_all_active_users_in_chunks(self, delay):
+        """ Письма получают все активные пользователи по одному разу, каждая пачка - отдельная задача """
+        with mock.patch('Account.promotion.get_connection', wraps=promotion.get_connection) as get_connection:
+            send_promotion.apply()
+        campaign = PromotionCampaign.objects.get()
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         sorted(f'test{i}@test.ru' for i in range(10) if i != 3))
+        self.assertEqual(campaign.sent, 9)
+        self.assertIsNotNone(campaign.finished_at)
+        self.assertEqual(get_connection.call_count, 3)
+
+    def test_resume_from_cursor(self, delay):
+        """ После сбоя SMTP рассылка продолжается с сохраненного курсора без повторных писем """
+        campaign = PromotionCampaign.objects.create(subject='Рекламное письмо', body='Посетите наш сайт')
+        self.assertFalse(promotion.send_chunk(campaign))
+        with mock.patch('Account.promotion.send_mass_mail', side_effect=smtplib.SMTPServerDisconnected):
+            with self.assertRaises(smtplib.SMTPServerDisconnected):
+                promotion.send_chunk(campaign)
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.sent, 4)
+        run_now(campaign.pk)
+        self.assertEqual(len(mail.outbox), 9)
+        self.assertEqual(len({message.to[0] for message in mail.outbox}), 9)
+        campaign.refresh_from_db()
+        report = promotion.get_report(campaign)
+        self.assertEqual(report['sent'], 9)
+        self.assertGreater(report['per_second'], 0)
+
+    def test_rate_limit(self, delay):
+        """ Пачка не отправляется быстрее PROMOTION_RATE_LIMIT писем в секунду """
+        campaign = PromotionCampaign.objects.create(subject='Рекламное письмо', body='Посетите наш сайт')
+        with mock.patch('Account.promotion.time.sleep') as sleep:
+            promotion.send_chunk(campaign, chunk_size=4, rate_limit=2)
+        self.assertAlmostEqual(sleep.call_args[0][0], 2, delta=0.5)
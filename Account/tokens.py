@@ -0,0 +1,62 @@
+import datetime
+import secrets
+from typing import Tuple
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from Account.models import ApiToken, CustomUser
+
+TOKEN_SALT = 'Account.tokens.api'
+
+_signer = signing.TimestampSigner(salt=TOKEN_SALT)
+
+
+class InvalidToken(Exception):
+    """ Токен не подписан этим сервером, истек или отозван, message - сообщение для клиента """
+    message = 'Недействительный токен'
+
+    def __init__(self, message: str = None):
+        self.message = message or self.message
+        super().__init__(self.message)
+
+
+def get_token_ttl() -> int:
+    return getattr(settings, 'API_TOKEN_TTL', 60 * 60 * 24 * 30)
+
+
+def issue_token(user: CustomUser) -> Tuple[str, ApiToken]:
+    """ Выдать пользователю токен: подписанный ключ для клиента и запись для отзыва """
+    ttl = get_token_ttl()
+    api_token = ApiToken.objects.create(key=secrets.token_urlsafe(32), user=user,
+                                        expires_at=timezone.now() + datetime.timedelta(seconds=ttl))
+    return _signer.sign(api_token.key), api_token
+
+
+def revoke_token(key: str) -> bool:
+    return ApiToken.objects.filter(key=key).delete()[0] > 0
+
+
+def revoke_user_tokens(user: CustomUser) -> int:
+    """ Отозвать все токены пользователя, вызывается и при смене пароля (Account.signals) """
+    return user.api_tokens.all().delete()[0]
+
+
+def authenticate_token(token: str) -> Tuple[CustomUser, str]:
+    """
+    Пользователь и ключ по токену. Подпись и срок проверяются HMAC без обращения к БД, затем один запрос
+    по уникальному ключу выбирает пользователя, только если токен не отозван и не истек. Пароль не проверяется
+    """
+    try:
+        key = _signer.unsign(token, max_age=get_token_ttl())
+    except signing.SignatureExpired:
+        raise InvalidToken('Срок действия токена истек')
+    except signing.BadSignature:
+        raise InvalidToken()
+    user = CustomUser.objects.filter(api_tokens__key=key, api_tokens__expires_at__gt=timezone.now()).first()
+    if user is None:
+        raise InvalidToken()
+    if not user.is_active:
+        raise InvalidToken('Пользователь неактивен или удален')
+    return user, key
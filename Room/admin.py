@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from Room.models import Hotel, Room, Gallery, Reserve, TypeRoom, Review, Regulations
+from Room.models import Hotel, Room, Gallery, Reserve, TypeRoom, Review, Regulations, BookingHold, OutboxMessage
 
 
 class HotelAdmin(admin.ModelAdmin):
@@ -15,8 +15,15 @@ class ReviewAdmin(admin.ModelAdmin):
     list_display = ('room', 'reserve', 'author', 'rating', 'body', 'pub_date')
     list_display_links = ('room',)
     list_filter = ('room',)
+    search_fields = ('body',)
     readonly_fields = ('created_at', 'updated_at')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Полнотекстовый поиск по индексу GIN вместо body ILIKE '%...%'
+        if not search_term.strip():
+            return queryset, False
+        return queryset.search(search_term), False
+
 
 class GalleryInLine(admin.StackedInline):
     model = Gallery
@@ -33,6 +40,15 @@ class RoomAdmin(admin.ModelAdmin):
 
     inlines = [GalleryInLine]
 
+    def get_search_results(self, request, queryset, search_term):
+        # Точный номер комнаты по уникальному индексу вместо UPPER(number::text) LIKE '%...%'
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if not search_term.isdigit():
+            return queryset.none(), False
+        return queryset.filter(number=int(search_term)), False
+
 
 class TypeRoomAdmin(admin.ModelAdmin):
     """ Типы комнат"""
@@ -57,6 +73,22 @@ class ReserveAdmin(admin.ModelAdmin):
     readonly_fields = ('reg_date', 'created_at', 'updated_at')
 
 
+class BookingHoldAdmin(admin.ModelAdmin):
+    """ Удержания комнат """
+    list_display = ('id', 'room', 'client', 'day_in', 'day_out', 'expires_at')
+    list_display_links = ('id',)
+    list_filter = ('room',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """ Исходящие письма """
+    list_display = ('id', 'recipient', 'subject', 'attempts', 'next_attempt_at', 'sent_at')
+    list_display_links = ('id',)
+    list_filter = ('sent_at',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
 class RegulationsAdmin(admin.ModelAdmin):
     """ Правила комнат """
     list_display = ('type_room', 'regulation',)
@@ -66,6 +98,8 @@ class RegulationsAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Reserve, ReserveAdmin)
+admin.site.register(BookingHold, BookingHoldAdmin)
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
 admin.site.register(Hotel, HotelAdmin)
 admin.site.register(Regulations, RegulationsAdmin)
 admin.site.register(Room, RoomAdmin)
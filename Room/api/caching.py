@@ -0,0 +1,71 @@
+import datetime
+import hashlib
+from typing import Optional
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers, quote_etag
+from django.utils.http import http_date
+
+
+def make_etag(*parts) -> str:
+    """ ETag из составляющих версии ресурса """
+    return hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def not_modified(request, etag: str, last_modified: Optional[datetime.datetime]):
+    """ Ответ 304 (или 412), если версия у клиента совпадает с текущей, иначе None """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=quote_etag(etag), last_modified=timestamp)
+
+
+def set_validators(response, etag: str, last_modified: Optional[datetime.datetime], max_age: int = 0):
+    """ Проставить ETag, Last-Modified и Cache-Control ответа """
+    response['ETag'] = quote_etag(etag)
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, max_age=max_age)
+    return response
+
+
+def latest(*dates: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    """ Самое позднее из времен изменения составляющих ресурса """
+    return max(filter(None, dates), default=None)
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET для представлений Django и DRF: версия ресурса (get_version) считается дешевым
+    запросом MAX(updated_at)/COUNT до основной выборки, при совпадении версии у клиента - 304 без сериализации
+    get_version() возвращает словарь составляющих версии, 'updated' - время последнего изменения (Last-Modified),
+    None - ресурс не найден, ответ формируется как обычно
+    """
+    cache_max_age = 0
+    # Ответ зависит от пользователя (шапка HTML-страниц, личные данные): пользователь входит в ETag
+    vary_on_user = False
+
+    def get_version(self) -> Optional[dict]:
+        raise NotImplementedError
+
+    def get_etag(self, version: dict) -> str:
+        parts = [type(self).__name__, self.request.get_full_path(), *version.values()]
+        if self.vary_on_user:
+            user = self.request.user
+            parts += [user.pk, getattr(user, 'updated_at', None)]
+        return make_etag(*parts)
+
+    def conditional_response(self, request, render):
+        version = self.get_version()
+        if version is None:
+            return render()
+        etag, updated = self.get_etag(version), version.get('updated')
+        cached = not_modified(request, etag, updated)
+        if cached is not None:
+            return set_validators(cached, etag, updated, self.cache_max_age)
+        resp = render()
+        if resp.status_code == 200:
+            set_validators(resp, etag, updated, self.cache_max_age)
+            if self.vary_on_user:
+                patch_vary_headers(resp, ('Cookie', 'Authorization'))
+        return resp
+
+    def get(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: super(ConditionalGetMixin, self).get(request, *args, **kwargs))
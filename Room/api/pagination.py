@@ -0,0 +1,59 @@
+from collections import OrderedDict
+
+from django.core.paginator import InvalidPage
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from Room.pagination import ROOM_ORDERINGS, KeysetPaginator, order_rooms
+
+
+class RoomCursorPagination(pagination.BasePagination):
+    """
+    Пагинация списков комнат по курсору (?cursor=&ordering=&page_size=)
+    Размер страницы ограничен max_page_size, поэтому список комнат никогда не отдается целиком
+    """
+    page_size = 6
+    max_page_size = 50
+    default_ordering = 'number'
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params.get('page_size', self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = request.query_params.get('ordering')
+        queryset, fields = order_rooms(queryset, ordering if ordering in ROOM_ORDERINGS else self.default_ordering)
+        try:
+            self.page = KeysetPaginator(queryset, fields, self.get_page_size(request)).page(
+                request.query_params.get('cursor'))
+        except InvalidPage as e:
+            raise NotFound(str(e))
+        return self.page.object_list
+
+    def get_link(self, cursor: str):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), 'cursor', cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_link(self.page.next_cursor)),
+            ('previous', self.get_link(self.page.previous_cursor)),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,18 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него ответы рендерит стандартный JSONRenderer
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson (если установлен), в несколько раз быстрее json на больших списках
+    Даты, Decimal и прочие типы кодируются тем же JSONEncoder DRF, поэтому ответ совпадает с JSONRenderer
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_PASSTHROUGH_DATETIME)
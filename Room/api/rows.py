@@ -0,0 +1,110 @@
+import operator
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from django.db.models import QuerySet
+
+from Room.api.serializers import AllReservesSerializer, AllRoomSerializer, GallerySerializer
+from Room.models import Gallery
+from Room.reference import get_hotel, get_type
+
+# Поле ответа: столбцы .values(), нужные полю, и функция строка -> значение
+Accessor = Tuple[Tuple[str, ...], Callable[[dict], object]]
+
+
+def column(name: str) -> Accessor:
+    return (name,), operator.itemgetter(name)
+
+
+def date_column(name: str) -> Accessor:
+    def get(row):
+        value = row[name]
+        return value.isoformat() if value is not None else None
+    return (name,), get
+
+
+class ValuesSerializer:
+    """
+    Сериализация списков только для чтения: строки .values() превращаются в словари заранее подготовленными
+    функциями полей, без экземпляров моделей и полей DRF. Схема ответа совпадает с serializer_class,
+    включая ?fields=/?expand= (SparseFieldsMixin)
+    """
+    serializer_class = None
+    # Столбцы, которые нужны не ответу, а выборке (ключи пагинации)
+    extra_columns = ()
+
+    def __init__(self, request=None):
+        self.request = request
+        accessors = self.get_accessors()
+        names = set(self.serializer_class.Meta.fields)
+        if request is not None and hasattr(self.serializer_class, 'requested_fields'):
+            names = self.serializer_class.requested_fields(request)
+        fields = [name for name in self.serializer_class.Meta.fields if name in names]
+        self.accessors = [(name, accessors[name][1]) for name in fields]
+        self.columns = list(dict.fromkeys([column_name for name in fields for column_name in accessors[name][0]]
+                                          + list(self.extra_columns)))
+
+    def get_accessors(self) -> Dict[str, Accessor]:
+        raise NotImplementedError
+
+    def values(self, queryset: QuerySet) -> QuerySet:
+        return queryset.values(*self.columns)
+
+    def to_representation(self, rows: Iterable[dict]) -> List[dict]:
+        accessors = self.accessors
+        return [{name: get(row) for name, get in accessors} for row in rows]
+
+    def file_url(self, field) -> Callable[[str], str]:
+        """ Ссылка на файл, как у FileField DRF: абсолютная, если есть запрос """
+        storage, request = field.storage, self.request
+
+        def get(name):
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+        return get
+
+
+class RoomRows(ValuesSerializer):
+    """ Строки AllRoomSerializer """
+    serializer_class = AllRoomSerializer
+    extra_columns = ('number', 'rating_avg')
+
+    def get_accessors(self) -> Dict[str, Accessor]:
+        return {
+            'number': column('number'),
+            'hotel': column('hotel'),
+            'hotel_name': (('hotel',), lambda row: getattr(get_hotel(row['hotel']), 'name', None)),
+            'type': column('type'),
+            'type_name': (('type',), lambda row: getattr(get_type(row['type']), 'nomination', None)),
+            'price': column('price'),
+            'number_of_guests': column('number_of_guests'),
+            'average_rating': column('rating_avg'),
+            'gallery': self.gallery(),
+            'next_free_date': date_column('next_free_date'),
+        }
+
+    def gallery(self) -> Accessor:
+        photos = [(name, f'photos_of_room__{name}', self.file_url(Gallery._meta.get_field(name)))
+                  for name in GallerySerializer.Meta.fields]
+
+        def get(row):
+            if row['photos_of_room__id'] is None:
+                return None
+            return {name: url(row[key]) for name, key, url in photos}
+        return ('photos_of_room__id', *(key for _, key, _ in photos)), get
+
+
+class ReserveRows(ValuesSerializer):
+    """ Строки AllReservesSerializer """
+    serializer_class = AllReservesSerializer
+
+    def get_accessors(self) -> Dict[str, Accessor]:
+        return {
+            'id': column('id'),
+            'room': column('room'),
+            'day_in': date_column('day_in'),
+            'day_out': date_column('day_out'),
+            'number_of_guests': column('number_of_guests'),
+            'review': column('review'),
+        }
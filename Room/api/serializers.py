@@ -1,6 +1,44 @@
+from typing import Set
+
 from rest_framework import serializers
 
 from Room.models import Room, Gallery, Regulations, Review, Reserve
+from Room.services import MAX_GROUP_ROOMS
+
+# Сколько комнат можно запросить одним запросом /api/rooms
+MAX_BATCH_ROOMS = 100
+
+
+def parse_names(value: str) -> Set[str]:
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Разреженные наборы полей по параметрам запроса:
+    ?fields=number,price - только перечисленные поля, ?expand=gallery - из вложенных объектов (expandable_fields)
+    только перечисленные, пустой ?expand= - без вложенных объектов. Без параметров - все поля
+    Представления выбирают связанные данные по requested_fields(), чтобы не загружать ненужное
+    """
+    expandable_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None:
+            requested = self.requested_fields(request)
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+    @classmethod
+    def requested_fields(cls, request) -> Set[str]:
+        names = set(cls.Meta.fields)
+        params = getattr(request, 'query_params', request.GET)
+        if params.get('fields'):
+            names &= parse_names(params['fields'])
+        if 'expand' in params:
+            names -= set(cls.expandable_fields) - parse_names(params['expand'])
+        return names
 
 
 class GallerySerializer(serializers.ModelSerializer):
@@ -15,31 +53,50 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = ['rating', 'body', 'author', 'reserve', 'pub_date']
 
 
+class ReviewSearchSerializer(serializers.ModelSerializer):
+    room = serializers.ReadOnlyField(source='room.number')
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ['id', 'room', 'rating', 'body', 'pub_date', 'rank']
+
+
 class RegulationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Regulations
         fields = ['id', 'regulation']
 
 
-class RoomDetailSerializer(serializers.ModelSerializer):
+class RoomDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     gallery = GallerySerializer(source="photos_of_room")
+    # Справочные данные читаются из кэша справочников (Room.reference), без запросов к БД
+    hotel_name = serializers.CharField(source='get_hotel_info.name', read_only=True, allow_null=True)
+    type_name = serializers.CharField(source='get_type_info.nomination', read_only=True, allow_null=True)
     regulations = RegulationSerializer(many=True, source="get_regulations_list")
     reviews = ReviewSerializer(many=True, source='get_review_list')
     average_rating = serializers.ReadOnlyField(source='get_average_rating')
+    expandable_fields = ('gallery', 'regulations', 'reviews')
 
     class Meta:
         model = Room
-        fields = ['number', 'hotel', 'type', 'price', 'number_of_guests', 'average_rating', 'gallery', 'regulations',
-                  'reviews']
+        fields = ['number', 'hotel', 'hotel_name', 'type', 'type_name', 'price', 'number_of_guests', 'average_rating',
+                  'gallery', 'regulations', 'reviews']
 
 
-class AllRoomSerializer(serializers.ModelSerializer):
+class AllRoomSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     gallery = GallerySerializer(source="photos_of_room")
+    hotel_name = serializers.CharField(source='get_hotel_info.name', read_only=True, allow_null=True)
+    type_name = serializers.CharField(source='get_type_info.nomination', read_only=True, allow_null=True)
     average_rating = serializers.ReadOnlyField(source='get_average_rating')
+    # Есть только в выборках Room.objects.with_next_free_date()
+    next_free_date = serializers.DateField(read_only=True)
+    expandable_fields = ('gallery',)
 
     class Meta:
         model = Room
-        fields = ['number', 'hotel', 'type', 'price', 'number_of_guests', 'average_rating', 'gallery']
+        fields = ['number', 'hotel', 'hotel_name', 'type', 'type_name', 'price', 'number_of_guests', 'average_rating',
+                  'gallery', 'next_free_date']
 
 
 class AllReservesSerializer(serializers.ModelSerializer):
@@ -64,3 +121,22 @@ class AddReviewSerializer(serializers.ModelSerializer):
         if not body:
             raise serializers.ValidationError(detail={'body': 'Пустое поле'})
         return data
+
+
+class BookingSerializer(serializers.Serializer):
+    day_in = serializers.DateField()
+    day_out = serializers.DateField()
+    number_of_guests = serializers.IntegerField(min_value=1)
+
+    def validate(self, data):
+        if data['day_in'] >= data['day_out']:
+            raise serializers.ValidationError(detail={'day_out': 'Дата выезда должна быть позже даты заезда'})
+        return data
+
+
+class GroupBookingSerializer(BookingSerializer):
+    rooms = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=MAX_GROUP_ROOMS)
+
+
+class RoomNumbersSerializer(serializers.Serializer):
+    numbers = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=MAX_BATCH_ROOMS)
@@ -1,12 +1,19 @@
 from django.urls import path
 
-from Room.api.views import AllRoomsView, DetailRoomView, AllReservesView, CancelView, AddReviewView, ListFreeRoomsView
+from Room.api.views import AllRoomsView, DetailRoomView, AllReservesView, CancelView, AddReviewView, ListFreeRoomsView, \
+    RoomCalendarView, HotelCalendarView, BookRoomView, GroupBookView, ReviewSearchView, RoomBatchView
 
 urlpatterns = [
     path('all_rooms', AllRoomsView.as_view(), name='api_all_rooms'),
     path('room/<int:number>', DetailRoomView.as_view(), name='api_detail_room'),
+    path('rooms', RoomBatchView.as_view(), name='api_rooms'),
+    path('room/<int:number>/book', BookRoomView.as_view(), name='api_book_room'),
+    path('room/<int:number>/calendar', RoomCalendarView.as_view(), name='api_room_calendar'),
+    path('group_book', GroupBookView.as_view(), name='api_group_book'),
+    path('calendar', HotelCalendarView.as_view(), name='api_calendar'),
     path('all_reserves', AllReservesView.as_view(), name='api_all_reserves'),
     path('list_free_rooms', ListFreeRoomsView.as_view(), name='api_list_free_rooms'),
     path('cancel/<int:pk>', CancelView.as_view(), name='api_cancel'),
     path('add_review/<int:pk>', AddReviewView.as_view(), name='api_add_review'),
+    path('reviews/search', ReviewSearchView.as_view(), name='api_review_search'),
 ]
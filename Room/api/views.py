@@ -1,113 +1,285 @@
-from django.http import Http404
-from rest_framework import generics, response, status
+import datetime
+from typing import Optional
+
+from django.db.models import Count, Max
+from rest_framework import generics, response, status, views
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 
-from Room import utils
-from Room.api.serializers import AllRoomSerializer, RoomDetailSerializer, AllReservesSerializer, AddReviewSerializer
+from Room import availability, services, utils
+from Room.api.caching import ConditionalGetMixin, latest, make_etag, not_modified, set_validators
+from Room.api.pagination import RoomCursorPagination
+from Room.api.renderers import FastJSONRenderer
+from Room.api.rows import ReserveRows, RoomRows
+from Room.api.serializers import AllRoomSerializer, RoomDetailSerializer, AllReservesSerializer, AddReviewSerializer, \
+    BookingSerializer, GroupBookingSerializer, ReviewSearchSerializer, RoomNumbersSerializer
+from Room.mixins import CachedObjectMixin
 from Room.models import Room, Reserve, Review
+from Room.reference import get_reference_version
 from Room.utils import calculate_refund_amount
 
 
-class AllRoomsView(generics.ListAPIView):
+class AllRoomsView(ConditionalGetMixin, generics.ListAPIView):
     """
-    Перечень всех комнат (GET)
+    Перечень всех комнат (GET) постранично ?cursor=&ordering=number|price|rating&page_size=
+    Набор полей ?fields=number,price&expand=gallery (AllRoomSerializer), неизмененная страница - 304 по ETag
     """
     serializer_class = AllRoomSerializer
-    queryset = Room.objects.all()
+    pagination_class = RoomCursorPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get_queryset(self):
+        # Галерея и ближайшая свободная дата выбираются, только если запрошены
+        fields = self.get_serializer_class().requested_fields(self.request)
+        rooms = Room.objects.all()
+        if 'gallery' in fields:
+            rooms = rooms.with_gallery()
+        if 'next_free_date' in fields:
+            rooms = rooms.with_next_free_date()
+        return rooms
+
+    def list(self, request, *args, **kwargs):
+        # Только чтение: строки .values() вместо экземпляров Room и AllRoomSerializer, схема ответа та же
+        rows = RoomRows(request)
+        page = self.paginate_queryset(rows.values(self.get_queryset()))
+        return self.get_paginated_response(rows.to_representation(page))
+
+    def get_version(self) -> dict:
+        today = datetime.date.today()
+        version = Room.objects.aggregate(updated=Max('updated_at'), count=Count('id'),
+                                         photos_updated=Max('photos_of_room__updated_at'))
+        # Ближайшая свободная дата зависит только от текущих и будущих резервов
+        version.update(Reserve.objects.filter(day_out__gt=today).aggregate(
+            reserves_updated=Max('updated_at'), reserves=Count('id')))
+        version.update(reference=get_reference_version(), today=today,
+                       updated=latest(version['updated'], version['photos_updated'], version['reserves_updated']))
+        return version
 
 
-class DetailRoomView(generics.RetrieveAPIView):
+class DetailRoomView(ConditionalGetMixin, generics.RetrieveAPIView):
     """
     Получить комнату по номеру (GET)
+    Набор полей ?fields=&expand=gallery,regulations,reviews (RoomDetailSerializer), неизмененная комната - 304
     """
     serializer_class = RoomDetailSerializer
 
     def get_object(self):
-        return get_object_or_404(Room, number=self.kwargs["number"])
+        # Отзывы загружаются сериализатором, только если запрошены
+        rooms = Room.objects.all()
+        if 'gallery' in self.get_serializer_class().requested_fields(self.request):
+            rooms = rooms.with_gallery()
+        return get_object_or_404(rooms, number=self.kwargs["number"])
+
+    def get_version(self) -> Optional[dict]:
+        version = Room.objects.filter(number=self.kwargs['number']).values(
+            'updated_at', 'photos_of_room__updated_at').annotate(
+            reviews_updated=Max('review__updated_at'), reviews=Count('review')).first()
+        if version is None:
+            return None
+        version.update(reference=get_reference_version(),
+                       updated=latest(version['updated_at'], version['photos_of_room__updated_at'],
+                                      version['reviews_updated']))
+        return version
+
+
+class RoomBatchView(generics.GenericAPIView):
+    """
+    Несколько комнат по номерам одним запросом: GET ?numbers=101,102 или POST {numbers: [...]} для длинных списков
+    Не больше MAX_BATCH_ROOMS номеров. Комнаты в порядке номеров запроса, ненайденные номера - в missing
+    Набор полей ?fields=&expand= как у /api/room/<number>
+    """
+    serializer_class = RoomDetailSerializer
+
+    def get_queryset(self):
+        # Галерея - в той же выборке, отзывы - одним запросом на все комнаты, правила - из кэша справочников
+        fields = self.get_serializer_class().requested_fields(self.request)
+        rooms = Room.objects.all()
+        if 'gallery' in fields:
+            rooms = rooms.with_gallery()
+        if 'reviews' in fields:
+            rooms = rooms.with_reviews()
+        return rooms
+
+    def get(self, request, *args, **kwargs):
+        numbers = [number.strip() for number in request.query_params.get('numbers', '').split(',') if number.strip()]
+        return self.get_rooms(numbers)
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, dict):
+            return Response(data={'message': 'Ожидается объект {numbers: [...]}'}, status=status.HTTP_400_BAD_REQUEST)
+        return self.get_rooms(request.data.get('numbers'))
+
+    def get_rooms(self, numbers):
+        serializer = RoomNumbersSerializer(data={'numbers': numbers})
+        serializer.is_valid(raise_exception=True)
+        numbers = list(dict.fromkeys(serializer.validated_data['numbers']))
+        rooms = {room.number: room for room in self.get_queryset().filter(number__in=numbers)}
+        return Response(data={
+            'rooms': self.get_serializer([rooms[number] for number in numbers if number in rooms], many=True).data,
+            'missing': [number for number in numbers if number not in rooms],
+        })
 
 
-class AllReservesView(generics.ListAPIView):
+class AllReservesView(ConditionalGetMixin, generics.ListAPIView):
     """
     Перечень всех броней пользователя (GET)
+    Неизмененный перечень - 304 по ETag/Last-Modified
     """
     serializer_class = AllReservesSerializer
     permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    vary_on_user = True
 
     def get_queryset(self):
         return Reserve.objects.filter(client=self.request.user).order_by('-id').select_related('review')
 
+    def list(self, request, *args, **kwargs):
+        # Только чтение: строки .values() вместо экземпляров Reserve и AllReservesSerializer, схема ответа та же
+        rows = ReserveRows(request)
+        return Response(rows.to_representation(rows.values(self.get_queryset())))
+
+    def get_version(self) -> dict:
+        return Reserve.objects.filter(client=self.request.user).aggregate(
+            updated=Max('updated_at'), count=Count('id'), reviews=Count('review'))
+
+
+class BookRoomView(generics.GenericAPIView):
+    """
+    Бронирование комнаты (POST) {day_in, day_out, number_of_guests}
+    Занятая комната или комната, которую в этот момент бронирует другой гость - 409
+    """
+    serializer_class = BookingSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        room = get_object_or_404(Room, number=self.kwargs['number'])
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            reserve = services.book_room(request.user, room, **serializer.validated_data)
+        except (services.RoomBusy, services.ClientBusy, services.RoomLocked) as e:
+            return Response(data={'message': e.message}, status=status.HTTP_409_CONFLICT)
+        except services.BookingError as e:
+            return Response(data={'message': e.message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data=AllReservesSerializer(reserve).data, status=status.HTTP_201_CREATED)
+
+
+class GroupBookView(generics.GenericAPIView):
+    """
+    Групповое бронирование (POST) {rooms: [номера], day_in, day_out, number_of_guests}
+    Бронируются все комнаты или ни одной, подтверждение приходит одним письмом
+    """
+    serializer_class = GroupBookingSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            reserves = services.book_rooms(request.user, data['rooms'], data['day_in'], data['day_out'],
+                                           data['number_of_guests'])
+        except (services.RoomBusy, services.RoomLocked) as e:
+            return Response(data={'message': e.message}, status=status.HTTP_409_CONFLICT)
+        except services.BookingError as e:
+            return Response(data={'message': e.message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data=AllReservesSerializer(reserves, many=True).data, status=status.HTTP_201_CREATED)
+
 
-class CancelView(generics.RetrieveDestroyAPIView):
+class CancelView(CachedObjectMixin, generics.RetrieveDestroyAPIView):
     """
     Получение информации по отмене брони (GET)
     Отмена брони (DEL)
     """
-    queryset = Reserve.objects.all()
     lookup_field = 'pk'
 
-    def get_object(self):
-        reserve = Reserve.objects.select_related('client', 'room').get(pk=self.kwargs.get("pk"))
-        if not reserve.client == self.request.user:
-            raise Http404
-        return reserve
+    def get_queryset(self):
+        return Reserve.objects.select_related('room').filter(client_id=self.request.user.pk)
 
     def delete(self, request, *args, **kwargs):
         super().delete(request, *args, **kwargs)
         return response.Response(data={'message': f'Успешно удалено'}, status=status.HTTP_204_NO_CONTENT)
 
     def get(self, request, *args, **kwargs):
-        cancel_data = calculate_refund_amount(self.get_object())
+        reserve = self.get_object()
+        cancel_data = calculate_refund_amount(reserve)
         if cancel_data['delay']:
             return response.Response(data={'message': f'За отмену брони деньги вам не вернутся'})
         else:
             return response.Response(data={
-                'message': f"""Вам вернется стоимость за {cancel_data['days']} дней с {self.get_object().day_in} по {self.get_object().day_out} в размере {cancel_data['cost']} рублей."""})
+                'message': f"""Вам вернется стоимость за {cancel_data['days']} дней с {reserve.day_in} по {reserve.day_out} в размере {cancel_data['cost']} рублей."""})
 
 
-class AddReviewView(generics.CreateAPIView):
+class AddReviewView(CachedObjectMixin, generics.CreateAPIView):
     """
     Добавление отзыва (POST)
     """
     serializer_class = AddReviewSerializer
+    lookup_field = 'pk'
 
-    def get_object(self):
-        reserve = get_object_or_404(Reserve, pk=self.kwargs["pk"])
-        if not reserve.client == self.request.user:
-            raise Http404
-        if len(Review.objects.filter(reserve=reserve)) > 0:
-            raise Http404
-        return reserve
+    def get_queryset(self):
+        # Свой резерв, к которому еще нет отзыва
+        return Reserve.objects.select_related('room').filter(client_id=self.request.user.pk, review__isnull=True)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        Review.objects.create(room=self.get_object().room,
+        reserve = self.get_object()
+        Review.objects.create(room=reserve.room,
                               rating=serializer.data['rating'],
                               body=serializer.data['body'],
                               author=self.request.user,
-                              reserve=self.get_object())
+                              reserve=reserve)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+class ReviewSearchView(generics.ListAPIView):
+    """
+    Полнотекстовый поиск по отзывам (GET) ?q=&limit= - отзывы, упорядоченные по релевантности
+    Запрос в синтаксисе веб-поиска: слова, "фраза", -исключение, or
+    """
+    serializer_class = ReviewSearchSerializer
+    default_limit = 20
+    max_limit = 50
+
+    def get_limit(self) -> int:
+        try:
+            limit = int(self.request.GET.get('limit', self.default_limit))
+        except ValueError:
+            return self.default_limit
+        return min(max(limit, 1), self.max_limit)
+
+    def get_queryset(self):
+        return Review.objects.search(self.request.GET['q']).select_related('room')[:self.get_limit()]
+
+    def get(self, request, *args, **kwargs):
+        if not request.GET.get('q', '').strip():
+            return response.Response(data={'q': 'Пустое поле'}, status=status.HTTP_400_BAD_REQUEST)
+        return super().get(request, *args, **kwargs)
+
+
 class ListFreeRoomsView(generics.ListAPIView):
+    """
+    Свободные комнаты на даты (GET) ?day_in=&day_out=&number_of_guests= постранично ?cursor=&ordering=&page_size=
+    Гибкие даты (GET) ?nights=&earliest_day_in=&latest_day_out=&number_of_guests= - номера свободных комнат
+    для каждого периода из nights ночей между earliest_day_in и latest_day_out (windows) и данные этих комнат
+    со стоимостью проживания по номеру (rooms)
+    """
     serializer_class = AllRoomSerializer
+    pagination_class = RoomCursorPagination
+    max_flexible_days = 62
 
     def get_queryset(self):
-        free_rooms_list = Room.objects.select_related('type').filter(
-            number_of_guests__gte=int(self.request.GET['number_of_guests'][0]))
-        free_rooms_number_list = []
-        for room in free_rooms_list:
-            if utils.check_availability(room, utils.convert_str_to_date(self.request.GET['day_in']),
-                                        utils.convert_str_to_date(self.request.GET['day_out'])):
-                free_rooms_number_list.append(room.number)
-        if utils.check_dates_of_user(self.request.user,
-                                     utils.convert_str_to_date(self.request.GET['day_in']),
-                                     utils.convert_str_to_date(self.request.GET['day_out'])):
-            return Room.objects.select_related('type').filter(number__in=free_rooms_number_list).order_by('number')
+        return availability.search_free_rooms(utils.convert_str_to_date(self.request.GET['day_in']),
+                                              utils.convert_str_to_date(self.request.GET['day_out']),
+                                              int(self.request.GET['number_of_guests'][0]),
+                                              user=self.request.user)
 
     def get(self, request, *args, **kwargs):
+        if 'nights' in request.GET:
+            return self.get_flexible(request)
         if 'day_in' not in request.GET:
             return response.Response(data={'day_in': 'Пустое поле'})
         if 'day_out' not in request.GET:
@@ -115,3 +287,97 @@ class ListFreeRoomsView(generics.ListAPIView):
         if 'number_of_guests' not in request.GET:
             return response.Response(data={'number_of_guests': 'Пустое поле'})
         return super().get(request, *args, **kwargs)
+
+    def get_flexible(self, request):
+        for field in ('nights', 'earliest_day_in', 'latest_day_out', 'number_of_guests'):
+            if not request.GET.get(field):
+                return response.Response(data={field: 'Пустое поле'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            nights = int(request.GET['nights'])
+            number_of_guests = int(request.GET['number_of_guests'])
+            earliest_day_in = utils.convert_str_to_date(request.GET['earliest_day_in'])
+            latest_day_out = utils.convert_str_to_date(request.GET['latest_day_out'])
+            days = utils.get_number_of_days(earliest_day_in, latest_day_out)
+        except (TypeError, ValueError):
+            return response.Response(data={'message': 'Неверный формат параметров'},
+                                     status=status.HTTP_400_BAD_REQUEST)
+        if nights < 1 or days < nights or days > self.max_flexible_days:
+            return response.Response(
+                data={'message': f'Период должен вмещать nights ночей и быть не длиннее {self.max_flexible_days} дней'},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        windows = availability.get_free_rooms_by_window(earliest_day_in, latest_day_out, nights, number_of_guests,
+                                                        user=request.user)
+        # Комната сериализуется один раз: в периодах - только номера, размер ответа - периоды + комнаты
+        rooms = {}
+        data = []
+        for day_in, day_out, free_rooms in windows:
+            for room in free_rooms:
+                if room.number not in rooms:
+                    rooms[room.number] = dict(self.get_serializer(room).data, full_price=room.get_full_price(nights))
+            data.append({'day_in': day_in, 'day_out': day_out, 'rooms': [room.number for room in free_rooms]})
+        return response.Response(data={'windows': data, 'rooms': rooms})
+
+
+class RoomCalendarView(views.APIView):
+    """
+    Календарь занятости комнаты на месяц (GET)
+    ?month=ГГГГ-ММ (по умолчанию текущий месяц); для каждой комнаты - список 0/1 по дням, 1 - ночь занята
+    """
+    cache_max_age = 60
+
+    def get_room(self):
+        return get_object_or_404(Room, number=self.kwargs["number"])
+
+    def get_rooms(self, room):
+        return [room]
+
+    def get_version(self, room, reserves) -> dict:
+        return reserves.aggregate(updated=Max('updated_at'), count=Count('id'))
+
+    def get(self, request, *args, **kwargs):
+        month = request.GET.get('month') or datetime.date.today().strftime('%Y-%m')
+        try:
+            first_day, next_month = utils.get_month_bounds(month)
+        except ValueError:
+            return response.Response(data={'month': 'Ожидается месяц в формате ГГГГ-ММ'},
+                                     status=status.HTTP_400_BAD_REQUEST)
+        room = self.get_room()
+        reserves = Reserve.objects.overlapping(first_day, next_month)
+        if room is not None:
+            reserves = reserves.filter(room=room)
+        version = self.get_version(room, reserves)
+        etag = make_etag('calendar', month, room.number if room else '*', *version.values())
+        cached = not_modified(request, etag, version['updated'])
+        if cached is not None:
+            return set_validators(cached, etag, version['updated'], self.cache_max_age)
+
+        days = (next_month - first_day).days
+        masks = availability.get_occupancy(first_day, next_month, room)
+        data = {
+            'month': month,
+            'days': [first_day + datetime.timedelta(days=day) for day in range(days)],
+            'rooms': {str(item.number): availability.unpack_occupancy(masks.get(item.pk, 0), days)
+                      for item in self.get_rooms(room)},
+        }
+        return set_validators(response.Response(data=data), etag, version['updated'], self.cache_max_age)
+
+
+class HotelCalendarView(RoomCalendarView):
+    """
+    Календарь занятости всех комнат отеля на месяц (GET)
+    ?month=ГГГГ-ММ (по умолчанию текущий месяц)
+    """
+
+    def get_room(self):
+        return None
+
+    def get_rooms(self, room):
+        return Room.objects.only('pk', 'number').order_by('number')
+
+    def get_version(self, room, reserves) -> dict:
+        version = super().get_version(room, reserves)
+        rooms = Room.objects.aggregate(rooms_updated=Max('updated_at'), rooms_count=Count('id'))
+        version['updated'] = latest(version['updated'], rooms['rooms_updated'])
+        version.update(rooms)
+        return version
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RoomConfig(AppConfig):
     name = 'Room'
     verbose_name = 'Комнаты'
+
+    def ready(self):
+        from Room import signals  # noqa: F401
@@ -0,0 +1,181 @@
+import datetime
+import functools
+import operator
+import time
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, QuerySet
+
+from Account.models import CustomUser
+from Room.availability_index import availability_index, get_availability_version
+from Room.models import BookingHold, Reserve, Room, RoomNight
+
+
+def index_enabled() -> bool:
+    """ Отвечать ли на вопросы о пересечениях из локального индекса занятости вместо БД """
+    return getattr(settings, 'ROOM_AVAILABILITY_INDEX', False)
+
+
+def user_has_overlap(user: CustomUser, day_in: datetime.date, day_out: datetime.date) -> bool:
+    """ Есть ли у пользователя резерв, пересекающийся с указанными датами """
+    if index_enabled():
+        return availability_index.client_is_busy(user.pk, day_in, day_out)
+    return Reserve.objects.filter(client=user).overlapping(day_in, day_out).exists()
+
+
+def room_is_free(room: Room, day_in: datetime.date, day_out: datetime.date) -> bool:
+    """ Свободна ли комната на указанные даты """
+    if index_enabled():
+        return not availability_index.room_is_busy(room.pk, day_in, day_out)
+    return not RoomNight.objects.filter(room=room).in_window(day_in, day_out).exists()
+
+
+def exclude_held(rooms: QuerySet, day_in: datetime.date, day_out: datetime.date,
+                 user: CustomUser = None) -> QuerySet:
+    """ Исключить комнаты, удерживаемые на эти даты другими клиентами (NOT EXISTS в том же запросе) """
+    holds = BookingHold.objects.active().filter(room=OuterRef('pk')).overlapping(day_in, day_out)
+    if user is not None and user.is_authenticated:
+        holds = holds.exclude(client=user)
+    return rooms.filter(~Exists(holds))
+
+
+def get_free_rooms(day_in: datetime.date, day_out: datetime.date, number_of_guests: int,
+                   user: CustomUser = None, holds: bool = True) -> QuerySet:
+    """
+    Свободные на указанные даты комнаты одним запросом (NOT EXISTS по занятым ночам комнаты)
+    Если передан пользователь и у него есть резерв на эти даты - список пуст
+    С включенным индексом занятости занятые комнаты и конфликт пользователя берутся из индекса.
+    holds=False - не учитывать удержания комнат
+    """
+    rooms = Room.objects.with_gallery().filter(number_of_guests__gte=number_of_guests)
+    if holds:
+        rooms = exclude_held(rooms, day_in, day_out, user)
+    authenticated = user is not None and user.is_authenticated
+    if index_enabled():
+        if authenticated and availability_index.client_is_busy(user.pk, day_in, day_out):
+            return rooms.none()
+        return rooms.exclude(pk__in=availability_index.busy_rooms(day_in, day_out)).order_by('number')
+    rooms = rooms.filter(~Exists(RoomNight.objects.filter(room=OuterRef('pk')).in_window(day_in, day_out)))
+    if authenticated:
+        rooms = rooms.filter(~Exists(Reserve.objects.filter(client=user).overlapping(day_in, day_out)))
+    return rooms.order_by('number')
+
+
+def search_cache_timeout() -> int:
+    """ Время жизни результатов поиска свободных комнат в кэше (0 - кэш выключен) """
+    return getattr(settings, 'ROOM_SEARCH_CACHE_TIMEOUT', 0)
+
+
+def search_cache_key(day_in: datetime.date, day_out: datetime.date, number_of_guests: int, version: int) -> str:
+    return f'room:search:{version}:{day_in.isoformat()}:{day_out.isoformat()}:{number_of_guests}'
+
+
+def get_free_room_ids(day_in: datetime.date, day_out: datetime.date, number_of_guests: int) -> List[int]:
+    """
+    pk свободных комнат из кэша результатов поиска, общего для всех пользователей
+    Ключ включает версию данных о занятости, поэтому изменение резервов делает старые результаты недоступными.
+    Одинаковые одновременные запросы вычисляет один воркер (блокировка через cache.add), остальные ждут результат
+    """
+    version = get_availability_version()
+    key = search_cache_key(day_in, day_out, number_of_guests, version)
+    room_ids = cache.get(key)
+    if room_ids is not None:
+        return room_ids
+    lock_key = f'{key}:lock'
+    lock_timeout = getattr(settings, 'ROOM_SEARCH_LOCK_TIMEOUT', 10)
+    locked = cache.add(lock_key, 1, timeout=lock_timeout)
+    deadline = time.monotonic() + lock_timeout
+    while not locked and time.monotonic() < deadline:
+        time.sleep(0.05)
+        room_ids = cache.get(key)
+        if room_ids is not None:
+            return room_ids
+        locked = cache.add(lock_key, 1, timeout=lock_timeout)
+    try:
+        room_ids = list(get_free_rooms(day_in, day_out, number_of_guests, holds=False).values_list('pk', flat=True))
+        cache.set(key, room_ids, timeout=search_cache_timeout())
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return room_ids
+
+
+def search_free_rooms(day_in: datetime.date, day_out: datetime.date, number_of_guests: int,
+                      user: CustomUser = None) -> QuerySet:
+    """
+    Поиск свободных комнат для представлений: общая часть берется из кэша результатов поиска,
+    удержания и резервы пользователя проверяются в том же запросе, что и выборка комнат
+    """
+    if not search_cache_timeout():
+        return get_free_rooms(day_in, day_out, number_of_guests, user=user)
+    rooms = exclude_held(Room.objects.with_gallery().filter(
+        pk__in=get_free_room_ids(day_in, day_out, number_of_guests)), day_in, day_out, user)
+    if user is not None and user.is_authenticated:
+        if index_enabled():
+            if availability_index.client_is_busy(user.pk, day_in, day_out):
+                return rooms.none()
+        else:
+            rooms = rooms.filter(~Exists(Reserve.objects.filter(client=user).overlapping(day_in, day_out)))
+    return rooms.order_by('number')
+
+
+def get_occupancy(day_in: datetime.date, day_out: datetime.date, room: Room = None,
+                  client: CustomUser = None) -> Dict[int, int]:
+    """
+    Битовые маски занятости комнат по дням периода [day_in, day_out) одним запросом к резервам
+    Бит d маски комнаты установлен, если ночь day_in + d занята. Комнаты без резервов в словарь не попадают
+    """
+    reserves = Reserve.objects.overlapping(day_in, day_out)
+    if room is not None:
+        reserves = reserves.filter(room=room)
+    if client is not None:
+        reserves = reserves.filter(client=client)
+    return fill_occupancy({}, reserves.values_list('room_id', 'day_in', 'day_out'), day_in, day_out)
+
+
+def fill_occupancy(masks: Dict[int, int], periods, day_in: datetime.date, day_out: datetime.date) -> Dict[int, int]:
+    """ Добавить в битовые маски комнат периоды (room_id, заезд, выезд), обрезанные по [day_in, day_out) """
+    days = (day_out - day_in).days
+    for room_id, period_in, period_out in periods:
+        start = max((period_in - day_in).days, 0)
+        end = min((period_out - day_in).days, days)
+        if end > start:
+            masks[room_id] = masks.get(room_id, 0) | ((1 << (end - start)) - 1) << start
+    return masks
+
+
+def unpack_occupancy(mask: int, days: int) -> List[int]:
+    """ Битовая маска занятости в список 0/1 по дням """
+    return [int(bit) for bit in reversed(format(mask, f'0{days}b'))] if days else []
+
+
+def get_free_rooms_by_window(earliest_day_in: datetime.date, latest_day_out: datetime.date, nights: int,
+                             number_of_guests: int,
+                             user: CustomUser = None) -> List[Tuple[datetime.date, datetime.date, List[Room]]]:
+    """
+    Свободные комнаты для каждого периода из nights ночей между earliest_day_in и latest_day_out
+    Резервы и удержания периода читаются один раз, затем окно сдвигается по битовым маскам занятости.
+    Периоды, пересекающиеся с резервами пользователя, пропускаются
+    """
+    days = (latest_day_out - earliest_day_in).days
+    rooms = list(Room.objects.with_gallery().filter(
+        number_of_guests__gte=number_of_guests).order_by('number'))
+    masks = get_occupancy(earliest_day_in, latest_day_out)
+    holds = BookingHold.objects.active().overlapping(earliest_day_in, latest_day_out)
+    user_mask = 0
+    if user is not None and user.is_authenticated:
+        holds = holds.exclude(client=user)
+        user_mask = functools.reduce(operator.or_, get_occupancy(earliest_day_in, latest_day_out,
+                                                                 client=user).values(), 0)
+    fill_occupancy(masks, holds.values_list('room_id', 'day_in', 'day_out'), earliest_day_in, latest_day_out)
+    window = (1 << nights) - 1
+    windows = []
+    for start in range(days - nights + 1):
+        if (user_mask >> start) & window:
+            continue
+        day_in = earliest_day_in + datetime.timedelta(days=start)
+        free_rooms = [room for room in rooms if not (masks.get(room.pk, 0) >> start) & window]
+        windows.append((day_in, day_in + datetime.timedelta(days=nights), free_rooms))
+    return windows
@@ -0,0 +1,179 @@
+import bisect
+import datetime
+import sys
+import threading
+from typing import Dict, List, Set, Tuple
+
+from django.core.cache import cache
+from django.db import models
+
+from Room.models import Reserve
+
+AVAILABILITY_VERSION_KEY = 'room:availability:version'
+
+_date_field = models.DateField()
+
+
+def get_availability_version() -> int:
+    """ Текущая версия данных о занятости (общая для всех воркеров через кэш Django) """
+    version = cache.get(AVAILABILITY_VERSION_KEY)
+    if version is None:
+        cache.add(AVAILABILITY_VERSION_KEY, 1, timeout=None)
+        version = cache.get(AVAILABILITY_VERSION_KEY, 1)
+    return version
+
+
+def bump_availability_version() -> int:
+    """ Увеличить версию данных о занятости после изменения резервов """
+    get_availability_version()
+    try:
+        return cache.incr(AVAILABILITY_VERSION_KEY)
+    except ValueError:
+        cache.add(AVAILABILITY_VERSION_KEY, 1, timeout=None)
+        return cache.incr(AVAILABILITY_VERSION_KEY)
+
+
+def to_ordinal(day: datetime.date) -> int:
+    """ Дата (или строка 'ГГГГ-ММ-ДД') в порядковый номер дня """
+    return _date_field.to_python(day).toordinal()
+
+
+class IntervalIndex:
+    """
+    Периоды [заезд, выезд) в виде порядковых номеров дней, отсортированные по дате заезда и сгруппированные по ключу
+    Для ключа хранится максимальная длина периода, поэтому поиск пересечений ограничен двоичным поиском
+    и просмотром периодов, начинающихся не раньше чем за max_length дней до запрошенной даты заезда
+    """
+
+    def __init__(self):
+        self._intervals: Dict[int, List[Tuple[int, int, int]]] = {}
+        self._max_length: Dict[int, int] = {}
+
+    def __len__(self):
+        return sum(len(intervals) for intervals in self._intervals.values())
+
+    def key_count(self) -> int:
+        return len(self._intervals)
+
+    def add(self, key: int, start: int, end: int, reserve_id: int):
+        if start >= end:
+            return
+        bisect.insort(self._intervals.setdefault(key, []), (start, end, reserve_id))
+        self._max_length[key] = max(self._max_length.get(key, 0), end - start)
+
+    def remove(self, key: int, start: int, end: int, reserve_id: int):
+        intervals = self._intervals.get(key, [])
+        position = bisect.bisect_left(intervals, (start, end, reserve_id))
+        if position < len(intervals) and intervals[position] == (start, end, reserve_id):
+            del intervals[position]
+        if not intervals:
+            self._intervals.pop(key, None)
+            self._max_length.pop(key, None)
+
+    def overlaps(self, key: int, start: int, end: int) -> bool:
+        intervals = self._intervals.get(key)
+        if not intervals or start >= end:
+            return False
+        position = bisect.bisect_left(intervals, (end,))
+        lowest_start = start - self._max_length[key]
+        while position > 0:
+            position -= 1
+            interval_start, interval_end, _ = intervals[position]
+            if interval_start < lowest_start:
+                break
+            if interval_end > start:
+                return True
+        return False
+
+    def busy_keys(self, start: int, end: int) -> Set[int]:
+        return {key for key in self._intervals if self.overlaps(key, start, end)}
+
+    def memory_usage(self) -> int:
+        size = sys.getsizeof(self._intervals) + sys.getsizeof(self._max_length)
+        for key, intervals in self._intervals.items():
+            size += sys.getsizeof(key) + sys.getsizeof(intervals)
+            size += sum(sys.getsizeof(interval) + sum(map(sys.getsizeof, interval)) for interval in intervals)
+        return size
+
+
+class AvailabilityIndex:
+    """
+    Локальный для процесса индекс занятости комнат и клиентов
+    Строится из Reserve один раз, затем обновляется сигналами. Если версия в кэше ушла вперед
+    (резервы изменил другой воркер), индекс перестраивается при следующем обращении
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = None
+        self._clear()
+
+    def _clear(self):
+        self.rooms = IntervalIndex()
+        self.clients = IntervalIndex()
+        self._reserves: Dict[int, Tuple[int, int, int, int]] = {}
+
+    def _add(self, reserve_id: int, room_id: int, client_id: int, start: int, end: int):
+        self._reserves[reserve_id] = (room_id, client_id, start, end)
+        self.rooms.add(room_id, start, end, reserve_id)
+        self.clients.add(client_id, start, end, reserve_id)
+
+    def _remove(self, reserve_id: int):
+        if reserve_id in self._reserves:
+            room_id, client_id, start, end = self._reserves.pop(reserve_id)
+            self.rooms.remove(room_id, start, end, reserve_id)
+            self.clients.remove(client_id, start, end, reserve_id)
+
+    def rebuild(self, version: int = None):
+        """ Построить индекс заново из таблицы резервов """
+        with self._lock:
+            version = get_availability_version() if version is None else version
+            self._clear()
+            rows = Reserve.objects.values_list('pk', 'room_id', 'client_id', 'day_in', 'day_out').iterator()
+            for reserve_id, room_id, client_id, day_in, day_out in rows:
+                self._add(reserve_id, room_id, client_id, day_in.toordinal(), day_out.toordinal())
+            self.version = version
+
+    def ensure_fresh(self):
+        version = get_availability_version()
+        if self.version != version:
+            self.rebuild(version)
+
+    def apply(self, reserve_id: int, values: Tuple[int, int, str, str] = None):
+        """ Инкрементально обновить индекс после изменения (values=None - удаления) одного резерва """
+        with self._lock:
+            previous = self.version
+            version = bump_availability_version()
+            if previous is None or version != previous + 1:
+                return
+            self._remove(reserve_id)
+            if values is not None:
+                room_id, client_id, day_in, day_out = values
+                self._add(reserve_id, room_id, client_id, to_ordinal(day_in), to_ordinal(day_out))
+            self.version = version
+
+    def busy_rooms(self, day_in: datetime.date, day_out: datetime.date) -> Set[int]:
+        with self._lock:
+            self.ensure_fresh()
+            return self.rooms.busy_keys(to_ordinal(day_in), to_ordinal(day_out))
+
+    def room_is_busy(self, room_id: int, day_in: datetime.date, day_out: datetime.date) -> bool:
+        with self._lock:
+            self.ensure_fresh()
+            return self.rooms.overlaps(room_id, to_ordinal(day_in), to_ordinal(day_out))
+
+    def client_is_busy(self, client_id: int, day_in: datetime.date, day_out: datetime.date) -> bool:
+        with self._lock:
+            self.ensure_fresh()
+            return self.clients.overlaps(client_id, to_ordinal(day_in), to_ordinal(day_out))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'version': self.version, 'reserves': len(self._reserves),
+                    'rooms': self.rooms.key_count(), 'clients': self.clients.key_count(),
+                    'memory': self.rooms.memory_usage() + self.clients.memory_usage()
+                    + sys.getsizeof(self._reserves) + sum(sys.getsizeof(item) for item in self._reserves.values())}
+
+
+availability_index = AvailabilityIndex()
+
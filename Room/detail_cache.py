@@ -0,0 +1,61 @@
+import threading
+from typing import Dict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from Room.reference import REFERENCE_VERSION_KEY
+
+ROOM_DETAIL_VERSION_KEY = 'room:detail:version:{number}'
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def detail_cache_timeout() -> int:
+    """ Время жизни фрагментов страницы комнаты в кэше (0 - кэш выключен) """
+    return getattr(settings, 'ROOM_DETAIL_CACHE_TIMEOUT', 0)
+
+
+def bump_room_version(number: int) -> int:
+    """ Сделать устаревшими фрагменты страницы комнаты (комната, галерея, отзывы) """
+    key = ROOM_DETAIL_VERSION_KEY.format(number=number)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+        return cache.incr(key)
+
+
+def get_page_version(number: int) -> str:
+    """
+    Версия фрагментов страницы комнаты: версия комнаты и версия справочников (Room.reference)
+    одним обращением к кэшу. Версия комнаты только читается (до первого изменения комнаты - 0),
+    поэтому запросы к несуществующим номерам не создают ключей в кэше
+    """
+    room_key = ROOM_DETAIL_VERSION_KEY.format(number=number)
+    versions = cache.get_many([room_key, REFERENCE_VERSION_KEY])
+    if REFERENCE_VERSION_KEY not in versions:
+        cache.add(REFERENCE_VERSION_KEY, 1, timeout=None)
+        versions[REFERENCE_VERSION_KEY] = cache.get(REFERENCE_VERSION_KEY, 1)
+    return f'{versions.get(room_key, 0)}.{versions[REFERENCE_VERSION_KEY]}'
+
+
+def fragment_key(name: str, number: int, version: str) -> str:
+    return f'room:detail:{number}:{version}:{name}'
+
+
+def count(hit: bool):
+    with _stats_lock:
+        _stats['hits' if hit else 'misses'] += 1
+
+
+def get_stats() -> Dict[str, int]:
+    """ Попадания и промахи кэша фрагментов страницы комнаты в этом процессе """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
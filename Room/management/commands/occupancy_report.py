@@ -0,0 +1,23 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from Room.models import Room, RoomNight
+
+
+class Command(BaseCommand):
+    help = 'Загрузка отеля по дням: количество занятых комнат и процент загрузки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('day_in', type=datetime.date.fromisoformat, help='Первый день (ГГГГ-ММ-ДД)')
+        parser.add_argument('day_out', type=datetime.date.fromisoformat, help='День после последнего (ГГГГ-ММ-ДД)')
+
+    def handle(self, *args, **options):
+        rooms = Room.objects.count()
+        occupancy = {row['date']: row['occupied']
+                     for row in RoomNight.objects.occupancy(options['day_in'], options['day_out'])}
+        for day in range((options['day_out'] - options['day_in']).days):
+            date = options['day_in'] + datetime.timedelta(days=day)
+            occupied = occupancy.get(date, 0)
+            percent = occupied / rooms * 100 if rooms else 0
+            self.stdout.write(f'{date}: {occupied} из {rooms} ({percent:.0f}%)')
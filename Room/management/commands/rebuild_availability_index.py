@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Room.availability_index import availability_index, bump_availability_version
+
+
+class Command(BaseCommand):
+    help = 'Перестроить индекс занятости комнат и вывести занимаемую им память'
+
+    def handle(self, *args, **options):
+        # Новая версия заставит все воркеры перестроить свои копии индекса при следующем обращении
+        version = bump_availability_version()
+        started = time.perf_counter()
+        availability_index.rebuild(version)
+        elapsed = time.perf_counter() - started
+        stats = availability_index.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Индекс перестроен за {elapsed:.3f} с: версия {stats['version']}, резервов {stats['reserves']}, "
+            f"комнат {stats['rooms']}, клиентов {stats['clients']}, память {stats['memory'] / 1024:.1f} КБ"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from Room.models import RoomNight
+
+
+class Command(BaseCommand):
+    help = 'Пересобрать таблицу занятых ночей комнат из резервов'
+
+    def handle(self, *args, **options):
+        count = RoomNight.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Таблица занятых ночей пересобрана: {count} ночей'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from Room.models import Room
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать рейтинги комнат по отзывам'
+
+    def handle(self, *args, **options):
+        count = Room.objects.recalculate_ratings()
+        self.stdout.write(self.style.SUCCESS(f'Рейтинги пересчитаны: {count} комнат с отзывами'))
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.6 on 2026-10-18 19:40
+
+import Room.models
+import django.contrib.postgres.constraints
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Room', '0004_alter_gallery_created_at_alter_gallery_updated_at_and_more'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddConstraint(
+            model_name='reserve',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                expressions=[('room', '='), (Room.models.StayRange(), '&&')], index_type='GIST',
+                name='reserve_room_stay_excl'),
+        ),
+    ]
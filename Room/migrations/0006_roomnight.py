@@ -0,0 +1,44 @@
+# Generated by Django 4.0.6 on 2026-10-18 19:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Room', '0005_reserve_stay_exclusion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('reserve', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='Room.reserve', verbose_name='Резерв')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='Room.room', verbose_name='Комната')),
+            ],
+            options={
+                'verbose_name': 'Занятая ночь комнаты',
+                'verbose_name_plural': 'Занятые ночи комнат',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='roomnight',
+            index=models.Index(fields=['date'], name='room_night_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='roomnight',
+            constraint=models.UniqueConstraint(fields=('room', 'date'), name='room_night_unique'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO "Room_roomnight" (room_id, reserve_id, date)
+                SELECT room_id, id, generate_series(day_in, day_out - 1, interval '1 day')::date
+                FROM "Room_reserve"
+                WHERE day_out > day_in
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.0.6 on 2026-10-18 19:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('Room', '0006_roomnight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('day_in', models.DateField(verbose_name='Дата заезда')),
+                ('day_out', models.DateField(verbose_name='Дата выезда')),
+                ('expires_at', models.DateTimeField(verbose_name='Действует до')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to=settings.AUTH_USER_MODEL, verbose_name='Клиент')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='Room.room', verbose_name='Комната')),
+            ],
+            options={
+                'verbose_name': 'Удержание комнаты',
+                'verbose_name_plural': 'Удержания комнат',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='bookinghold',
+            index=models.Index(fields=['expires_at'], name='booking_hold_expires_idx'),
+        ),
+    ]
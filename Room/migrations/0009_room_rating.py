@@ -0,0 +1,44 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:07
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Room', '0008_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=1, default=Decimal('5.0'), editable=False, max_digits=2, verbose_name='Средний рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество оценок'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['-rating_avg', 'number'], name='room_rating_idx'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE "Room_room" AS room
+                SET rating_sum = review.total, rating_count = review.number,
+                    rating_avg = round(review.total::numeric / review.number, 1)
+                FROM (SELECT room_id, SUM(rating) AS total, COUNT(rating) AS number
+                      FROM "Room_review" WHERE rating IS NOT NULL GROUP BY room_id) AS review
+                WHERE room.id = review.room_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:13
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Room', '0009_room_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='review_search_idx'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE TRIGGER review_search_vector_update
+                BEFORE INSERT OR UPDATE ON "Room_review"
+                FOR EACH ROW EXECUTE PROCEDURE tsvector_update_trigger(search_vector, 'pg_catalog.russian', body);
+                UPDATE "Room_review" SET search_vector = to_tsvector('pg_catalog.russian', coalesce(body, ''));
+            """,
+            reverse_sql='DROP TRIGGER review_search_vector_update ON "Room_review";',
+        ),
+    ]
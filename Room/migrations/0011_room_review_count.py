@@ -0,0 +1,27 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Room', '0010_review_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество отзывов'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE "Room_room" AS room
+                SET review_count = review.number
+                FROM (SELECT room_id, COUNT(*) AS number FROM "Room_review" GROUP BY room_id) AS review
+                WHERE room.id = review.room_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,12 @@
+class CachedObjectMixin:
+    """
+    Объект представления загружается одним запросом за запрос: результат get_object() запоминается
+    на экземпляре представления. Подходит для SingleObjectMixin Django и GenericAPIView DRF
+    """
+
+    def get_object(self, *args, **kwargs):
+        if args or kwargs:
+            return super().get_object(*args, **kwargs)
+        if not hasattr(self, '_cached_object'):
+            self._cached_object = super().get_object()
+        return self._cached_object
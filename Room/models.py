@@ -1,12 +1,30 @@
+import datetime
+from datetime import timedelta
 from decimal import Decimal
-from typing import Union
+from typing import List, Optional, Tuple, Union
 
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import Avg, QuerySet
+from django.db import connection, models, transaction
+from django.db.models import Case, Count, DateField, DecimalField, Exists, F, OuterRef, Prefetch, Q, QuerySet, \
+    Subquery, Value, When
+from django.db.models.functions import Cast, Now
 from django.urls import reverse
+from django.utils import timezone
+from psycopg2.extras import DateRange
 
 from Account.models import CustomUser, TimeStampedModel
+from Room import reference
+
+
+_date_field = models.DateField()
+
+DEFAULT_RATING = Decimal('5.0')
+# Конфигурация полнотекстового поиска по отзывам (должна совпадать с триггером Review.search_vector)
+SEARCH_CONFIG = 'russian'
 
 
 def catalog_of_photo_rooms(instance, filename):
@@ -40,6 +58,67 @@ class TypeRoom(TimeStampedModel):
         verbose_name = 'Тип комнаты'
 
 
+class RoomQuerySet(models.QuerySet):
+    """ Составные выборки комнат для списков: Room.objects.with_type().with_gallery().with_rating() """
+
+    def with_type(self) -> QuerySet:
+        return self.select_related('type')
+
+    def with_gallery(self) -> QuerySet:
+        return self.select_related('photos_of_room')
+
+    def with_rating(self) -> QuerySet:
+        """
+        Средний рейтинг (average_rating) и количество оценок (rating_number) комнаты
+        Берутся из агрегатов, которые поддерживают сигналы отзывов, поэтому без GROUP BY по отзывам
+        """
+        return self.annotate(average_rating=F('rating_avg'), rating_number=F('rating_count'))
+
+    def with_reviews(self) -> QuerySet:
+        """ Отзывы комнат с авторами одним дополнительным запросом на выборку (Room.get_review_list) """
+        return self.prefetch_related(Prefetch('review_set', to_attr='review_list',
+                                              queryset=Review.objects.order_by('-pub_date').select_related('author')))
+
+    def with_next_free_date(self, today: datetime.date = None) -> QuerySet:
+        """
+        Ближайшая начиная с today свободная ночь комнаты (next_free_date) по таблице занятых ночей:
+        today, если ночь today свободна, иначе день после первой занятой ночи, за которой следует свободная
+        """
+        today = today or timezone.localdate()
+        nights = RoomNight.objects.filter(room=OuterRef('pk'))
+        next_day = Cast(F('date') + timedelta(days=1), DateField())
+        gap = RoomNight.objects.filter(room=OuterRef('pk'), date__gte=today).annotate(next_day=next_day).filter(
+            ~Exists(RoomNight.objects.filter(room=OuterRef('room'), date=OuterRef('next_day')))
+        ).order_by('date').values('next_day')[:1]
+        return self.annotate(next_free_date=Case(When(Exists(nights.filter(date=today)), then=Subquery(gap)),
+                                                 default=Value(today), output_field=DateField()))
+
+    def change_rating(self, rating: Optional[int], count: int = 1) -> int:
+        """
+        Добавить (count=1) или убрать (count=-1) отзыв с оценкой rating одним UPDATE с F-выражениями,
+        без чтения строк комнат. Отзыв без оценки (rating=None) меняет только количество отзывов.
+        Без оценок средний рейтинг комнаты - 5.0
+        """
+        # updated_at меняется вместе с рейтингом: по нему проверяется версия ответов API (Room.api.caching)
+        fields = {'review_count': F('review_count') + count, 'updated_at': Now()}
+        if rating is not None:
+            total = F('rating_sum') + rating * count
+            number = F('rating_count') + count
+            average = Cast(total, DecimalField(max_digits=12, decimal_places=4)) / number
+            if count < 0:
+                average = Case(When(rating_count__lte=-count, then=Value(DEFAULT_RATING)), default=average)
+            fields.update(rating_sum=total, rating_count=number,
+                          rating_avg=Cast(average, DecimalField(max_digits=2, decimal_places=1)))
+        return self.update(**fields)
+
+    def recalculate_ratings(self) -> int:
+        """ Пересчитать рейтинги всех комнат по отзывам, возвращает количество комнат с отзывами """
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(RESET_ROOM_RATINGS_SQL)
+            cursor.execute(RECALCULATE_ROOM_RATINGS_SQL)
+            return cursor.rowcount
+
+
 class Room(TimeStampedModel):
     """ Модель Комнаты """
     hotel = models.ForeignKey(Hotel, null=False, on_delete=models.CASCADE, verbose_name='Отель')
@@ -47,24 +126,49 @@ class Room(TimeStampedModel):
     type = models.ForeignKey(TypeRoom, on_delete=models.PROTECT, null=True, verbose_name='Тип')
     price = models.IntegerField(null=True, verbose_name='Цена', help_text='указывать в рублях')
     number_of_guests = models.IntegerField(null=True, verbose_name='Количество гостей')
+    # Агрегаты отзывов и их оценок, обновляются сигналами Review (Room.signals).
+    # review_count - все отзывы комнаты, rating_count - только отзывы с оценкой (знаменатель среднего)
+    review_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество отзывов')
+    rating_sum = models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок')
+    rating_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество оценок')
+    rating_avg = models.DecimalField(max_digits=2, decimal_places=1, default=DEFAULT_RATING, editable=False,
+                                     verbose_name='Средний рейтинг')
+
+    objects = RoomQuerySet.as_manager()
 
     def __str__(self):
         return str(self.number)
 
+    def save(self, *args, **kwargs):
+        # Рейтинг меняется только UPDATE с F-выражениями, поэтому устаревшие значения экземпляра не сохраняются
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in RATING_FIELDS]
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('detail_room', kwargs={"number": self.number})
 
-    def get_average_rating(self) -> Union[Decimal, None]:
+    def get_average_rating(self) -> Decimal:
         """ Получить средний рейтинг комнаты """
-        reviews = Review.objects.filter(room__number=self.number).aggregate(Avg('rating'))['rating__avg']
-        return Decimal(reviews).quantize(Decimal("1.0")) if reviews else 5.0
+        return self.rating_avg
 
-    def get_regulations_list(self) -> QuerySet:
-        """ Получить список правил для комнаты """
-        return Regulations.objects.filter(type_room=self.type)
+    def get_regulations_list(self) -> Tuple[reference.RegulationInfo, ...]:
+        """ Получить список правил для комнаты (из кэша справочников) """
+        return reference.get_regulations(self.type_id)
 
-    def get_review_list(self) -> QuerySet:
-        """ Получить список отзывов для комнаты """
+    def get_type_info(self) -> Optional[reference.TypeRoomInfo]:
+        """ Получить тип комнаты из кэша справочников, без обращения к self.type """
+        return reference.get_type(self.type_id)
+
+    def get_hotel_info(self) -> Optional[reference.HotelInfo]:
+        """ Получить отель комнаты из кэша справочников """
+        return reference.get_hotel(self.hotel_id)
+
+    def get_review_list(self) -> Union[QuerySet, List['Review']]:
+        """ Получить список отзывов для комнаты (без запроса, если выборка сделана with_reviews) """
+        if hasattr(self, 'review_list'):
+            return self.review_list
         return Review.objects.filter(room=self).order_by('-pub_date').select_related('author')
 
     def get_full_price(self, days: int) -> int:
@@ -74,6 +178,14 @@ class Room(TimeStampedModel):
     class Meta:
         verbose_name_plural = 'Комнаты'
         verbose_name = 'Комната'
+        indexes = [models.Index(fields=['-rating_avg', 'number'], name='room_rating_idx')]
+
+
+RATING_FIELDS = ('review_count', 'rating_sum', 'rating_count', 'rating_avg')
+
+RESET_ROOM_RATINGS_SQL = f"""
+    UPDATE "{Room._meta.db_table}" SET review_count = 0, rating_sum = 0, rating_count = 0, rating_avg = 5.0
+"""
 
 
 class Gallery(TimeStampedModel):
@@ -97,6 +209,24 @@ class Gallery(TimeStampedModel):
         verbose_name = 'Галерея комнаты'
 
 
+class StayRange(models.Func):
+    """ Период проживания резерва daterange(day_in, day_out) - полуинтервал [заезд, выезд) """
+    function = 'DATERANGE'
+    output_field = DateRangeField()
+
+    def __init__(self, day_in='day_in', day_out='day_out', **extra):
+        super().__init__(day_in, day_out, **extra)
+
+
+class ReserveQuerySet(models.QuerySet):
+
+    def overlapping(self, day_in: datetime.date, day_out: datetime.date) -> QuerySet:
+        """ Резервы, пересекающиеся с периодом [day_in, day_out) (оператор && по индексу GiST) """
+        day_in, day_out = _date_field.to_python(day_in), _date_field.to_python(day_out)
+        stay = DateRange(empty=True) if day_in > day_out else DateRange(day_in, day_out)
+        return self.alias(stay=StayRange()).filter(stay__overlap=stay)
+
+
 class Reserve(TimeStampedModel):
     """ Модель резерва комнаты """
     client = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=False, related_name='client',
@@ -107,17 +237,167 @@ class Reserve(TimeStampedModel):
     number_of_guests = models.IntegerField(null=True, verbose_name='Количество гостей')
     reg_date = models.DateField(auto_now_add=True, null=True, verbose_name='Дата регистрации резерва', )
 
+    objects = ReserveQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.client.email} : {self.day_in} - {self.day_out}"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            RoomNight.objects.fill(self, replace=not adding)
+
     def clean(self):
         if self.day_in > self.day_out:
             raise ValidationError({'day_in': "Дата заезда не может быть позже даты выезда",
                                    'day_out': "Дата выезда не может быть раньше даты заезда"})
+        if self.room_id and Reserve.objects.filter(room_id=self.room_id).exclude(pk=self.pk).overlapping(
+                self.day_in, self.day_out).exists():
+            raise ValidationError("Комната уже забронирована на выбранные даты")
 
     class Meta:
         verbose_name_plural = 'Резервы комнат'
         verbose_name = 'Резерв комнаты'
+        # Индекс GiST ограничения используется и для поиска пересечений по датам
+        constraints = [
+            ExclusionConstraint(name='reserve_room_stay_excl', index_type='GIST',
+                                expressions=[('room', RangeOperators.EQUAL),
+                                             (StayRange(), RangeOperators.OVERLAPS)]),
+        ]
+
+
+class RoomNightQuerySet(models.QuerySet):
+
+    def in_window(self, day_in: datetime.date, day_out: datetime.date) -> QuerySet:
+        """ Ночи в периоде [day_in, day_out) """
+        return self.filter(date__gte=day_in, date__lt=day_out)
+
+    def fill(self, reserve: 'Reserve', replace: bool = False) -> List['RoomNight']:
+        """ Занять ночи комнаты по резерву (повторное занятие ночи - нарушение уникальности room/date) """
+        if replace:
+            self.filter(reserve=reserve).delete()
+        return self.fill_many([reserve])
+
+    def fill_many(self, reserves: List['Reserve']) -> List['RoomNight']:
+        """ Занять ночи по нескольким новым резервам одним запросом """
+        nights = []
+        for reserve in reserves:
+            day_in, day_out = _date_field.to_python(reserve.day_in), _date_field.to_python(reserve.day_out)
+            nights.extend(RoomNight(room_id=reserve.room_id, reserve=reserve, date=day_in + timedelta(days=day))
+                          for day in range((day_out - day_in).days))
+        return self.bulk_create(nights)
+
+    def rebuild(self) -> int:
+        """ Пересобрать таблицу занятых ночей из резервов одним запросом """
+        with transaction.atomic(), connection.cursor() as cursor:
+            self.all().delete()
+            cursor.execute(REBUILD_ROOM_NIGHTS_SQL)
+            return cursor.rowcount
+
+    def occupancy(self, day_in: datetime.date, day_out: datetime.date) -> QuerySet:
+        """ Количество занятых комнат по дням периода [day_in, day_out) """
+        return self.in_window(day_in, day_out).values('date').annotate(occupied=Count('id')).order_by('date')
+
+
+class RoomNight(models.Model):
+    """ Занятая ночь комнаты. Материализованный календарь занятости, заполняется при сохранении резерва """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='nights', verbose_name='Комната')
+    date = models.DateField(verbose_name='Дата')
+    reserve = models.ForeignKey(Reserve, on_delete=models.CASCADE, related_name='nights', verbose_name='Резерв')
+
+    objects = RoomNightQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.room} : {self.date}"
+
+    class Meta:
+        verbose_name_plural = 'Занятые ночи комнат'
+        verbose_name = 'Занятая ночь комнаты'
+        constraints = [models.UniqueConstraint(fields=['room', 'date'], name='room_night_unique')]
+        indexes = [models.Index(fields=['date'], name='room_night_date_idx')]
+
+
+REBUILD_ROOM_NIGHTS_SQL = f"""
+    INSERT INTO "{RoomNight._meta.db_table}" (room_id, reserve_id, date)
+    SELECT room_id, id, generate_series(day_in, day_out - 1, interval '1 day')::date
+    FROM "{Reserve._meta.db_table}"
+    WHERE day_out > day_in
+"""
+
+
+class BookingHoldQuerySet(ReserveQuerySet):
+
+    def active(self, now: datetime.datetime = None) -> QuerySet:
+        """ Действующие удержания """
+        return self.filter(expires_at__gt=now or timezone.now())
+
+    def expired(self, now: datetime.datetime = None) -> QuerySet:
+        """ Истекшие удержания """
+        return self.filter(expires_at__lte=now or timezone.now())
+
+
+class BookingHold(TimeStampedModel):
+    """
+    Временное удержание комнаты на период между страницей бронирования и оплатой
+    Пока удержание действует, комнату на эти даты не видят в поиске и не могут забронировать другие клиенты
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='holds', verbose_name='Комната')
+    client = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='holds', verbose_name='Клиент')
+    day_in = models.DateField(verbose_name='Дата заезда')
+    day_out = models.DateField(verbose_name='Дата выезда')
+    expires_at = models.DateTimeField(verbose_name='Действует до')
+
+    objects = BookingHoldQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.room} : {self.day_in} - {self.day_out} до {self.expires_at}"
+
+    class Meta:
+        verbose_name_plural = 'Удержания комнат'
+        verbose_name = 'Удержание комнаты'
+        indexes = [models.Index(fields=['expires_at'], name='booking_hold_expires_idx')]
+
+
+class OutboxMessageQuerySet(models.QuerySet):
+
+    def due(self, max_attempts: int, now: datetime.datetime = None) -> QuerySet:
+        """ Неотправленные письма, время очередной попытки которых наступило """
+        return self.filter(sent_at__isnull=True, attempts__lt=max_attempts, next_attempt_at__lte=now or timezone.now())
+
+
+class OutboxMessage(TimeStampedModel):
+    """
+    Письмо, ожидающее отправки. Создается в той же транзакции, что и изменение резерва,
+    и отправляется задачей Room.tasks.send_outbox
+    """
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст')
+    recipient = models.EmailField(verbose_name='Получатель')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток отправки')
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name='Следующая попытка')
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='Отправлено')
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+
+    objects = OutboxMessageQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.recipient} : {self.subject}"
+
+    class Meta:
+        verbose_name_plural = 'Исходящие письма'
+        verbose_name = 'Исходящее письмо'
+        indexes = [models.Index(fields=['next_attempt_at'], name='outbox_pending_idx',
+                                condition=Q(sent_at__isnull=True))]
+
+
+class ReviewQuerySet(models.QuerySet):
+
+    def search(self, text: str) -> QuerySet:
+        """ Полнотекстовый поиск по тексту отзыва (индекс GIN), отзывы упорядочены по релевантности (rank) """
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return self.filter(search_vector=query).annotate(rank=SearchRank(F('search_vector'), query)) \
+            .order_by('-rank', '-pk')
 
 
 class Review(TimeStampedModel):
@@ -129,6 +409,10 @@ class Review(TimeStampedModel):
     reserve = models.OneToOneField(Reserve, on_delete=models.CASCADE, null=True, verbose_name='Резерв',
                                    related_name='review')
     pub_date = models.DateField(auto_now_add=True, null=True, verbose_name='Дата публикации', )
+    # Заполняется триггером БД review_search_vector_update при вставке и изменении отзыва
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name='Поисковый вектор')
+
+    objects = ReviewQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.author.email} : {self.rating}"
@@ -140,6 +424,17 @@ class Review(TimeStampedModel):
     class Meta:
         verbose_name_plural = 'Отзывы комнат'
         verbose_name = 'Отзыв комнаты'
+        indexes = [GinIndex(fields=['search_vector'], name='review_search_idx')]
+
+
+RECALCULATE_ROOM_RATINGS_SQL = f"""
+    UPDATE "{Room._meta.db_table}" AS room
+    SET review_count = review.reviews, rating_sum = COALESCE(review.total, 0), rating_count = review.number,
+        rating_avg = COALESCE(round(review.total::numeric / NULLIF(review.number, 0), 1), 5.0)
+    FROM (SELECT room_id, COUNT(*) AS reviews, SUM(rating) AS total, COUNT(rating) AS number
+          FROM "{Review._meta.db_table}" GROUP BY room_id) AS review
+    WHERE room.id = review.room_id
+"""
 
 
 class Regulations(TimeStampedModel):
@@ -0,0 +1,68 @@
+import datetime
+from typing import Dict
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from Room.models import OutboxMessage
+
+
+def queue_email(subject: str, body: str, recipient) -> OutboxMessage:
+    """ Поставить письмо в очередь отправки (в текущей транзакции) """
+    return OutboxMessage.objects.create(subject=subject, body=body, recipient=str(recipient))
+
+
+def retry_delay(attempts: int) -> datetime.timedelta:
+    """ Экспоненциальная задержка перед следующей попыткой, не больше OUTBOX_MAX_RETRY_DELAY """
+    delay = settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return datetime.timedelta(seconds=min(delay, settings.OUTBOX_MAX_RETRY_DELAY))
+
+
+def _postpone(message: OutboxMessage, error: Exception, now: datetime.datetime):
+    message.attempts += 1
+    message.last_error = repr(error)
+    message.next_attempt_at = now + retry_delay(message.attempts)
+
+
+def drain_outbox(batch_size: int = None) -> Dict[str, int]:
+    """
+    Отправить пачку писем из очереди через одно SMTP-соединение
+    Строки выбираются SELECT ... FOR UPDATE SKIP LOCKED, поэтому несколько воркеров не отправят письмо дважды.
+    Неудачная отправка увеличивает счетчик попыток и откладывает письмо с экспоненциальной задержкой
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    result = {'sent': 0, 'failed': 0}
+    with transaction.atomic():
+        messages = list(OutboxMessage.objects.due(settings.OUTBOX_MAX_ATTEMPTS).select_for_update(skip_locked=True)
+                        .order_by('next_attempt_at', 'pk')[:batch_size])
+        if not messages:
+            return result
+        now = timezone.now()
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            for message in messages:
+                _postpone(message, e, now)
+            result['failed'] = len(messages)
+        else:
+            try:
+                # Письма отправляются по одному через общее соединение: неудача одного получателя
+                # откладывает только его письмо, уже отправленные не повторяются
+                for message in messages:
+                    try:
+                        EmailMessage(message.subject, message.body, settings.EMAIL_HOST_USER, [message.recipient],
+                                     connection=connection).send()
+                    except Exception as e:
+                        _postpone(message, e, now)
+                        result['failed'] += 1
+                    else:
+                        message.attempts += 1
+                        message.sent_at = now
+                        result['sent'] += 1
+            finally:
+                connection.close()
+        OutboxMessage.objects.bulk_update(messages, ['attempts', 'last_error', 'next_attempt_at', 'sent_at'])
+    return result
@@ -0,0 +1,145 @@
+import base64
+import binascii
+import json
+from typing import List, Sequence, Tuple
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from django.db.models.functions import Coalesce
+from django.http import Http404
+
+ROOM_ORDERINGS = ('number', 'price', 'rating')
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def order_rooms(queryset: QuerySet, ordering: str) -> Tuple[QuerySet, Tuple[str, ...]]:
+    """
+    Queryset комнат и поля ключа пагинации для сортировки 'number', 'price' или 'rating'
+    Последним полем всегда идет уникальный номер комнаты, поэтому ключ однозначно задает позицию в списке
+    """
+    if ordering == 'price':
+        return queryset.annotate(price_key=Coalesce('price', 0)), ('price_key', 'number')
+    if ordering == 'rating':
+        return queryset, ('-rating_avg', 'number')
+    return queryset, ('number',)
+
+
+def encode_cursor(values: Sequence, previous: bool = False) -> str:
+    payload = json.dumps({'v': list(values), 'p': int(previous)}, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[List, bool]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return list(payload['v']), bool(payload['p'])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor('Неверный курсор')
+
+
+class KeysetPage:
+    """ Страница пагинации по ключу: объекты и курсоры соседних страниц """
+
+    def __init__(self, object_list: list, next_cursor: str = None, previous_cursor: str = None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Пагинация по ключу сортировки (WHERE ключ > ключ последней строки) без OFFSET и COUNT(*)
+    Стоимость любой страницы равна стоимости первой. Поле с префиксом '-' сортируется по убыванию
+    """
+
+    def __init__(self, queryset: QuerySet, fields: Sequence[str], per_page: int):
+        self.queryset = queryset
+        self.fields = tuple(fields)
+        self.per_page = per_page
+
+    def _after(self, values: list, backwards: bool) -> Q:
+        """ Условие "строка идет после ключа values" (или перед ним при backwards) в порядке сортировки """
+        condition = Q()
+        for position in reversed(range(len(self.fields))):
+            field = self.fields[position]
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != backwards else 'gt'
+            equal = {self.fields[i].lstrip('-'): values[i] for i in range(position)}
+            condition = Q(**equal, **{f'{name}__{lookup}': values[position]}) | condition
+        return condition
+
+    def _key(self, obj) -> list:
+        # Строки .values() - словари
+        if isinstance(obj, dict):
+            return [obj[field.lstrip('-')] for field in self.fields]
+        return [getattr(obj, field.lstrip('-')) for field in self.fields]
+
+    def page(self, cursor: str = None) -> KeysetPage:
+        queryset, backwards = self.queryset, False
+        if cursor:
+            values, backwards = decode_cursor(cursor)
+            if len(values) != len(self.fields):
+                raise InvalidCursor('Неверный курсор')
+            try:
+                queryset = queryset.filter(self._after(values, backwards))
+            except (TypeError, ValueError, ValidationError):
+                raise InvalidCursor('Неверный курсор')
+        ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in self.fields] \
+            if backwards else self.fields
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return KeysetPage(rows)
+        first, last = encode_cursor(self._key(rows[0]), previous=True), encode_cursor(self._key(rows[-1]))
+        if backwards:
+            return KeysetPage(rows, next_cursor=last, previous_cursor=first if has_more else None)
+        return KeysetPage(rows, next_cursor=last if has_more else None, previous_cursor=first if cursor else None)
+
+
+class KeysetPaginationMixin:
+    """
+    Пагинация ListView по курсору (?cursor=) вместо номера страницы
+    Сортировка задается параметром ?ordering= из ROOM_ORDERINGS
+    """
+    default_ordering = 'number'
+
+    def get_ordering_key(self) -> str:
+        ordering = self.request.GET.get('ordering')
+        return ordering if ordering in ROOM_ORDERINGS else self.default_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        queryset, fields = order_rooms(queryset, self.get_ordering_key())
+        paginator = KeysetPaginator(queryset, fields, page_size)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['ordering'] = self.get_ordering_key()
+        return context
@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+# Общая для всех процессов версия справочников (отели, типы комнат, правила)
+REFERENCE_VERSION_KEY = 'room:reference:version'
+REFERENCE_KEY = 'room:reference:{version}:{kind}:{key}'
+
+
+class HotelInfo(NamedTuple):
+    id: int
+    name: str
+
+    def __str__(self):
+        return self.name
+
+
+class TypeRoomInfo(NamedTuple):
+    code: int
+    nomination: str
+    description: str
+
+    def __str__(self):
+        return self.nomination
+
+
+class RegulationInfo(NamedTuple):
+    id: int
+    regulation: str
+
+    def __str__(self):
+        return self.regulation
+
+
+def get_reference_version() -> int:
+    version = cache.get(REFERENCE_VERSION_KEY)
+    if version is None:
+        cache.add(REFERENCE_VERSION_KEY, 1, timeout=None)
+        version = cache.get(REFERENCE_VERSION_KEY, 1)
+    return version
+
+
+def bump_reference_version() -> int:
+    """ Сделать устаревшими справочники во всех процессах (и фрагменты страниц комнат, Room.detail_cache) """
+    try:
+        return cache.incr(REFERENCE_VERSION_KEY)
+    except ValueError:
+        cache.add(REFERENCE_VERSION_KEY, 1, timeout=None)
+        return cache.incr(REFERENCE_VERSION_KEY)
+
+
+class ReferenceCache:
+    """
+    LRU-кэш справочников процесса поверх общего кэша Django
+    Записи действительны, пока не изменилась версия справочников в общем кэше. Версия проверяется
+    не чаще раза в check_interval секунд, изменения в этом процессе сбрасывают кэш сразу
+    """
+
+    def __init__(self):
+        self._entries: 'OrderedDict[Tuple[str, Any], Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked = 0.0
+        self.counters = {'hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    @property
+    def size(self) -> int:
+        return getattr(settings, 'REFERENCE_CACHE_SIZE', 512)
+
+    @property
+    def check_interval(self) -> float:
+        return getattr(settings, 'REFERENCE_VERSION_CHECK_INTERVAL', 1)
+
+    def _current_version(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._checked < self.check_interval:
+                return self._version
+        version = get_reference_version()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._checked = now
+        return version
+
+    def get(self, kind: str, key: Any, load: Callable[[Any], Any]) -> Any:
+        version = self._current_version()
+        with self._lock:
+            if (kind, key) in self._entries:
+                self._entries.move_to_end((kind, key))
+                self.counters['hits'] += 1
+                return self._entries[(kind, key)]
+        shared_key = REFERENCE_KEY.format(version=version, kind=kind, key=key)
+        value = cache.get(shared_key)
+        if value is None:
+            value = load(key)
+            cache.set(shared_key, value, getattr(settings, 'REFERENCE_CACHE_TIMEOUT', 60 * 60 * 24))
+            counter = 'misses'
+        else:
+            counter = 'shared_hits'
+        with self._lock:
+            self.counters[counter] += 1
+            if self._version == version:
+                self._entries[(kind, key)] = value
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        """ Сменить версию справочников и очистить кэш процесса """
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+        bump_reference_version()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self.counters.update(hits=0, shared_hits=0, misses=0)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters, size=len(self._entries))
+
+
+reference_cache = ReferenceCache()
+
+
+def _load_hotel(pk: int) -> Optional[HotelInfo]:
+    hotel = apps.get_model('Room', 'Hotel').objects.filter(pk=pk).values_list('id', 'name').first()
+    return HotelInfo(*hotel) if hotel else None
+
+
+def _load_type(code: int) -> Optional[TypeRoomInfo]:
+    type_room = apps.get_model('Room', 'TypeRoom').objects.filter(pk=code).values_list(
+        'code', 'nomination', 'description').first()
+    return TypeRoomInfo(*type_room) if type_room else None
+
+
+def _load_regulations(type_code: int) -> Tuple[RegulationInfo, ...]:
+    regulations = apps.get_model('Room', 'Regulations').objects.filter(type_room_id=type_code).order_by('pk')
+    return tuple(RegulationInfo(*regulation) for regulation in regulations.values_list('id', 'regulation'))
+
+
+def get_hotel(pk: Optional[int]) -> Optional[HotelInfo]:
+    return reference_cache.get('hotel', pk, _load_hotel) if pk is not None else None
+
+
+def get_type(code: Optional[int]) -> Optional[TypeRoomInfo]:
+    return reference_cache.get('type', code, _load_type) if code is not None else None
+
+
+def get_regulations(type_code: Optional[int]) -> Tuple[RegulationInfo, ...]:
+    """ Правила типа комнаты в порядке добавления """
+    return reference_cache.get('regulations', type_code, _load_regulations) if type_code is not None else ()
@@ -0,0 +1,149 @@
+import datetime
+from typing import List
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from Account.models import CustomUser
+from Room import utils
+from Room.availability_index import bump_availability_version
+from Room.models import BookingHold, Reserve, Room, RoomNight
+
+MAX_GROUP_ROOMS = 50
+
+
+class BookingError(Exception):
+    """ Бронирование невозможно, message - сообщение для пользователя """
+    message = 'Не удалось забронировать номер'
+
+    def __init__(self, message: str = None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+class RoomBusy(BookingError):
+    message = 'К сожалению, этот номер уже забронирован на выбранные даты.'
+
+
+class RoomHeld(RoomBusy):
+    message = 'Номер временно удерживается другим гостем, попробуйте позже.'
+
+
+class ClientBusy(BookingError):
+    message = 'У вас уже есть бронь на выбранные даты.'
+
+
+class RoomLocked(BookingError):
+    message = 'Номер сейчас бронирует другой гость, попробуйте еще раз.'
+
+
+def _lock(room: Room, client: CustomUser) -> Room:
+    """ Заблокировать строки комнаты и клиента до конца транзакции, не дожидаясь чужих блокировок """
+    try:
+        room = Room.objects.select_for_update(nowait=True).get(pk=room.pk)
+        CustomUser.objects.select_for_update(nowait=True).values_list('pk').get(pk=client.pk)
+    except OperationalError:
+        raise RoomLocked()
+    return room
+
+
+def _check_room(room: Room, client: CustomUser, day_in: datetime.date, day_out: datetime.date):
+    if RoomNight.objects.filter(room=room).in_window(day_in, day_out).exists():
+        raise RoomBusy()
+    if BookingHold.objects.active().filter(room=room).exclude(client=client).overlapping(day_in, day_out).exists():
+        raise RoomHeld()
+
+
+def hold_room(client: CustomUser, room: Room, day_in: datetime.date, day_out: datetime.date) -> BookingHold:
+    """
+    Удержать комнату за клиентом на ROOM_BOOKING_HOLD_TTL секунд (страница бронирования перед оплатой)
+    У клиента остается только последнее удержание
+    """
+    if day_in >= day_out:
+        raise BookingError('Дата выезда должна быть позже даты заезда')
+    with transaction.atomic():
+        room = _lock(room, client)
+        _check_room(room, client, day_in, day_out)
+        BookingHold.objects.filter(client=client).delete()
+        return BookingHold.objects.create(
+            room=room, client=client, day_in=day_in, day_out=day_out,
+            expires_at=timezone.now() + datetime.timedelta(seconds=settings.ROOM_BOOKING_HOLD_TTL))
+
+
+def book_room(client: CustomUser, room: Room, day_in: datetime.date, day_out: datetime.date,
+              number_of_guests: int) -> Reserve:
+    """
+    Забронировать комнату в одной транзакции
+    Строки комнаты и клиента блокируются SELECT ... FOR UPDATE NOWAIT: если их уже держит другая бронь,
+    сразу выбрасывается RoomLocked вместо ожидания. Под блокировкой занятость и чужие удержания
+    проверяются заново по БД. Письмо с подтверждением ставится в очередь в той же транзакции
+    """
+    if day_in >= day_out:
+        raise BookingError('Дата выезда должна быть позже даты заезда')
+    if room.number_of_guests is not None and number_of_guests > room.number_of_guests:
+        raise BookingError(f'Номер вмещает не более {room.number_of_guests} гостей')
+    try:
+        with transaction.atomic():
+            room = _lock(room, client)
+            _check_room(room, client, day_in, day_out)
+            if Reserve.objects.filter(client=client).overlapping(day_in, day_out).exists():
+                raise ClientBusy()
+            reserve = Reserve(client=client, room=room, day_in=day_in, day_out=day_out,
+                              number_of_guests=number_of_guests)
+            reserve.save()
+            BookingHold.objects.filter(client=client, room=room).delete()
+            utils.queue_reserve_email(client.first_name, room, day_in, day_out, number_of_guests, client.email)
+    except IntegrityError:
+        # Резерв, созданный в обход сервиса, отклоняется ограничением reserve_room_stay_excl
+        raise RoomBusy()
+    return reserve
+
+
+def book_rooms(client: CustomUser, numbers: List[int], day_in: datetime.date, day_out: datetime.date,
+               number_of_guests: int) -> List[Reserve]:
+    """
+    Групповое бронирование нескольких комнат в одной транзакции: все или ничего
+    Комнаты блокируются одним SELECT ... FOR UPDATE NOWAIT, занятость и чужие удержания всех комнат
+    проверяются одним запросом, резервы и ночи вставляются bulk_create.
+    bulk_create не отправляет сигналы, поэтому версия занятости увеличивается один раз после фиксации.
+    Одно письмо о всей брони ставится в очередь в той же транзакции.
+    Резервы одного клиента на одни даты в групповой брони допустимы
+    """
+    numbers = sorted(set(numbers))
+    if day_in >= day_out:
+        raise BookingError('Дата выезда должна быть позже даты заезда')
+    if not numbers or len(numbers) > MAX_GROUP_ROOMS:
+        raise BookingError(f'В групповой брони может быть от 1 до {MAX_GROUP_ROOMS} комнат')
+    try:
+        with transaction.atomic():
+            try:
+                rooms = list(Room.objects.select_for_update(nowait=True).filter(number__in=numbers).order_by('pk'))
+                CustomUser.objects.select_for_update(nowait=True).values_list('pk').get(pk=client.pk)
+            except OperationalError:
+                raise RoomLocked()
+            missing = set(numbers) - {room.number for room in rooms}
+            if missing:
+                raise BookingError(f'Комнаты не найдены: {", ".join(map(str, sorted(missing)))}')
+            small = [room.number for room in rooms
+                     if room.number_of_guests is not None and room.number_of_guests < number_of_guests]
+            if small:
+                raise BookingError(f'Комнаты вмещают меньше {number_of_guests} гостей: {", ".join(map(str, small))}')
+            busy = list(Room.objects.filter(pk__in=[room.pk for room in rooms]).filter(
+                Exists(RoomNight.objects.filter(room=OuterRef('pk')).in_window(day_in, day_out))
+                | Exists(BookingHold.objects.active().filter(room=OuterRef('pk')).exclude(client=client)
+                         .overlapping(day_in, day_out))).order_by('number').values_list('number', flat=True))
+            if busy:
+                raise RoomBusy(f'Комнаты заняты на выбранные даты: {", ".join(map(str, busy))}')
+            reserves = Reserve.objects.bulk_create(
+                Reserve(client=client, room=room, day_in=day_in, day_out=day_out, number_of_guests=number_of_guests)
+                for room in rooms)
+            RoomNight.objects.fill_many(reserves)
+            BookingHold.objects.filter(client=client, room__in=rooms).delete()
+            utils.queue_group_reserve_email(client.first_name, rooms, day_in, day_out, number_of_guests,
+                                            client.email)
+    except IntegrityError:
+        raise RoomBusy()
+    transaction.on_commit(bump_availability_version)
+    return reserves
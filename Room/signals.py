@@ -0,0 +1,98 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from Room import detail_cache
+from Room.reference import reference_cache
+from Room.availability_index import availability_index, bump_availability_version
+from Room.models import Gallery, Hotel, Regulations, Reserve, Review, Room, TypeRoom
+
+
+@receiver(post_save, sender=Reserve)
+def reserve_saved(sender, instance, **kwargs):
+    """ Обновить индекс занятости после фиксации транзакции с новым/измененным резервом """
+    values = (instance.room_id, instance.client_id, instance.day_in, instance.day_out)
+    transaction.on_commit(lambda: availability_index.apply(instance.pk, values))
+
+
+@receiver(post_delete, sender=Reserve)
+def reserve_deleted(sender, instance, **kwargs):
+    """ Убрать резерв из индекса занятости после фиксации транзакции """
+    reserve_id = instance.pk
+    transaction.on_commit(lambda: availability_index.apply(reserve_id))
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def room_changed(sender, instance, **kwargs):
+    """ Новая/удаленная комната или изменение вместимости делают устаревшими результаты поиска """
+    transaction.on_commit(bump_availability_version)
+    transaction.on_commit(lambda: detail_cache.bump_room_version(instance.number))
+
+
+def room_detail_changed(instance):
+    """ Сделать устаревшей страницу комнаты отзыва/галереи после фиксации транзакции """
+    if instance.room_id is None:
+        return
+    if type(instance).room.is_cached(instance):
+        number = instance.room.number
+    else:
+        number = Room.objects.filter(pk=instance.room_id).values_list('number', flat=True).first()
+    if number is not None:
+        transaction.on_commit(lambda: detail_cache.bump_room_version(number))
+
+
+@receiver(post_save, sender=Gallery)
+@receiver(post_delete, sender=Gallery)
+def gallery_changed(sender, instance, **kwargs):
+    room_detail_changed(instance)
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+@receiver(post_save, sender=TypeRoom)
+@receiver(post_delete, sender=TypeRoom)
+@receiver(post_save, sender=Regulations)
+@receiver(post_delete, sender=Regulations)
+def reference_changed(sender, **kwargs):
+    """
+    Сбросить кэш справочников (Room.reference) и фрагменты страниц всех комнат
+    Версия меняется сразу и повторно после фиксации транзакции: другой процесс мог успеть
+    закэшировать старые данные под промежуточной версией
+    """
+    reference_cache.invalidate()
+    transaction.on_commit(reference_cache.invalidate)
+
+
+def change_room_rating(room_id: int, rating: int, count: int = 1):
+    if room_id is not None:
+        Room.objects.filter(pk=room_id).change_rating(rating, count)
+
+
+@receiver(pre_save, sender=Review)
+def review_saving(sender, instance, raw=False, **kwargs):
+    """ Запомнить комнату и оценку изменяемого отзыва до сохранения """
+    instance._previous_rating = None
+    if not raw and not instance._state.adding:
+        instance._previous_rating = Review.objects.filter(pk=instance.pk).values_list('room_id', 'rating').first()
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, raw=False, **kwargs):
+    """ Учесть новый или измененный отзыв и его оценку в рейтинге комнаты """
+    if raw:
+        return
+    room_detail_changed(instance)
+    previous, current = getattr(instance, '_previous_rating', None), (instance.room_id, instance.rating)
+    if previous == current:
+        return
+    if previous is not None:
+        change_room_rating(*previous, count=-1)
+    change_room_rating(*current)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """ Убрать удаленный отзыв и его оценку из рейтинга комнаты """
+    change_room_rating(instance.room_id, instance.rating, count=-1)
+    room_detail_changed(instance)
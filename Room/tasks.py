@@ -1,10 +1,33 @@
 from celery import shared_task
+from django.conf import settings
+from django.db import DatabaseError
 from datetime import datetime, timedelta
 
-from Room.models import Reserve
+from Room import outbox
+from Room.models import BookingHold, Reserve
 
 
 @shared_task
 def drop_old_reserve():
     """ Удаление броней закончившихся больше полугода назад"""
     return Reserve.objects.filter(day_out__lte=datetime.now().date() - timedelta(days=180)).delete()
+
+
+@shared_task
+def drop_expired_holds():
+    """ Удаление истекших удержаний комнат одним запросом """
+    return BookingHold.objects.expired().delete()
+
+
+@shared_task(bind=True, max_retries=5)
+def send_outbox(self):
+    """ Отправка писем из очереди пачками, пока в ней есть письма, готовые к отправке """
+    try:
+        total = {'sent': 0, 'failed': 0}
+        while True:
+            result = outbox.drain_outbox()
+            total = {key: total[key] + result[key] for key in total}
+            if result['sent'] + result['failed'] < settings.OUTBOX_BATCH_SIZE:
+                return total
+    except DatabaseError as e:
+        raise self.retry(exc=e, countdown=settings.OUTBOX_RETRY_DELAY * 2 ** self.request.retries)
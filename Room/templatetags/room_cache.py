@@ -0,0 +1,41 @@
+from django import template
+
+from Room import detail_cache
+
+register = template.Library()
+
+
+class RoomFragmentNode(template.Node):
+
+    def __init__(self, nodelist, name, number, version):
+        self.nodelist = nodelist
+        self.name = name
+        self.number = number
+        self.version = version
+
+    def render(self, context):
+        timeout = detail_cache.detail_cache_timeout()
+        if not timeout:
+            return self.nodelist.render(context)
+        key = detail_cache.fragment_key(self.name.resolve(context), self.number.resolve(context),
+                                        self.version.resolve(context))
+        content = detail_cache.cache.get(key)
+        detail_cache.count(hit=content is not None)
+        if content is None:
+            content = self.nodelist.render(context)
+            detail_cache.cache.set(key, content, timeout)
+        return content
+
+
+@register.tag
+def room_fragment(parser, token):
+    """
+    Фрагмент страницы комнаты в кэше: {% room_fragment 'имя' номер_комнаты версия %}...{% endroom_fragment %}
+    Объекты, используемые внутри фрагмента, вычисляются только при промахе кэша
+    """
+    bits = token.split_contents()
+    if len(bits) != 4:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' принимает имя фрагмента, номер комнаты и версию")
+    nodelist = parser.parse(('endroom_fragment',))
+    parser.delete_first_token()
+    return RoomFragmentNode(nodelist, *(parser.compile_filter(bit) for bit in bits[1:]))
@@ -0,0 +1,420 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Room.api.rows import ReserveRows, RoomRows
+from Room.api.serializers import MAX_BATCH_ROOMS, AllReservesSerializer, AllRoomSerializer
+from Room.models import Room, Hotel, TypeRoom, Reserve, RoomNight, OutboxMessage, Gallery, Regulations, Review
+from Room.reference import reference_cache
+from settings.storage_backends import MediaStorage
+
+
+class CalendarApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        user = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                    first_name='Иван', last_name='Иванов')
+        room1 = Room.objects.create(hotel=hotel, number=101, type=type_room, price=1000, number_of_guests=5)
+        room2 = Room.objects.create(hotel=hotel, number=102, type=type_room, price=1000, number_of_guests=5)
+        Room.objects.create(hotel=hotel, number=103, type=type_room, price=1000, number_of_guests=5)
+        Reserve.objects.create(client=user, room=room1, day_in='2022-08-30', day_out='2022-09-02', number_of_guests=2)
+        Reserve.objects.create(client=user, room=room1, day_in='2022-09-29', day_out='2022-10-03', number_of_guests=2)
+        Reserve.objects.create(client=user, room=room2, day_in='2022-09-10', day_out='2022-09-12', number_of_guests=2)
+
+    def test_room_calendar(self):
+        """ Ночи резервов, начинающихся и заканчивающихся за пределами месяца, обрезаются по его границам """
+        resp = self.client.get(reverse('api_room_calendar', kwargs={'number': 101}), data={'month': '2022-09'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data['days']), 30)
+        self.assertEqual(resp.data['days'][0], datetime.date(2022, 9, 1))
+        self.assertEqual(resp.data['rooms']['101'], [1] + [0] * 27 + [1, 1])
+        self.assertEqual(list(resp.data['rooms']), ['101'])
+
+    def test_hotel_calendar(self):
+        """ Календарь отеля строится одним запросом к резервам """
+        with self.assertNumQueries(4):
+            resp = self.client.get(reverse('api_calendar'), data={'month': '2022-09'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(list(resp.data['rooms']), ['101', '102', '103'])
+        self.assertEqual(resp.data['rooms']['102'], [0] * 9 + [1, 1] + [0] * 19)
+        self.assertEqual(resp.data['rooms']['103'], [0] * 30)
+
+    def test_bad_month(self):
+        resp = self.client.get(reverse('api_calendar'), data={'month': '09.2022'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_not_modified(self):
+        """ Повторный запрос с ETag возвращает 304, изменение резервов месяца меняет ETag """
+        url = reverse('api_room_calendar', kwargs={'number': 102})
+        resp = self.client.get(url, data={'month': '2022-09'})
+        self.assertTrue(resp.has_header('Last-Modified'))
+        self.assertIn('max-age=60', resp['Cache-Control'])
+        etag = resp['ETag']
+        with self.assertNumQueries(2):
+            resp = self.client.get(url, data={'month': '2022-09'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        Reserve.objects.get(room__number=102).delete()
+        resp = self.client.get(url, data={'month': '2022-09'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['rooms']['102'], [0] * 30)
+
+
+class RoomListQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        hotel = Hotel.objects.create(name='Test hotel name')
+        types = [TypeRoom.objects.create(code=code, nomination=f'Тип {code}') for code in (1, 2)]
+        for type_room in types:
+            Regulations.objects.create(type_room=type_room, regulation='Не курить')
+        user = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                    first_name='Иван', last_name='Иванов')
+        for number in range(101, 113):
+            room = Room.objects.create(hotel=hotel, number=number, type=types[number % 2], price=1000,
+                                       number_of_guests=2)
+            Gallery.objects.create(room=room, **{f'slider_photo{i}': f'rooms/{number}/{i}.jpg' for i in range(1, 5)})
+            Review.objects.create(room=room, rating=number % 5 + 1, author=user)
+        today = datetime.date.today()
+        for number, start, end in ((101, 0, 3), (101, 3, 5), (102, 1, 2)):
+            Reserve.objects.create(client=user, room=Room.objects.get(number=number),
+                                   day_in=today + datetime.timedelta(days=start),
+                                   day_out=today + datetime.timedelta(days=end), number_of_guests=2)
+
+    def setUp(self):
+        # Справочники (отели, типы, правила) после первого обращения читаются из кэша процесса
+        reference_cache.clear()
+        for room in Room.objects.all():
+            room.get_hotel_info(), room.get_type_info(), room.get_regulations_list()
+
+    def test_api_all_rooms(self):
+        """ Страница API списка комнат любого размера и с любой сортировкой - один запрос и два запроса версии """
+        for page_size in (1, 5, 12):
+            for ordering in ('number', 'rating'):
+                with self.assertNumQueries(3):
+                    resp = self.client.get(reverse('api_all_rooms'),
+                                           data={'page_size': page_size, 'ordering': ordering})
+                self.assertEqual(len(resp.data['results']), page_size)
+
+    def test_next_free_date(self):
+        """ Ближайшая свободная ночь: после цепочки смежных резервов или сегодня """
+        today = datetime.date.today()
+        resp = self.client.get(reverse('api_all_rooms'), data={'page_size': 3})
+        self.assertEqual([room['next_free_date'] for room in resp.data['results']],
+                         [str(today + datetime.timedelta(days=5)), str(today), str(today)])
+
+    def test_html_all_rooms(self):
+        """ HTML-список комнат - один запрос на любую страницу и запрос версии """
+        with self.assertNumQueries(2):
+            cursor = self.client.get(reverse('all_rooms')).context['page_obj'].next_cursor
+        with self.assertNumQueries(2):
+            resp = self.client.get(reverse('all_rooms'), data={'cursor': cursor})
+        self.assertEqual(len(resp.context['rooms']), 6)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('all_rooms'), data={'ordering': 'rating'})
+
+    def test_detail_room(self):
+        """ Комната с галереей и отзывами - фиксированное число запросов, правила типа - из кэша справочников """
+        with self.assertNumQueries(3):
+            resp = self.client.get(reverse('api_detail_room', kwargs={'number': 101}))
+        self.assertEqual([regulation['regulation'] for regulation in resp.data['regulations']], ['Не курить'])
+        self.assertEqual(resp.data['average_rating'], Room.objects.get(number=101).rating_avg)
+        self.assertEqual((resp.data['hotel_name'], resp.data['type_name']), ('Test hotel name', 'Тип 2'))
+
+    @mock.patch.object(MediaStorage, 'url', lambda storage, name: f'/media/{name}')
+    def test_batch_rooms(self):
+        """ Комнаты по списку номеров - два запроса на любое число комнат: комнаты с галереей и отзывы """
+        with self.assertNumQueries(2):
+            resp = self.client.get(reverse('api_rooms'), data={'numbers': '103, 101,999,101'})
+        self.assertEqual([room['number'] for room in resp.data['rooms']], [103, 101])
+        self.assertEqual(resp.data['missing'], [999])
+        self.assertEqual(resp.data['rooms'][1], self.client.get(reverse('api_detail_room', kwargs={'number': 101})).data)
+        with self.assertNumQueries(2):
+            resp = self.client.post(reverse('api_rooms'), data={'numbers': list(range(101, 113))},
+                                    content_type='application/json')
+        self.assertEqual(len(resp.data['rooms']), 12)
+        self.assertEqual(sum(len(room['reviews']) for room in resp.data['rooms']), 12)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api_rooms'), data={'numbers': '101,102', 'expand': 'gallery'})
+        for numbers in ('', 'a,b', ','.join(map(str, range(MAX_BATCH_ROOMS + 1)))):
+            self.assertEqual(self.client.get(reverse('api_rooms'), data={'numbers': numbers}).status_code, 400)
+        for data in ([101], 101, 'numbers'):
+            resp = self.client.post(reverse('api_rooms'), data=data, content_type='application/json')
+            self.assertEqual(resp.status_code, 400)
+
+    def test_sparse_fields(self):
+        """ ?fields= и ?expand= сокращают ответ, незапрошенные связанные данные не выбираются """
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse('api_all_rooms'), data={'fields': 'number, price', 'page_size': 3})
+        self.assertEqual(resp.data['results'][0], {'number': 101, 'price': 1000})
+        self.assertNotIn('Room_gallery', queries[-1]['sql'])
+        self.assertNotIn('Room_roomnight', queries[-1]['sql'])
+
+        resp = self.client.get(reverse('api_all_rooms'), data={'expand': '', 'page_size': 1})
+        self.assertNotIn('gallery', resp.data['results'][0])
+        self.assertIn('next_free_date', resp.data['results'][0])
+
+        url = reverse('api_detail_room', kwargs={'number': 101})
+        with self.assertNumQueries(2):
+            resp = self.client.get(url, data={'expand': 'regulations'})
+        self.assertEqual([regulation['regulation'] for regulation in resp.data['regulations']], ['Не курить'])
+        self.assertFalse({'gallery', 'reviews'} & set(resp.data))
+        resp = self.client.get(url, data={'fields': 'number,reviews'})
+        self.assertEqual(set(resp.data), {'number', 'reviews'})
+        self.assertEqual(len(resp.data['reviews']), 1)
+
+    @mock.patch.object(MediaStorage, 'url', lambda storage, name: f'/media/{name}')
+    def test_fast_rows(self):
+        """ Быстрый путь списков (.values()) отдает то же, что и ModelSerializer """
+        Gallery.objects.filter(room__number=101).delete()
+        request = RequestFactory().get('/api/all_rooms')
+        rooms = Room.objects.with_gallery().with_next_free_date().order_by('number')
+        self.assertEqual(RoomRows(request).to_representation(RoomRows(request).values(rooms)),
+                         AllRoomSerializer(rooms, many=True, context={'request': request}).data)
+        reserves = Reserve.objects.order_by('id')
+        self.assertEqual(ReserveRows().to_representation(ReserveRows().values(reserves)),
+                         AllReservesSerializer(reserves, many=True).data)
+
+        resp = self.client.get(reverse('api_all_rooms'), data={'ordering': 'price', 'page_size': 5})
+        resp = self.client.get(resp.data['next'])
+        self.assertEqual([room['number'] for room in resp.data['results']], list(range(106, 111)))
+
+    def test_not_modified(self):
+        """ Неизмененный ресурс - 304 после запросов версии, без выборки и сериализации """
+        user = get_user_model().objects.get()
+        self.client.force_login(user)
+        urls = {reverse('api_all_rooms'): 2, reverse('api_detail_room', kwargs={'number': 101}): 1,
+                reverse('api_all_reserves'): 1, reverse('all_rooms'): 1}
+        etags = {}
+        for url, queries in urls.items():
+            etags[url] = self.client.get(url)['ETag']
+            with self.assertNumQueries(queries + 2):  # + сессия и пользователь
+                resp = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(resp.status_code, 304)
+        Review.objects.create(room=Room.objects.get(number=101), rating=1, author=user)
+        for url in urls:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code,
+                             304 if url == reverse('api_all_reserves') else 200)
+        reserve = Reserve.objects.filter(client=user).first()
+        reserve.number_of_guests = 1
+        reserve.save()
+        self.assertEqual(self.client.get(reverse('api_all_reserves'),
+                                         HTTP_IF_NONE_MATCH=etags[reverse('api_all_reserves')]).status_code, 200)
+        self.client.force_login(get_user_model().objects.create_user(email='test2@test.ru', password='Some_password123'))
+        self.assertEqual(self.client.get(reverse('all_rooms'),
+                                         HTTP_IF_NONE_MATCH=etags[reverse('all_rooms')]).status_code, 200)
+
+
+class ReserveApiQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        hotel = Hotel.objects.create(name='Test hotel name')
+        room = Room.objects.create(hotel=hotel, number=101, price=1000, number_of_guests=5)
+        cls.user = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                        first_name='Иван', last_name='Иванов')
+        other = get_user_model().objects.create_user(email='test2@test.ru', password='Some_password123',
+                                                     first_name='Петр', last_name='Петров')
+        day_in = datetime.date.today() + datetime.timedelta(days=10)
+        cls.reserve = Reserve.objects.create(client=cls.user, room=room, day_in=day_in,
+                                             day_out=day_in + datetime.timedelta(days=2), number_of_guests=2)
+        cls.other_reserve = Reserve.objects.create(client=other, room=room, day_in='2022-09-01',
+                                                   day_out='2022-09-03', number_of_guests=2)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_cancel_info(self):
+        """ Резерв загружается один раз за запрос, чужой резерв - 404 """
+        with self.assertNumQueries(3):
+            resp = self.client.get(reverse('api_cancel', kwargs={'pk': self.reserve.pk}))
+        self.assertIn('2000 рублей', resp.data['message'])
+        resp = self.client.get(reverse('api_cancel', kwargs={'pk': self.other_reserve.pk}))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_add_review(self):
+        """ Отзыв добавляется с одной загрузкой резерва, повторный отзыв к резерву - 404 """
+        url = reverse('api_add_review', kwargs={'pk': self.reserve.pk})
+        with self.assertNumQueries(5):
+            resp = self.client.post(url, data={'rating': 4, 'body': 'Отлично'})
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(Room.objects.get(number=101).rating_count, 1)
+        resp = self.client.post(url, data={'rating': 4, 'body': 'Отлично'})
+        self.assertEqual(resp.status_code, 404)
+
+
+class ReviewSearchApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        hotel = Hotel.objects.create(name='Test hotel name')
+        user = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                    first_name='Иван', last_name='Иванов')
+        room1 = Room.objects.create(hotel=hotel, number=101, price=1000, number_of_guests=5)
+        room2 = Room.objects.create(hotel=hotel, number=102, price=1000, number_of_guests=5)
+        Review.objects.create(room=room1, rating=5, author=user, body='Чистый номер, вежливый персонал')
+        Review.objects.create(room=room2, rating=2, author=user, body='Шумно. Номер грязный, персонал грубый, '
+                                                                      'персонала на ресепшене не было')
+        Review.objects.create(room=room2, rating=4, author=user, body='Хороший завтрак')
+
+    def test_ranked(self):
+        """ Поиск учитывает словоформы, более релевантные отзывы идут первыми """
+        resp = self.client.get(reverse('api_review_search'), data={'q': 'персонала'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([review['room'] for review in resp.data], [102, 101])
+        self.assertGreater(resp.data[0]['rank'], resp.data[1]['rank'])
+
+    def test_websearch_syntax(self):
+        resp = self.client.get(reverse('api_review_search'), data={'q': 'номер -грязный'})
+        self.assertEqual([review['body'] for review in resp.data], ['Чистый номер, вежливый персонал'])
+        resp = self.client.get(reverse('api_review_search'), data={'q': 'завтрак', 'limit': 'много'})
+        self.assertEqual(len(resp.data), 1)
+
+    def test_empty_query(self):
+        resp = self.client.get(reverse('api_review_search'), data={'q': ' '})
+        self.assertEqual(resp.status_code, 400)
+
+
+class FlexibleSearchApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        cls.user = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                        first_name='Иван', last_name='Иванов')
+        other = get_user_model().objects.create_user(email='test2@test.ru', password='Some_password123',
+                                                     first_name='Петр', last_name='Петров')
+        room1 = Room.objects.create(hotel=hotel, number=101, type=type_room, price=1000, number_of_guests=5)
+        room2 = Room.objects.create(hotel=hotel, number=102, type=type_room, price=1500, number_of_guests=5)
+        Room.objects.create(hotel=hotel, number=103, type=type_room, price=1000, number_of_guests=1)
+        Reserve.objects.create(client=other, room=room1, day_in='2022-09-02', day_out='2022-09-04', number_of_guests=2)
+        Reserve.objects.create(client=cls.user, room=room2, day_in='2022-09-06', day_out='2022-09-07',
+                               number_of_guests=2)
+
+    def search(self, **params):
+        data = {'nights': '2', 'earliest_day_in': '2022-09-01', 'latest_day_out': '2022-09-08',
+                'number_of_guests': '2'}
+        data.update(params)
+        return self.client.get(reverse('api_list_free_rooms'), data=data)
+
+    def test_windows(self):
+        """ Для каждого периода возвращаются номера свободных комнат, данные комнат и стоимость - один раз """
+        resp = self.search()
+        self.assertEqual(resp.status_code, 200)
+        windows = resp.data['windows']
+        self.assertEqual([window['day_in'] for window in windows],
+                         [datetime.date(2022, 9, day) for day in range(1, 7)])
+        rooms = {window['day_in'].day: window['rooms'] for window in windows}
+        self.assertEqual(rooms, {1: [102], 2: [102], 3: [102], 4: [101, 102], 5: [101], 6: [101]})
+        self.assertEqual(windows[0]['day_out'], datetime.date(2022, 9, 3))
+        self.assertEqual(sorted(resp.data['rooms']), [101, 102])
+        self.assertEqual(resp.data['rooms'][102]['number'], 102)
+        self.assertEqual(resp.data['rooms'][102]['full_price'], 3000)
+
+    def test_user_reserves_skip_windows(self):
+        """ Периоды, пересекающиеся с резервами пользователя, не предлагаются """
+        self.client.login(email='test@test.ru', password='Some_password123')
+        resp = self.search()
+        self.assertEqual([window['day_in'].day for window in resp.data['windows']], [1, 2, 3, 4])
+
+    def test_single_reserve_query(self):
+        """ Количество запросов к резервам не зависит от количества периодов """
+        self.client.login(email='test@test.ru', password='Some_password123')
+        with CaptureQueriesContext(connection) as short:
+            self.search(latest_day_out='2022-09-05')
+        with CaptureQueriesContext(connection) as long:
+            self.search(latest_day_out='2022-10-30')
+        count = lambda context: len([query for query in context.captured_queries
+                                     if '"Room_reserve"' in query['sql']])
+        self.assertEqual(count(short), 2)
+        self.assertEqual(count(long), 2)
+
+    def test_bad_params(self):
+        self.assertEqual(self.search(nights='').status_code, 400)
+        self.assertEqual(self.search(nights='10').status_code, 400)
+        self.assertEqual(self.search(latest_day_out='2023-09-01').status_code, 400)
+        self.assertEqual(self.search(earliest_day_in='завтра').status_code, 400)
+
+
+class BookRoomApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                             first_name='Иван', last_name='Иванов')
+        Room.objects.create(hotel=hotel, number=101, type=type_room, price=1000, number_of_guests=2)
+
+    def book(self, day_in='2022-09-17', day_out='2022-09-19', number_of_guests=2):
+        return self.client.post(reverse('api_book_room', kwargs={'number': 101}),
+                                data={'day_in': day_in, 'day_out': day_out, 'number_of_guests': number_of_guests})
+
+    def test_book(self):
+        self.assertEqual(self.book().status_code, 403)
+        self.client.login(email='test@test.ru', password='Some_password123')
+        resp = self.book()
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['day_in'], '2022-09-17')
+        resp = self.book(day_in='2022-09-18', day_out='2022-09-20')
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(Reserve.objects.count(), 1)
+
+    def test_bad_request(self):
+        self.client.login(email='test@test.ru', password='Some_password123')
+        self.assertEqual(self.book(day_out='2022-09-17').status_code, 400)
+        self.assertEqual(self.book(number_of_guests=5).status_code, 400)
+        self.assertEqual(self.client.post(reverse('api_book_room', kwargs={'number': 999})).status_code, 404)
+
+
+class GroupBookApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        user = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                    first_name='Иван', last_name='Иванов')
+        for number in range(101, 106):
+            Room.objects.create(hotel=hotel, number=number, type=type_room, price=1000, number_of_guests=2)
+        Reserve.objects.create(client=user, room=Room.objects.get(number=105), day_in='2022-09-18',
+                               day_out='2022-09-20', number_of_guests=2)
+
+    def book(self, rooms, number_of_guests=2):
+        return self.client.post(reverse('api_group_book'),
+                                data={'rooms': rooms, 'day_in': '2022-09-17', 'day_out': '2022-09-19',
+                                      'number_of_guests': number_of_guests}, content_type='application/json')
+
+    def test_group_book(self):
+        """ Все комнаты бронируются одним запросом, письмо одно на всю бронь """
+        self.client.login(email='test@test.ru', password='Some_password123')
+        resp = self.book([101, 102, 103])
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(len(resp.data), 3)
+        self.assertEqual(RoomNight.objects.filter(room__number__in=[101, 102, 103]).count(), 6)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+        self.assertIn('101, 102, 103', OutboxMessage.objects.get().body)
+
+    def test_all_or_nothing(self):
+        """ Если одна комната занята, не бронируется ни одна """
+        self.client.login(email='test@test.ru', password='Some_password123')
+        resp = self.book([101, 102, 105])
+        self.assertEqual(resp.status_code, 409)
+        self.assertIn('105', resp.data['message'])
+        self.assertEqual(Reserve.objects.count(), 1)
+
+    def test_bad_request(self):
+        self.client.login(email='test@test.ru', password='Some_password123')
+        self.assertEqual(self.book([101, 999]).status_code, 400)
+        self.assertEqual(self.book([101], number_of_guests=3).status_code, 400)
+        self.assertEqual(self.book([]).status_code, 400)
+        self.assertEqual(self.book(list(range(60))).status_code, 400)
+
+    def test_room_without_capacity(self):
+        """ Комнаты без указанной вместимости бронируются на любое количество гостей """
+        Room.objects.filter(number=103).update(number_of_guests=None)
+        self.client.login(email='test@test.ru', password='Some_password123')
+        self.assertEqual(self.book([102, 103], number_of_guests=3).data['message'],
+                         'Комнаты вмещают меньше 3 гостей: 102')
+        self.assertEqual(self.book([103], number_of_guests=3).status_code, 201)
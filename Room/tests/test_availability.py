@@ -0,0 +1,178 @@
+import datetime
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Room.availability import get_free_room_ids, get_free_rooms, get_free_rooms_by_window, search_free_rooms, \
+    user_has_overlap
+from Room.availability_index import bump_availability_version
+from Room.models import Room, Hotel, TypeRoom, Reserve
+from Room.services import hold_room
+
+
+class FreeRoomsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        cls.hotel = Hotel.objects.create(name='Test hotel name')
+        cls.user1 = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                         first_name='Иван', last_name='Иванов')
+        cls.user2 = get_user_model().objects.create_user(email='test2@test.ru', password='Some_password123',
+                                                         first_name='Петр', last_name='Петров')
+        cls.room1 = Room.objects.create(hotel=cls.hotel, number=101, type=cls.type_room, price=1000,
+                                        number_of_guests=2)
+        cls.room2 = Room.objects.create(hotel=cls.hotel, number=102, type=cls.type_room, price=1000,
+                                        number_of_guests=4)
+        cls.room3 = Room.objects.create(hotel=cls.hotel, number=103, type=cls.type_room, price=1000,
+                                        number_of_guests=4)
+        Reserve.objects.create(client=cls.user1, room=cls.room2, day_in='2022-09-17', day_out='2022-09-19',
+                               number_of_guests=2)
+
+    def free_numbers(self, day_in, day_out, number_of_guests=1, user=None):
+        return [room.number for room in get_free_rooms(day_in, day_out, number_of_guests, user=user)]
+
+    def test_overlapping_reserve_excludes_room(self):
+        """ Комната с пересекающимся резервом не попадает в список """
+        self.assertEqual(self.free_numbers(datetime.date(2022, 9, 18), datetime.date(2022, 9, 20)), [101, 103])
+        self.assertEqual(self.free_numbers(datetime.date(2022, 9, 10), datetime.date(2022, 9, 25)), [101, 103])
+
+    def test_adjacent_dates_are_free(self):
+        """ Выезд одного гостя и заезд другого в один день не считаются пересечением """
+        self.assertEqual(self.free_numbers(datetime.date(2022, 9, 19), datetime.date(2022, 9, 21)), [101, 102, 103])
+        self.assertEqual(self.free_numbers(datetime.date(2022, 9, 15), datetime.date(2022, 9, 17)), [101, 102, 103])
+
+    def test_number_of_guests(self):
+        """ Комнаты с меньшей вместимостью не попадают в список """
+        self.assertEqual(self.free_numbers(datetime.date(2022, 10, 1), datetime.date(2022, 10, 2), 3), [102, 103])
+
+    def test_user_conflict(self):
+        """ Пользователь с резервом на эти даты получает пустой список, другой пользователь - нет """
+        day_in, day_out = datetime.date(2022, 9, 18), datetime.date(2022, 9, 20)
+        self.assertTrue(user_has_overlap(self.user1, day_in, day_out))
+        self.assertFalse(user_has_overlap(self.user2, day_in, day_out))
+        self.assertEqual(self.free_numbers(day_in, day_out, user=self.user1), [])
+        self.assertEqual(self.free_numbers(day_in, day_out, user=self.user2), [101, 103])
+
+    def test_held_room(self):
+        """ Удержанная комната не видна другим клиентам в поиске, в том числе по гибким датам """
+        day_in, day_out = datetime.date(2022, 10, 1), datetime.date(2022, 10, 3)
+        hold_room(self.user1, self.room1, day_in, day_out)
+        self.assertEqual(self.free_numbers(day_in, day_out, user=self.user2), [102, 103])
+        self.assertEqual(self.free_numbers(day_in, day_out, user=self.user1), [101, 102, 103])
+        windows = get_free_rooms_by_window(day_in, day_out + datetime.timedelta(days=1), 1, 1, user=self.user2)
+        self.assertEqual([[room.number for room in rooms] for _, _, rooms in windows],
+                         [[102, 103], [102, 103], [101, 102, 103]])
+
+    def test_constant_number_of_queries(self):
+        """ Поиск выполняется одним запросом независимо от количества комнат """
+        day_in, day_out = datetime.date(2022, 9, 18), datetime.date(2022, 9, 20)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.free_numbers(day_in, day_out, user=self.user2)), 2)
+        for number in range(200, 300):
+            room = Room.objects.create(hotel=self.hotel, number=number, type=self.type_room, price=500,
+                                       number_of_guests=2)
+            if number % 2:
+                Reserve.objects.create(client=self.user1, room=room, day_in='2022-09-15', day_out='2022-09-19',
+                                       number_of_guests=2)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.free_numbers(day_in, day_out, user=self.user2)), 52)
+
+
+@override_settings(ROOM_SEARCH_CACHE_TIMEOUT=0)
+class ListFreeRoomsQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        cls.hotel = Hotel.objects.create(name='Test hotel name')
+        cls.user = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                        first_name='Иван', last_name='Иванов')
+
+    def create_rooms(self, count):
+        Room.objects.bulk_create(
+            Room(hotel=self.hotel, number=number, type=self.type_room, price=1000, number_of_guests=5)
+            for number in range(Room.objects.count(), Room.objects.count() + count))
+
+    def count_reserve_queries(self):
+        self.client.login(email='test@test.ru', password='Some_password123')
+        with CaptureQueriesContext(connection) as context:
+            resp = self.client.get(reverse('list_free_rooms'),
+                                   data={'number_of_guests': '3', 'day_in': '2022-10-25', 'day_out': '2022-10-30'})
+        self.assertEqual(resp.status_code, 200)
+        return len([query for query in context.captured_queries
+                    if '"Room_reserve"' in query['sql'] or '"Room_roomnight"' in query['sql']])
+
+    def test_reserve_queries_do_not_grow(self):
+        """ Количество запросов к резервам и занятым ночам не зависит от количества комнат """
+        self.create_rooms(5)
+        small = self.count_reserve_queries()
+        self.create_rooms(50)
+        self.assertEqual(self.count_reserve_queries(), small)
+
+
+@override_settings(ROOM_SEARCH_CACHE_TIMEOUT=60)
+class SearchCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        cls.user1 = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                         first_name='Иван', last_name='Иванов')
+        cls.user2 = get_user_model().objects.create_user(email='test2@test.ru', password='Some_password123',
+                                                         first_name='Петр', last_name='Петров')
+        cls.room1 = Room.objects.create(hotel=hotel, number=101, type=type_room, price=1000, number_of_guests=4)
+        cls.room2 = Room.objects.create(hotel=hotel, number=102, type=type_room, price=1000, number_of_guests=4)
+        Reserve.objects.create(client=cls.user1, room=cls.room2, day_in='2022-09-17', day_out='2022-09-19',
+                               number_of_guests=2)
+        cls.day_in, cls.day_out = datetime.date(2022, 9, 18), datetime.date(2022, 9, 20)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_until_version_changes(self):
+        """ Повторный поиск не вычисляется заново, пока не изменилась версия занятости """
+        self.assertEqual(get_free_room_ids(self.day_in, self.day_out, 2), [self.room1.pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_free_room_ids(self.day_in, self.day_out, 2), [self.room1.pk])
+        Reserve.objects.all().delete()
+        self.assertEqual(get_free_room_ids(self.day_in, self.day_out, 2), [self.room1.pk])
+        bump_availability_version()
+        self.assertEqual(get_free_room_ids(self.day_in, self.day_out, 2), [self.room1.pk, self.room2.pk])
+
+    def test_holds_outside_cache(self):
+        """ Удержание комнаты учитывается и при ответе из кэша """
+        self.assertEqual(list(search_free_rooms(self.day_in, self.day_out, 2, user=self.user2)), [self.room1])
+        hold_room(self.user1, self.room1, self.day_in, self.day_out)
+        self.assertEqual(list(search_free_rooms(self.day_in, self.day_out, 2, user=self.user2)), [])
+
+    def test_user_check_outside_cache(self):
+        """ Конфликт с резервами пользователя проверяется для каждого пользователя отдельно """
+        self.assertEqual(list(search_free_rooms(self.day_in, self.day_out, 2, user=self.user2)), [self.room1])
+        with self.assertNumQueries(1):
+            self.assertEqual(list(search_free_rooms(self.day_in, self.day_out, 2, user=self.user1)), [])
+
+    def test_single_flight(self):
+        """ Одновременные одинаковые запросы вычисляются один раз """
+        calls = []
+
+        def slow_search(*args, **kwargs):
+            calls.append(args)
+            time.sleep(0.2)
+            return mock.Mock(**{'values_list.return_value': [self.room1.pk]})
+
+        results = []
+        with mock.patch('Room.availability.get_free_rooms', side_effect=slow_search):
+            threads = [threading.Thread(target=lambda: results.append(
+                get_free_room_ids(self.day_in, self.day_out, 3))) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[self.room1.pk]] * 5)
@@ -0,0 +1,113 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from Room.availability import get_free_rooms, user_has_overlap
+from Room.availability_index import IntervalIndex, availability_index, bump_availability_version
+from Room.models import Room, Hotel, TypeRoom, Reserve
+
+
+class IntervalIndexTest(TestCase):
+
+    def test_overlaps(self):
+        """ Пересечение полуинтервалов: соседние периоды не пересекаются """
+        index = IntervalIndex()
+        index.add(1, 10, 12, 1)
+        index.add(1, 20, 25, 2)
+        self.assertTrue(index.overlaps(1, 11, 13))
+        self.assertTrue(index.overlaps(1, 5, 30))
+        self.assertTrue(index.overlaps(1, 21, 22))
+        self.assertFalse(index.overlaps(1, 12, 20))
+        self.assertFalse(index.overlaps(1, 8, 10))
+        self.assertFalse(index.overlaps(2, 10, 12))
+
+    def test_long_interval_before_short_ones(self):
+        """ Длинный период, начинающийся задолго до запроса, тоже находится """
+        index = IntervalIndex()
+        index.add(1, 0, 100, 1)
+        for day in range(1, 50):
+            index.add(1, day, day + 1, day + 1)
+        self.assertTrue(index.overlaps(1, 80, 81))
+
+    def test_remove(self):
+        index = IntervalIndex()
+        index.add(1, 10, 12, 1)
+        index.add(2, 10, 12, 2)
+        index.remove(1, 10, 12, 1)
+        self.assertFalse(index.overlaps(1, 10, 12))
+        self.assertEqual(index.busy_keys(10, 12), {2})
+        self.assertEqual(len(index), 1)
+
+
+@override_settings(ROOM_AVAILABILITY_INDEX=True)
+class AvailabilityIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        cls.user1 = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                         first_name='Иван', last_name='Иванов')
+        cls.user2 = get_user_model().objects.create_user(email='test2@test.ru', password='Some_password123',
+                                                         first_name='Петр', last_name='Петров')
+        cls.rooms = [Room.objects.create(hotel=hotel, number=number, type=type_room, price=1000, number_of_guests=4)
+                     for number in (101, 102, 103)]
+        Reserve.objects.create(client=cls.user1, room=cls.rooms[1], day_in='2022-09-17', day_out='2022-09-19',
+                               number_of_guests=2)
+
+    def setUp(self):
+        # Данные тестов меняются в откатываемых транзакциях - индекс нужно перестроить
+        bump_availability_version()
+
+    def test_same_result_as_database(self):
+        """ Результат поиска по индексу совпадает с поиском в БД """
+        day_in, day_out = datetime.date(2022, 9, 18), datetime.date(2022, 9, 20)
+        from_index = [room.number for room in get_free_rooms(day_in, day_out, 1, user=self.user2)]
+        with self.settings(ROOM_AVAILABILITY_INDEX=False):
+            from_database = [room.number for room in get_free_rooms(day_in, day_out, 1, user=self.user2)]
+        self.assertEqual(from_index, [101, 103])
+        self.assertEqual(from_index, from_database)
+        self.assertFalse(get_free_rooms(day_in, day_out, 1, user=self.user1).exists())
+
+    def test_no_reserve_queries_when_fresh(self):
+        """ Построенный индекс отвечает на вопросы о пересечениях без запросов к БД """
+        day_in, day_out = datetime.date(2022, 9, 18), datetime.date(2022, 9, 20)
+        with self.assertNumQueries(1):
+            self.assertTrue(user_has_overlap(self.user1, day_in, day_out))
+        with self.assertNumQueries(0):
+            self.assertFalse(user_has_overlap(self.user2, day_in, day_out))
+            self.assertEqual(availability_index.busy_rooms(day_in, day_out), {self.rooms[1].pk})
+
+    def test_incremental_update_from_signals(self):
+        """ Сохранение и удаление резерва обновляют индекс без перестроения """
+        day_in, day_out = datetime.date(2022, 10, 1), datetime.date(2022, 10, 3)
+        availability_index.ensure_fresh()
+        version = availability_index.version
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve = Reserve.objects.create(client=self.user2, room=self.rooms[0], day_in='2022-10-01',
+                                             day_out='2022-10-05', number_of_guests=2)
+        with self.assertNumQueries(0):
+            self.assertEqual(availability_index.busy_rooms(day_in, day_out), {self.rooms[0].pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(availability_index.busy_rooms(day_in, day_out), set())
+        self.assertEqual(availability_index.version, version + 2)
+
+    def test_rebuild_when_other_worker_changed_reserves(self):
+        """ Если версию увеличил другой воркер, индекс перестраивается при следующем обращении """
+        availability_index.ensure_fresh()
+        Reserve.objects.create(client=self.user2, room=self.rooms[2], day_in='2022-10-01', day_out='2022-10-05',
+                               number_of_guests=2)
+        bump_availability_version()
+        self.assertIn(self.rooms[2].pk,
+                      availability_index.busy_rooms(datetime.date(2022, 10, 2), datetime.date(2022, 10, 3)))
+
+    def test_rebuild_command(self):
+        """ Команда перестраивает индекс и сообщает занимаемую память """
+        out = StringIO()
+        call_command('rebuild_availability_index', stdout=out)
+        self.assertIn('резервов 1', out.getvalue())
+        self.assertGreater(availability_index.stats()['memory'], 0)
@@ -0,0 +1,186 @@
+import base64
+import datetime
+import json
+import random
+import sys
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from Account.tokens import issue_token
+from Room.api.renderers import FastJSONRenderer, orjson
+from Room.api.rows import RoomRows
+from Room.api.serializers import AllRoomSerializer
+from Room.models import Room, Hotel, TypeRoom, Reserve, RoomNight, Gallery
+from Room.services import BookingError, RoomLocked, book_room, book_rooms
+from settings.storage_backends import MediaStorage
+
+
+class BookingContentionBenchmark(TransactionTestCase):
+    """ Одновременные бронирования одной комнаты из нескольких потоков """
+    threads = 8
+    attempts = 25
+
+    def setUp(self):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        self.room = Room.objects.create(hotel=hotel, number=101, type=type_room, price=1000, number_of_guests=2)
+        self.users = [get_user_model().objects.create_user(email=f'test{i}@test.ru', password='Some_password123',
+                                                           first_name='Иван', last_name='Иванов')
+                      for i in range(self.threads)]
+
+    def hammer(self, user, seed, results, lock):
+        """ Бронировать случайные периоды одной комнаты, повторяя попытку при блокировке """
+        rng = random.Random(seed)
+        try:
+            for _ in range(self.attempts):
+                day_in = datetime.date(2022, 9, 1) + datetime.timedelta(days=rng.randrange(60))
+                day_out = day_in + datetime.timedelta(days=rng.randrange(1, 5))
+                while True:
+                    try:
+                        book_room(user, self.room, day_in, day_out, 2)
+                        outcome = 'booked'
+                    except RoomLocked:
+                        outcome = 'locked'
+                    except BookingError:
+                        outcome = 'rejected'
+                    with lock:
+                        results[outcome] += 1
+                    if outcome != 'locked':
+                        break
+                    time.sleep(rng.uniform(0, 0.002))
+        finally:
+            connection.close()
+
+    def test_no_double_booking(self):
+        results, lock = {'booked': 0, 'locked': 0, 'rejected': 0}, threading.Lock()
+        threads = [threading.Thread(target=self.hammer, args=(user, i, results, lock))
+                   for i, user in enumerate(self.users)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        reserves = sorted(Reserve.objects.filter(room=self.room).values_list('day_in', 'day_out'))
+        for (_, previous_out), (day_in, _) in zip(reserves, reserves[1:]):
+            self.assertLessEqual(previous_out, day_in)
+        self.assertEqual(len(reserves), results['booked'])
+        self.assertEqual(RoomNight.objects.filter(room=self.room).count(),
+                         sum((day_out - day_in).days for day_in, day_out in reserves))
+        requests = self.threads * self.attempts
+        sys.stderr.write(f'\n{self.__class__.__name__}: {requests} запросов за {elapsed:.2f} с '
+                         f'({requests / elapsed:.0f}/с), забронировано {results["booked"]}, '
+                         f'отклонено {results["rejected"]}, повторов из-за блокировки {results["locked"]}\n')
+
+
+class GroupBookingBenchmark(TestCase):
+    """ Групповое бронирование против бронирования комнат по одной """
+    rooms = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        cls.user = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                        first_name='Иван', last_name='Иванов')
+        Room.objects.bulk_create(Room(hotel=hotel, number=number, type=type_room, price=1000, number_of_guests=2)
+                                 for number in range(1, cls.rooms + 1))
+
+    def measure(self, book, numbers):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            book(numbers)
+            elapsed = time.perf_counter() - started
+        return elapsed, len(context.captured_queries)
+
+    def test_group_vs_per_room(self):
+        numbers = list(range(1, self.rooms + 1))
+        day_in, day_out = datetime.date(2022, 9, 17), datetime.date(2022, 9, 20)
+        room_by_number = {room.number: room for room in Room.objects.all()}
+        # По одной комнате бронируют разные клиенты, иначе резервы одного клиента пересекаются
+        clients = get_user_model().objects.bulk_create(get_user_model()(email=f'{number}@test.ru')
+                                                       for number in numbers)
+
+        def per_room(numbers):
+            for number, client in zip(numbers, clients):
+                book_room(client, room_by_number[number], day_in, day_out, 2)
+
+        per_room_time, per_room_queries = self.measure(per_room, numbers)
+        Reserve.objects.all().delete()
+        group_time, group_queries = self.measure(
+            lambda numbers: book_rooms(self.user, numbers, day_in, day_out, 2), numbers)
+        self.assertEqual(Reserve.objects.count(), self.rooms)
+        self.assertEqual(RoomNight.objects.count(), self.rooms * 3)
+
+        Reserve.objects.all().delete()
+        _, few_queries = self.measure(lambda numbers: book_rooms(self.user, numbers, day_in, day_out, 2), numbers[:3])
+        self.assertEqual(group_queries, few_queries)
+        self.assertLess(group_queries, per_room_queries)
+        sys.stderr.write(f'\n{self.__class__.__name__}: {self.rooms} комнат - по одной {per_room_time * 1000:.0f} мс '
+                         f'({per_room_queries} запросов), группой {group_time * 1000:.0f} мс '
+                         f'({group_queries} запросов)\n')
+
+
+class ListSerializationBenchmark(TestCase):
+    """ Сериализация списка комнат: AllRoomSerializer + JSONRenderer против строк .values() + FastJSONRenderer """
+    rooms = 2000
+
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        rooms = Room.objects.bulk_create(Room(hotel=hotel, number=number, type=type_room, price=1000,
+                                              number_of_guests=2) for number in range(1, cls.rooms + 1))
+        Gallery.objects.bulk_create(Gallery(room=room, **{f'slider_photo{i}': f'rooms/{room.number}/{i}.jpg'
+                                                          for i in range(1, 5)}) for room in rooms)
+
+    def measure(self, serialize) -> tuple:
+        started = time.perf_counter()
+        content = serialize(Room.objects.with_gallery().with_next_free_date().order_by('number'))
+        return time.perf_counter() - started, content
+
+    # Подписанные ссылки S3 считаются одинаково в обоих путях и не относятся к сериализации
+    @mock.patch.object(MediaStorage, 'url', lambda storage, name: f'/media/{name}')
+    def test_values_vs_model_serializer(self):
+        request = RequestFactory().get('/api/all_rooms')
+        rows = RoomRows(request)
+        model_time, model_content = self.measure(lambda rooms: JSONRenderer().render(
+            AllRoomSerializer(rooms, many=True, context={'request': request}).data))
+        fast_time, fast_content = self.measure(lambda rooms: FastJSONRenderer().render(
+            rows.to_representation(rows.values(rooms))))
+        self.assertEqual(json.loads(fast_content), json.loads(model_content))
+        sys.stderr.write(f'\n{self.__class__.__name__}: {self.rooms} комнат - ModelSerializer '
+                         f'{self.rooms / model_time:.0f} строк/с, .values() {self.rooms / fast_time:.0f} строк/с '
+                         f'({model_time / fast_time:.1f}x, orjson: {"да" if orjson else "нет"})\n')
+
+
+class ApiAuthenticationBenchmark(TestCase):
+    """ Запросы к API с Basic-аутентификацией (PBKDF2 на каждый запрос) против токена Bearer """
+    requests = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                        first_name='Иван', last_name='Иванов')
+
+    def measure(self, authorization: str) -> float:
+        started = time.perf_counter()
+        for _ in range(self.requests):
+            self.assertEqual(self.client.get(reverse('api_all_reserves'), HTTP_AUTHORIZATION=authorization).status_code,
+                             200)
+        return self.requests / (time.perf_counter() - started)
+
+    def test_basic_vs_bearer(self):
+        basic = self.measure('Basic ' + base64.b64encode(b'test@test.ru:Some_password123').decode())
+        bearer = self.measure(f'Bearer {issue_token(self.user)[0]}')
+        sys.stderr.write(f'\n{self.__class__.__name__}: Basic {basic:.0f} запросов/с, Bearer {bearer:.0f} запросов/с '
+                         f'({bearer / basic:.1f}x)\n')
@@ -1,7 +1,16 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
 
 from Account.models import CustomUser
-from Room.models import Hotel, TypeRoom, Room, Reserve, Review, Regulations, Gallery
+from Room.models import Hotel, TypeRoom, Room, Reserve, Review, Regulations, Gallery, RoomNight
+from Room.reference import reference_cache
+from Room.tasks import drop_old_reserve
 
 
 class HotelModelTest(TestCase):
@@ -26,6 +35,43 @@ class TypeRoomModelTest(TestCase):
         self.assertEquals(type_room.__str__(), 'Эконом')
 
 
+class ReferenceCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        cls.room = Room.objects.create(hotel=Hotel.objects.create(name='Test hotel name'), number=101,
+                                       type=type_room, price=1000)
+        Regulations.objects.create(type_room=type_room, regulation='Не курить')
+
+    def setUp(self):
+        reference_cache.clear()
+
+    def test_cached(self):
+        """ Справочники загружаются из БД один раз, затем из кэша процесса и общего кэша """
+        with self.assertNumQueries(3):
+            for _ in range(3):
+                self.assertEqual(str(self.room.get_type_info()), 'Эконом')
+                self.assertEqual(self.room.get_hotel_info().name, 'Test hotel name')
+                self.assertEqual([str(item) for item in self.room.get_regulations_list()], ['Не курить'])
+        with self.assertRaises(AttributeError):
+            self.room.get_type_info().nomination = 'Люкс'
+        reference_cache.clear()
+        with self.assertNumQueries(0):
+            self.room.get_type_info(), self.room.get_hotel_info(), self.room.get_regulations_list()
+        self.assertEqual(reference_cache.stats(), {'hits': 0, 'shared_hits': 3, 'misses': 0, 'size': 3})
+
+    def test_invalidation(self):
+        """ Изменение справочника в админке сбрасывает кэш """
+        self.room.get_type_info(), self.room.get_regulations_list()
+        type_room = TypeRoom.objects.get(code=1)
+        type_room.nomination = 'Люкс'
+        type_room.save()
+        Regulations.objects.create(type_room_id=1, regulation='Без животных')
+        self.assertEqual(self.room.get_type_info().nomination, 'Люкс')
+        self.assertEqual([item.regulation for item in self.room.get_regulations_list()], ['Не курить', 'Без животных'])
+
+
 class RoomModelTest(TestCase):
 
     @classmethod
@@ -116,9 +162,99 @@ class ReserveModelTest(TestCase):
                                          number_of_guests=2)
 
     def test_object_name(self):
-        reserve = Reserve.objects.get(id=1)
+        reserve = Reserve.objects.get()
         self.assertEquals(reserve.__str__(), 'test@test.ru : 2022-09-17 - 2022-09-19')
 
+    def test_overlapping_reserve_rejected_by_database(self):
+        """ Ограничение EXCLUDE не дает сохранить пересекающийся резерв той же комнаты """
+        reserve = Reserve.objects.get()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Reserve.objects.create(client=reserve.client, room=reserve.room, day_in='2022-09-18',
+                                   day_out='2022-09-20', number_of_guests=1)
+        Reserve.objects.create(client=reserve.client, room=reserve.room, day_in='2022-09-19', day_out='2022-09-20',
+                               number_of_guests=1)
+        self.assertEquals(Reserve.objects.count(), 2)
+
+    def test_clean_overlapping_reserve(self):
+        """ Пересекающийся резерв не проходит валидацию (админка) """
+        reserve = Reserve.objects.get()
+        reserve.clean()
+        overlapping = Reserve(client=reserve.client, room=reserve.room, day_in=datetime.date(2022, 9, 16),
+                              day_out=datetime.date(2022, 9, 18), number_of_guests=1)
+        with self.assertRaises(ValidationError):
+            overlapping.clean()
+
+    def test_overlapping_accepts_strings(self):
+        """ Даты строками сравниваются как даты, обратный период ничего не пересекает """
+        reserve = Reserve.objects.get()
+        self.assertEqual(list(Reserve.objects.overlapping('2022-09-18', '2022-09-20')), [reserve])
+        self.assertFalse(Reserve.objects.overlapping('2022-09-20', '2022-09-18').exists())
+        self.assertFalse(Reserve.objects.overlapping(datetime.date(2022, 9, 20), '2022-09-18').exists())
+
+    def test_overlapping_uses_gist_index(self):
+        """ Поиск пересечений выполняется по индексу GiST """
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = Reserve.objects.overlapping(datetime.date(2022, 9, 18), datetime.date(2022, 9, 20)).explain()
+        self.assertIn('reserve_room_stay_excl', plan)
+
+
+class RoomNightModelTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        room = Room.objects.create(hotel=hotel, number=101, type=type_room, price=1000, number_of_guests=5)
+        Room.objects.create(hotel=hotel, number=102, type=type_room, price=1000, number_of_guests=5)
+        user = CustomUser.objects.create(first_name='Иван', last_name='Иванов', phone='8-000-000-00-00',
+                                         email='test@test.ru')
+        Reserve.objects.create(client=user, room=room, day_in='2022-09-17', day_out='2022-09-20', number_of_guests=2)
+
+    def test_nights_filled_on_create(self):
+        """ При создании резерва занимаются ночи с даты заезда до даты выезда (не включая ее) """
+        reserve = Reserve.objects.get()
+        self.assertEquals(list(reserve.nights.order_by('date').values_list('date', flat=True)),
+                          [datetime.date(2022, 9, 17), datetime.date(2022, 9, 18), datetime.date(2022, 9, 19)])
+
+    def test_nights_replaced_on_update(self):
+        reserve = Reserve.objects.get()
+        reserve.day_out = datetime.date(2022, 9, 18)
+        reserve.save()
+        self.assertEquals(list(RoomNight.objects.values_list('date', flat=True)), [datetime.date(2022, 9, 17)])
+
+    def test_nights_deleted_with_reserve(self):
+        Reserve.objects.get().delete()
+        self.assertFalse(RoomNight.objects.exists())
+
+    def test_drop_old_reserve_empties_nights(self):
+        drop_old_reserve()
+        self.assertFalse(Reserve.objects.exists())
+        self.assertFalse(RoomNight.objects.exists())
+
+    def test_double_booking_is_unique_violation(self):
+        """ Повторное занятие ночи комнаты - нарушение уникальности """
+        reserve = Reserve.objects.get()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RoomNight.objects.create(room=reserve.room, reserve=reserve, date=datetime.date(2022, 9, 18))
+
+    def test_rebuild(self):
+        """ Пересборка из резервов восстанавливает таблицу """
+        RoomNight.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_room_nights', stdout=out)
+        self.assertIn('3 ночей', out.getvalue())
+        self.assertEquals(RoomNight.objects.count(), 3)
+
+    def test_occupancy(self):
+        """ Загрузка по дням - количество занятых ночей """
+        occupancy = list(RoomNight.objects.occupancy(datetime.date(2022, 9, 18), datetime.date(2022, 9, 21)))
+        self.assertEquals(occupancy, [{'date': datetime.date(2022, 9, 18), 'occupied': 1},
+                                      {'date': datetime.date(2022, 9, 19), 'occupied': 1}])
+        out = StringIO()
+        call_command('occupancy_report', '2022-09-19', '2022-09-21', stdout=out)
+        self.assertEquals(out.getvalue(), '2022-09-19: 1 из 2 (50%)\n2022-09-20: 0 из 2 (0%)\n')
+
 
 class ReviewModelTest(TestCase):
 
@@ -134,5 +270,65 @@ class ReviewModelTest(TestCase):
         review = Review.objects.create(room=room, rating=3, body='1234', author=user, reserve=reserve)
 
     def test_object_name(self):
-        review = Review.objects.get(id=1)
+        review = Review.objects.get()
         self.assertEquals(review.__str__(), 'test@test.ru : 3')
+
+    def rating(self, number=101):
+        return Room.objects.values_list('rating_sum', 'rating_count', 'rating_avg').get(number=number)
+
+    def test_rating_aggregates(self):
+        """ Создание, изменение и удаление отзывов меняют рейтинг комнаты без пересчета по всем отзывам """
+        room = Room.objects.get(number=101)
+        self.assertEquals(self.rating(), (3, 1, Decimal('3.0')))
+        review = Review.objects.create(room=room, rating=4, author=CustomUser.objects.get())
+        self.assertEquals(self.rating(), (7, 2, Decimal('3.5')))
+        review.rating = 2
+        review.save()
+        self.assertEquals(self.rating(), (5, 2, Decimal('2.5')))
+        Review.objects.filter(rating=3).get().delete()
+        review.delete()
+        self.assertEquals(self.rating(), (0, 0, Decimal('5.0')))
+
+    def test_reviews_without_rating(self):
+        """ Отзыв без оценки учитывается в количестве отзывов, но не в среднем рейтинге """
+        room = Room.objects.get(number=101)
+        review = Review.objects.create(room=room, body='Без оценки', author=CustomUser.objects.get())
+        self.assertEquals(self.rating(), (3, 1, Decimal('3.0')))
+        self.assertEquals(Room.objects.get(number=101).review_count, 2)
+        review.rating = 5
+        review.save()
+        self.assertEquals(self.rating(), (8, 2, Decimal('4.0')))
+        self.assertEquals(Room.objects.get(number=101).review_count, 2)
+        Review.objects.filter(rating=3).delete()
+        review.delete()
+        self.assertEquals(Room.objects.get(number=101).review_count, 0)
+
+    def test_room_save_keeps_rating(self):
+        """ Сохранение загруженной ранее комнаты не затирает рейтинг, измененный отзывом """
+        room = Room.objects.get(number=101)
+        Review.objects.create(room=room, rating=5, author=CustomUser.objects.get())
+        room.price = 1200
+        room.save()
+        self.assertEquals(self.rating(), (8, 2, Decimal('4.0')))
+        self.assertEquals(Room.objects.get(number=101).price, 1200)
+
+    def test_recalculate_room_ratings(self):
+        """ Команда восстанавливает рейтинги комнат по отзывам """
+        Review.objects.create(room=Room.objects.get(number=101), body='Без оценки', author=CustomUser.objects.get())
+        Room.objects.update(review_count=0, rating_sum=100, rating_count=1, rating_avg=1)
+        out = StringIO()
+        call_command('recalculate_room_ratings', stdout=out)
+        self.assertIn('1 комнат', out.getvalue())
+        self.assertEquals(self.rating(), (3, 1, Decimal('3.0')))
+        self.assertEquals(Room.objects.get(number=101).review_count, 2)
+
+    def test_search_vector(self):
+        """ Поисковый вектор заполняется триггером БД при вставке и изменении отзыва, поиск идет по индексу GIN """
+        review = Review.objects.get()
+        review.body = 'Прекрасный вид из окна'
+        review.save()
+        self.assertEquals(list(Review.objects.search('окно')), [review])
+        self.assertFalse(Review.objects.search('1234').exists())
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            self.assertIn('review_search_idx', Review.objects.search('окно').explain())
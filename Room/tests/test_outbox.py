@@ -0,0 +1,80 @@
+import datetime
+import smtplib
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from Room.models import OutboxMessage
+from Room.outbox import drain_outbox, queue_email, retry_delay
+from Room.tasks import send_outbox
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', OUTBOX_BATCH_SIZE=2,
+                   OUTBOX_MAX_ATTEMPTS=3, OUTBOX_RETRY_DELAY=60, OUTBOX_MAX_RETRY_DELAY=150)
+class OutboxTest(TestCase):
+
+    def test_rolled_back_transaction(self):
+        """ Письмо из откаченной транзакции не попадает в очередь """
+        try:
+            with transaction.atomic():
+                queue_email('Тема', 'Текст', 'test@test.ru')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_drain_in_batches(self):
+        """ Задача отправляет все письма пачками и помечает их отправленными """
+        for i in range(5):
+            queue_email('Тема', 'Текст', f'test{i}@test.ru')
+        self.assertEqual(drain_outbox(), {'sent': 2, 'failed': 0})
+        self.assertEqual(send_outbox.apply().get(), {'sent': 3, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutboxMessage.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(drain_outbox(), {'sent': 0, 'failed': 0})
+
+    def test_failed_recipient_retried_alone(self):
+        """ Ошибка одного получателя откладывает только его письмо, отправленные письма не повторяются """
+        for i in range(3):
+            queue_email('Тема', 'Текст', f'test{i}@test.ru')
+        send_messages = locmem.EmailBackend.send_messages
+
+        def refuse_second(backend, messages):
+            if messages[0].to == ['test1@test.ru']:
+                raise smtplib.SMTPRecipientsRefused({'test1@test.ru': (550, b'No such user')})
+            return send_messages(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', autospec=True, side_effect=refuse_second):
+            with self.settings(OUTBOX_BATCH_SIZE=3):
+                self.assertEqual(drain_outbox(), {'sent': 2, 'failed': 1})
+                OutboxMessage.objects.update(next_attempt_at=timezone.now())
+                self.assertEqual(drain_outbox(), {'sent': 0, 'failed': 1})
+        self.assertEqual([message.to for message in mail.outbox], [['test0@test.ru'], ['test2@test.ru']])
+        failed = OutboxMessage.objects.get(sent_at__isnull=True)
+        self.assertEqual((failed.recipient, failed.attempts), ('test1@test.ru', 2))
+
+    def test_retry_with_backoff(self):
+        """ Неудачная отправка откладывает письмо с растущей задержкой, после OUTBOX_MAX_ATTEMPTS попыток оно остается в таблице """
+        message = queue_email('Тема', 'Текст', 'test@test.ru')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=ConnectionError('SMTP недоступен')):
+            for attempt in range(1, 4):
+                started = timezone.now()
+                self.assertEqual(drain_outbox(), {'sent': 0, 'failed': 1})
+                message.refresh_from_db()
+                self.assertEqual(message.attempts, attempt)
+                self.assertIn('SMTP недоступен', message.last_error)
+                self.assertGreaterEqual(message.next_attempt_at, started + retry_delay(attempt))
+                OutboxMessage.objects.update(next_attempt_at=started)
+        self.assertEqual([retry_delay(attempt).seconds for attempt in range(1, 4)], [60, 120, 150])
+        self.assertEqual(drain_outbox(), {'sent': 0, 'failed': 0})
+        self.assertIsNone(OutboxMessage.objects.get().sent_at)
+
+    def test_not_due_yet(self):
+        queue_email('Тема', 'Текст', 'test@test.ru')
+        OutboxMessage.objects.update(next_attempt_at=timezone.now() + datetime.timedelta(minutes=1))
+        self.assertEqual(drain_outbox(), {'sent': 0, 'failed': 0})
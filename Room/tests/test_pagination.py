@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Room.models import Room, Hotel, TypeRoom, Review
+from Room.pagination import InvalidCursor, KeysetPaginator, order_rooms
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        user = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                    first_name='Иван', last_name='Иванов')
+        prices = [3000, 1000, 2000, 1000, None, 3000, 1000]
+        cls.rooms = [Room.objects.create(hotel=hotel, number=number, type=type_room, price=price, number_of_guests=2)
+                     for number, price in zip(range(101, 108), prices)]
+        for room, rating in ((cls.rooms[2], 3), (cls.rooms[2], 4), (cls.rooms[4], 1), (cls.rooms[6], 5)):
+            Review.objects.create(room=room, rating=rating, author=user)
+
+    def walk(self, ordering, per_page=3):
+        """ Пройти все страницы вперед и назад, вернуть номера комнат в порядке обхода """
+        queryset, fields = order_rooms(Room.objects.all(), ordering)
+        paginator = KeysetPaginator(queryset, fields, per_page)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        backwards = [pages[-1]]
+        while backwards[-1].has_previous():
+            backwards.append(paginator.page(backwards[-1].previous_cursor))
+        forward = [[room.number for room in page] for page in pages]
+        self.assertEqual([[room.number for room in page] for page in reversed(backwards)], forward)
+        return forward
+
+    def test_number(self):
+        self.assertEqual(self.walk('number'), [[101, 102, 103], [104, 105, 106], [107]])
+
+    def test_price_with_ties(self):
+        """ Одинаковые цены упорядочены по номеру, комната без цены считается бесплатной """
+        self.assertEqual(self.walk('price'), [[105, 102, 104], [107, 103, 101], [106]])
+
+    def test_rating_descending(self):
+        """ Комнаты без отзывов имеют рейтинг 5,0 как на странице комнаты """
+        self.assertEqual(self.walk('rating', per_page=4), [[101, 102, 104, 106], [107, 103, 105]])
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Room.objects.all(), ('number',), 3)
+        for cursor in ('abc', 'eyJ2IjpbIngiXSwicCI6MH0', 'eyJ2IjpbMSwyXSwicCI6MH0'):
+            with self.assertRaises(InvalidCursor):
+                paginator.page(cursor)
+
+    def test_deep_page_without_offset(self):
+        """ Страница по курсору выбирается условием на ключ без OFFSET и COUNT """
+        paginator = KeysetPaginator(Room.objects.all(), ('number',), 2)
+        cursor = paginator.page(paginator.page().next_cursor).next_cursor
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual([room.number for room in paginator.page(cursor)], [105, 106])
+        self.assertEqual(len(context.captured_queries), 1)
+        sql = context.captured_queries[0]['sql']
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT', sql)
+
+
+class RoomCursorPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        for number in range(1, 61):
+            Room.objects.create(hotel=hotel, number=number, type=type_room, price=1000 + number % 3,
+                                number_of_guests=2)
+
+    def test_pages(self):
+        resp = self.client.get(reverse('api_all_rooms'), data={'ordering': 'price'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([room['number'] for room in resp.data['results']], [3, 6, 9, 12, 15, 18])
+        self.assertIsNone(resp.data['previous'])
+        resp = self.client.get(resp.data['next'])
+        self.assertEqual([room['number'] for room in resp.data['results']], [21, 24, 27, 30, 33, 36])
+        self.assertIsNotNone(resp.data['previous'])
+
+    def test_page_size_is_capped(self):
+        """ Размер страницы ограничен, список комнат не отдается целиком """
+        resp = self.client.get(reverse('api_all_rooms'), data={'page_size': 1000})
+        self.assertEqual(len(resp.data['results']), 50)
+        self.assertIsNotNone(resp.data['next'])
+
+    def test_invalid_cursor(self):
+        resp = self.client.get(reverse('api_all_rooms'), data={'cursor': 'abc'})
+        self.assertEqual(resp.status_code, 404)
@@ -0,0 +1,97 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase
+from django.utils import timezone
+
+from Room.models import Room, Hotel, TypeRoom, Reserve, BookingHold, OutboxMessage
+from Room.services import BookingError, ClientBusy, RoomBusy, RoomHeld, book_room, hold_room
+from Room.tasks import drop_expired_holds
+
+
+class BookRoomTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        cls.user1 = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                         first_name='Иван', last_name='Иванов')
+        cls.user2 = get_user_model().objects.create_user(email='test2@test.ru', password='Some_password123',
+                                                         first_name='Петр', last_name='Петров')
+        cls.room1 = Room.objects.create(hotel=hotel, number=101, type=type_room, price=1000, number_of_guests=2)
+        cls.room2 = Room.objects.create(hotel=hotel, number=102, type=type_room, price=1000, number_of_guests=2)
+        Reserve.objects.create(client=cls.user1, room=cls.room1, day_in='2022-09-17', day_out='2022-09-19',
+                               number_of_guests=2)
+
+    def test_book(self):
+        """ Резерв создается, письмо ставится в очередь в той же транзакции и не отправляется сразу """
+        reserve = book_room(self.user2, self.room1, datetime.date(2022, 9, 19), datetime.date(2022, 9, 21), 2)
+        self.assertEqual(reserve.nights.count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(list(OutboxMessage.objects.values_list('recipient', flat=True)), ['test2@test.ru'])
+
+    def test_no_email_for_failed_booking(self):
+        with self.assertRaises(RoomBusy):
+            book_room(self.user2, self.room1, datetime.date(2022, 9, 18), datetime.date(2022, 9, 20), 2)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_room_busy(self):
+        with self.assertRaises(RoomBusy):
+            book_room(self.user2, self.room1, datetime.date(2022, 9, 18), datetime.date(2022, 9, 20), 2)
+        self.assertEqual(Reserve.objects.count(), 1)
+
+    def test_client_busy(self):
+        """ Клиент не может забронировать вторую комнату на пересекающиеся даты """
+        with self.assertRaises(ClientBusy):
+            book_room(self.user1, self.room2, datetime.date(2022, 9, 18), datetime.date(2022, 9, 20), 2)
+
+    def test_invalid_request(self):
+        with self.assertRaises(BookingError):
+            book_room(self.user2, self.room2, datetime.date(2022, 9, 20), datetime.date(2022, 9, 20), 2)
+        with self.assertRaises(BookingError):
+            book_room(self.user2, self.room2, datetime.date(2022, 9, 20), datetime.date(2022, 9, 22), 3)
+
+    def test_room_without_capacity(self):
+        """ Вместимость комнаты не указана - количество гостей не ограничивается """
+        room = Room.objects.create(hotel=self.room1.hotel, number=103, type=self.room1.type, price=1000)
+        reserve = book_room(self.user2, room, datetime.date(2022, 9, 20), datetime.date(2022, 9, 22), 3)
+        self.assertEqual(reserve.number_of_guests, 3)
+
+
+class BookingHoldTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        type_room = TypeRoom.objects.create(code=1, nomination='Эконом', description='Дешевый номер')
+        hotel = Hotel.objects.create(name='Test hotel name')
+        cls.user1 = get_user_model().objects.create_user(email='test@test.ru', password='Some_password123',
+                                                         first_name='Иван', last_name='Иванов')
+        cls.user2 = get_user_model().objects.create_user(email='test2@test.ru', password='Some_password123',
+                                                         first_name='Петр', last_name='Петров')
+        cls.room = Room.objects.create(hotel=hotel, number=101, type=type_room, price=1000, number_of_guests=2)
+        cls.day_in, cls.day_out = datetime.date(2022, 9, 17), datetime.date(2022, 9, 19)
+
+    def test_hold_blocks_other_clients(self):
+        """ Удержанную комнату не может удержать или забронировать другой клиент """
+        hold_room(self.user1, self.room, self.day_in, self.day_out)
+        with self.assertRaises(RoomHeld):
+            hold_room(self.user2, self.room, datetime.date(2022, 9, 18), datetime.date(2022, 9, 20))
+        with self.assertRaises(RoomHeld):
+            book_room(self.user2, self.room, datetime.date(2022, 9, 18), datetime.date(2022, 9, 20), 2)
+        book_room(self.user2, self.room, datetime.date(2022, 9, 19), datetime.date(2022, 9, 20), 2)
+
+    def test_own_hold(self):
+        """ Клиент бронирует удержанную им комнату, удержание снимается; у клиента одно удержание """
+        hold_room(self.user1, self.room, datetime.date(2022, 10, 1), datetime.date(2022, 10, 3))
+        hold_room(self.user1, self.room, self.day_in, self.day_out)
+        self.assertEqual(BookingHold.objects.filter(client=self.user1).count(), 1)
+        book_room(self.user1, self.room, self.day_in, self.day_out, 2)
+        self.assertFalse(BookingHold.objects.exists())
+
+    def test_expired_hold(self):
+        """ Истекшее удержание не мешает бронированию и удаляется задачей одним запросом """
+        hold = hold_room(self.user1, self.room, self.day_in, self.day_out)
+        BookingHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        hold_room(self.user2, self.room, self.day_in, self.day_out)
+        drop_expired_holds()
+        self.assertEqual(list(BookingHold.objects.values_list('client', flat=True)), [self.user2.pk])
@@ -1,12 +1,15 @@
 import datetime
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 
 from django.urls import reverse
 
 from Account.models import CustomUser
-from Room.models import Room, Hotel, TypeRoom, Reserve, Review, Regulations
+from Room import detail_cache
+from Room.reference import reference_cache
+from Room.models import Room, Hotel, TypeRoom, Reserve, Review, Regulations, BookingHold, OutboxMessage
 
 
 class AllRoomsViewTest(TestCase):
@@ -46,16 +49,24 @@ class AllRoomsViewTest(TestCase):
 
     def test_lists_all_rooms(self):
         """
-        Проверяет код ответа по заданому урлу (вторая страница пагинации)
+        Проверяет код ответа по курсору следующей страницы (вторая страница пагинации)
         Проверяет наличие ключа 'is_paginated' в контексте овтета
         Проверяет истиность значения 'is_paginated' в контексте ответа
         Проверяет длину списка объектов на второй странице пагинации
         """
-        resp = self.client.get(reverse('all_rooms') + '?page=2')
+        resp = self.client.get(reverse('all_rooms'),
+                               data={'cursor': self.client.get(reverse('all_rooms')).context['page_obj'].next_cursor})
         self.assertEqual(resp.status_code, 200)
         self.assertTrue('is_paginated' in resp.context)
         self.assertTrue(resp.context['is_paginated'])
         self.assertTrue(len(resp.context['rooms']) == 4)
+        self.assertEqual([room.number for room in resp.context['rooms']], [6, 7, 8, 9])
+        self.assertFalse(resp.context['page_obj'].has_next())
+
+    def test_invalid_cursor(self):
+        """ Проверяет, что неверный курсор приводит к 404 """
+        resp = self.client.get(reverse('all_rooms'), data={'cursor': 'abc'})
+        self.assertEqual(resp.status_code, 404)
 
 
 class AllReservesViewTest(TestCase):
@@ -131,6 +142,11 @@ class DetailRoomViewTest(TestCase):
         regulation1 = Regulations.objects.create(type_room=room.type, regulation='Не курить')
         regulation2 = Regulations.objects.create(type_room=room.type, regulation='Без домашних животных')
 
+    def setUp(self):
+        cache.clear()
+        reference_cache.clear()
+        detail_cache.reset_stats()
+
     def test_view_url_exists_at_desired_location(self):
         """
         Проверяет код ответа по заданому урлу
@@ -166,6 +182,64 @@ class DetailRoomViewTest(TestCase):
         self.assertEqual(len(resp.context['review_list']), 2)
         self.assertEqual(resp.context['num_of_review'], 2)
 
+    def test_num_of_review_without_rating(self):
+        """ Счетчик отзывов учитывает и отзывы без оценки """
+        room = Room.objects.get(number=101)
+        Review.objects.create(room=room, body='Без оценки', author=get_user_model().objects.get())
+        resp = self.client.get(reverse('detail_room', kwargs={'number': room.number}))
+        self.assertEqual(len(resp.context['review_list']), 3)
+        self.assertEqual(resp.context['num_of_review'], 3)
+
+    def test_queries(self):
+        """ Комната и отзывы загружаются по одному запросу, тип и правила - из кэша справочников """
+        url = reverse('detail_room', kwargs={'number': 101})
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        detail_cache.bump_room_version(101)
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_cached_render(self):
+        """ Повторный показ страницы собирается из кэша фрагментов без запросов к БД """
+        url = reverse('detail_room', kwargs={'number': 101})
+        first = self.client.get(url)
+        self.assertEqual(detail_cache.get_stats(), {'hits': 0, 'misses': 3})
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(detail_cache.get_stats(), {'hits': 3, 'misses': 3})
+
+    def test_not_modified(self):
+        """ Неизмененная страница - 304 без запросов к БД, после нового отзыва - 200 """
+        url = reverse('detail_room', kwargs={'number': 101})
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(room=Room.objects.get(number=101), rating=5, author=CustomUser.objects.get())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_invalidation(self):
+        """ Новый отзыв, изменение правил и удаление комнаты делают страницу устаревшей """
+        url = reverse('detail_room', kwargs={'number': 101})
+        self.client.get(url)
+        room = Room.objects.get(number=101)
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(room=room, rating=5, body='Отличный номер', author=CustomUser.objects.get())
+        self.assertContains(self.client.get(url), 'Отличный номер')
+        with self.captureOnCommitCallbacks(execute=True):
+            Regulations.objects.filter(regulation='Не курить').update(regulation='Не шуметь')
+            Regulations.objects.get(regulation='Не шуметь').save()
+        self.assertContains(self.client.get(url), 'Не шуметь')
+        with self.captureOnCommitCallbacks(execute=True):
+            room.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_unknown_room_keeps_cache_clean(self):
+        """ Запрос несуществующей комнаты не создает версию страницы в кэше """
+        self.assertEqual(self.client.get(reverse('detail_room', kwargs={'number': 999})).status_code, 404)
+        self.assertIsNone(cache.get(detail_cache.ROOM_DETAIL_VERSION_KEY.format(number=999)))
+
 
 class AddReviewViewTest(TestCase):
     @classmethod
@@ -251,6 +325,15 @@ class AddReviewViewTest(TestCase):
         self.assertTrue(Review.objects.get(body='тест111'))
         self.assertTrue(resp.url.startswith('/all_reserves'))
 
+    def test_queries(self):
+        """ Резерв загружается один раз за запрос, комната при добавлении отзыва не перезаписывается """
+        self.client.login(email='test2@test.ru', password='Some_password123')
+        reserve = Reserve.objects.get(client__email='test2@test.ru')
+        with self.assertNumQueries(3):
+            self.client.get(reverse('add_review', kwargs={'pk': reserve.pk}))
+        with self.assertNumQueries(5):
+            self.client.post(reverse('add_review', kwargs={'pk': reserve.pk}), data={'body': 'тест', 'rating': 4})
+
 
 class ReserveRoomViewTest(TestCase):
     @classmethod
@@ -325,6 +408,27 @@ class ReserveRoomViewTest(TestCase):
         self.assertEqual(resp.context['days'], 2)
         self.assertEqual(resp.context['full_price'], 2000)
 
+    def test_hold(self):
+        """ Проверяет, что страница бронирования удерживает свободную комнату и сообщает о занятой """
+        self.client.login(email='test2@test.ru', password='Some_password123')
+        room = Room.objects.get(number=101)
+        resp = self.client.get(reverse('reserve_room', kwargs={'number': room.number}),
+                               data={'day_in': '2022-10-01', 'day_out': '2022-10-03', 'number_of_guests': '3'})
+        self.assertIsNone(resp.context['hold_error'])
+        self.assertTrue(BookingHold.objects.filter(room=room, client__email='test2@test.ru').exists())
+        resp = self.client.get(reverse('reserve_room', kwargs={'number': room.number}),
+                               data={'day_in': '2022-09-17', 'day_out': '2022-09-19', 'number_of_guests': '3'})
+        self.assertEqual(resp.context['hold_error'], 'К сожалению, этот номер уже забронирован на выбранные даты.')
+
+    def test_queries(self):
+        """ Комната загружается один раз за запрос: для удержания и для страницы, тип и правила - из кэша """
+        self.client.login(email='test2@test.ru', password='Some_password123')
+        room = Room.objects.get(number=101)
+        room.get_type_info(), room.get_regulations_list()
+        with self.assertNumQueries(12):
+            self.client.get(reverse('reserve_room', kwargs={'number': 101}),
+                            data={'day_in': '2022-10-01', 'day_out': '2022-10-03', 'number_of_guests': '3'})
+
 
 class CancelViewTest(TestCase):
     @classmethod
@@ -443,6 +547,25 @@ class CancelViewTest(TestCase):
         resp = self.client.post(reverse('cancel', kwargs={'pk': reserve.pk}))
         self.assertEqual(resp.status_code, 404)
 
+    def test_cancel_queues_email(self):
+        """ Проверяет, что отмена будущей брони удаляет резерв и ставит письмо в очередь отправки """
+        self.client.login(email='test@test.ru', password='Some_password123')
+        day_in = datetime.date.today() + datetime.timedelta(days=10)
+        reserve = Reserve.objects.create(client=CustomUser.objects.get(email='test@test.ru'),
+                                         room=Room.objects.get(number=101), day_in=day_in,
+                                         day_out=day_in + datetime.timedelta(days=2), number_of_guests=2)
+        resp = self.client.post(reverse('cancel', kwargs={'pk': reserve.pk}))
+        self.assertRedirects(resp, reverse('all_reserves'))
+        self.assertFalse(Reserve.objects.filter(pk=reserve.pk).exists())
+        self.assertEqual(list(OutboxMessage.objects.values_list('recipient', flat=True)), ['test@test.ru'])
+
+    def test_queries(self):
+        """ Резерв загружается один раз за запрос """
+        self.client.login(email='test2@test.ru', password='Some_password123')
+        reserve = Reserve.objects.get(client__email='test2@test.ru')
+        with self.assertNumQueries(3):
+            self.client.get(reverse('cancel', kwargs={'pk': reserve.pk}))
+
 
 class ListFreeRoomsViewTest(TestCase):
     @classmethod
@@ -594,3 +717,13 @@ class PayViewTest(TestCase):
                     Так же информацию о брони вы можете посмотреть в разделе "Мои резервы". 
                     """
         self.assertEqual(resp.context['message'], message)
+
+    def test_room_already_reserved(self):
+        """ Бронирование занятой комнаты не создает резерв и выводит сообщение """
+        self.client.login(email='test2@test.ru', password='Some_password123')
+        room = Room.objects.get(number=101)
+        resp = self.client.get(f'/pay/{room.number}',
+                               data={'number_of_guests': '3', 'day_in': '2022-09-18', 'day_out': '2022-09-20'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['message'], 'К сожалению, этот номер уже забронирован на выбранные даты.')
+        self.assertEqual(Reserve.objects.filter(room=room).count(), 1)
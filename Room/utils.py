@@ -1,12 +1,11 @@
 import datetime
 import re
-from typing import Union
+from typing import Tuple, Union
 
 from django.contrib.auth.models import User
-from django.core.mail import send_mail
 
+from Room import availability, outbox
 from Room.models import Reserve, Room
-from settings import config
 
 
 def convert_str_to_date(date_str: Union[datetime.date, str]) -> datetime.date:
@@ -17,16 +16,16 @@ def convert_str_to_date(date_str: Union[datetime.date, str]) -> datetime.date:
         return datetime.datetime.strptime(date_str, '%d.%m.%Y').date() if isinstance(date_str, str) else date_str
 
 
+def get_month_bounds(month: str) -> Tuple[datetime.date, datetime.date]:
+    """ Первый день месяца 'ГГГГ-ММ' и первый день следующего месяца """
+    first_day = datetime.datetime.strptime(month, '%Y-%m').date()
+    next_month = (first_day + datetime.timedelta(days=31)).replace(day=1)
+    return first_day, next_month
+
+
 def check_availability(room: Room, day_in: datetime.date, day_out: datetime.date) -> bool:
     """ Проверка, не пересекаются ли даты резрва отдельной комнаты с указанными данными """
-    reserve_list = Reserve.objects.filter(room=room)
-    counter_false = 0
-    if len(reserve_list) == 0:
-        return True
-    for reserve in reserve_list:
-        if not (reserve.day_in >= day_out or reserve.day_out <= day_in):
-            counter_false += 1
-    return False if counter_false > 0 else True
+    return availability.room_is_free(room, day_in, day_out)
 
 
 def get_number_of_days(day_in: datetime.date, day_out: datetime.date) -> int:
@@ -36,18 +35,11 @@ def get_number_of_days(day_in: datetime.date, day_out: datetime.date) -> int:
 
 def check_dates_of_user(user: User, day_in: datetime.date, day_out: datetime.date) -> bool:
     """ Проверка на наличие у пользователя существующих резервов на эти даты"""
-    counter = 0
-    reserve_list = Reserve.objects.filter(client=user)
-    if len(reserve_list) == 0:
-        return True
-    else:
-        for reserve in reserve_list:
-            counter += 0 if reserve.day_in >= day_out or reserve.day_out <= day_in else 1
-        return True if counter <= 0 else False
+    return not availability.user_has_overlap(user, day_in, day_out)
 
 
-def send_reserve_email(name, room, day_in: datetime.date, day_out: datetime.date, number_of_guests, recipient):
-    """ Отправка письма о подтверждении брони """
+def queue_reserve_email(name, room, day_in: datetime.date, day_out: datetime.date, number_of_guests, recipient):
+    """ Письмо о подтверждении брони в очередь отправки """
     email_theme = 'Дипломная работа'
     email_text = f"""
     Здравствуйте, {name}, ваша заявка на бронирование одобрена.
@@ -60,18 +52,36 @@ def send_reserve_email(name, room, day_in: datetime.date, day_out: datetime.date
     --
     С уважением, Администрация отеля.
     """
-    send_mail(email_theme, email_text, config.EMAIL_HOST_USER, [str(recipient)], fail_silently=False)
+    outbox.queue_email(email_theme, email_text, recipient)
+
+
+def queue_group_reserve_email(name, rooms, day_in: datetime.date, day_out: datetime.date, number_of_guests,
+                              recipient):
+    """ Одно письмо о подтверждении групповой брони в очередь отправки """
+    email_theme = 'Дипломная работа'
+    email_text = f"""
+    Здравствуйте, {name}, ваша заявка на групповое бронирование одобрена.
+     ------ Детали бронирования ------
+    Комнаты: {', '.join(str(room) for room in rooms)}
+    Прибытие: {day_in}
+    Выезд: {day_out}
+    Количество гостей в комнате: {number_of_guests}
+    Желаем вам хорошего отдыха
+    --
+    С уважением, Администрация отеля.
+    """
+    outbox.queue_email(email_theme, email_text, recipient)
 
 
-def send_cancel_email(recipient):
-    """ Отправка письма об отмене брони """
+def queue_cancel_email(recipient):
+    """ Письмо об отмене брони в очередь отправки """
     email_theme = 'Дипломная работа. Отмена бронирования.'
     email_text = """
     Здравствуйте. Ваша заявка на отмену брони одобрена.
     --
     С уважением, Администрация отеля.
     """
-    send_mail(email_theme, email_text, config.EMAIL_HOST_USER, [str(recipient)], fail_silently=False)
+    outbox.queue_email(email_theme, email_text, recipient)
 
 
 def calculate_refund_amount(reserve: Reserve) -> dict:
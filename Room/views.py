@@ -1,38 +1,72 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import Http404
+from django.db import transaction
+from django.db.models import Count, Max
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
+from django.utils.functional import SimpleLazyObject
 from django.views.generic import ListView, DetailView, CreateView, DeleteView, TemplateView
 
+from Room.api.caching import ConditionalGetMixin, latest
 from Room.forms import ReviewForm
+from Room.mixins import CachedObjectMixin
 from Room.models import Room, Reserve
-from Room import utils
+from Room.pagination import KeysetPaginationMixin
+from Room.reference import get_reference_version
+from Room import availability, detail_cache, services, utils
 import datetime
 
 
-class AllRooms(ListView):
+class AllRooms(ConditionalGetMixin, KeysetPaginationMixin, ListView):
     """ Список всех существующих комнат """
     context_object_name = 'rooms'
-    queryset = Room.objects.all().order_by('number').select_related('type', 'photos_of_room')
+    queryset = Room.objects.with_gallery()
     template_name = "rooms/all_rooms.html"
     paginate_by = 6
+    vary_on_user = True
 
+    def get_version(self) -> dict:
+        version = Room.objects.aggregate(updated=Max('updated_at'), count=Count('id'),
+                                         photos_updated=Max('photos_of_room__updated_at'))
+        version.update(reference=get_reference_version(),
+                       updated=latest(version['updated'], version['photos_updated']))
+        return version
 
-class DetailRoom(DetailView):
+
+class DetailRoom(ConditionalGetMixin, CachedObjectMixin, DetailView):
     """ Информация по отдельной комнате """
     model = Room
     context_object_name = "room"
     template_name = "rooms/detail_room.html"
+    slug_field = slug_url_kwarg = 'number'
+    vary_on_user = True
+
+    def get_queryset(self):
+        return Room.objects.with_gallery()
 
-    def get_object(self, queryset=None):
-        return Room.objects.select_related('type', 'photos_of_room').get(number=self.kwargs.get("number"))
+    def get_version(self) -> dict:
+        # Версия фрагментов страницы (Room.detail_cache) меняется вместе с комнатой, отзывами и справочниками,
+        # поэтому проверка ETag, как и показ страницы из кэша, обходится без запросов к БД
+        return {'page': detail_cache.get_page_version(self.kwargs[self.slug_url_kwarg])}
+
+    def get(self, request, *args, **kwargs):
+        # Фрагменты страницы кэшируются (templatetags.room_cache), комната загружается из БД
+        # только при промахе кэша
+        self.object = SimpleLazyObject(self.get_object)
+        return self.conditional_response(request, lambda: self.render_to_response(self.get_context_data()))
 
     def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['regulations_list'] = self.get_object().get_regulations_list()
-        context['review_list'] = self.get_object().get_review_list()
-        context['num_of_review'] = len(context['review_list'])
-        return context
+        room, number = self.object, self.kwargs[self.slug_url_kwarg]
+        kwargs.update({
+            'view': self,
+            'object': room,
+            'room': room,
+            'room_number': number,
+            'room_version': detail_cache.get_page_version(number),
+            'regulations_list': SimpleLazyObject(lambda: room.get_regulations_list()),
+            'review_list': SimpleLazyObject(lambda: room.get_review_list()),
+            'num_of_review': SimpleLazyObject(lambda: room.review_count),
+        })
+        return kwargs
 
 
 class AllReserves(LoginRequiredMixin, ListView):
@@ -44,117 +78,117 @@ class AllReserves(LoginRequiredMixin, ListView):
         return Reserve.objects.filter(client=self.request.user).order_by('-id').select_related('review')
 
 
-class AddReview(LoginRequiredMixin, CreateView):
+class AddReview(LoginRequiredMixin, CachedObjectMixin, CreateView):
     """ Добавление отзыва """
     template_name = 'rooms/add_review.html'
     form_class = ReviewForm
     success_url = reverse_lazy('all_reserves')
 
-    def post(self, request, *args, **kwargs):
-        room = self.get_object().room
-        room.save()
-        return super().post(request, *args, **kwargs)
-
-    def get_object(self, queryset=None):
-        reserve = Reserve.objects.select_related('client', 'room').get(pk=self.kwargs.get("pk"))
-        if not reserve.client == self.request.user:
-            raise Http404
-        return reserve
+    def get_queryset(self):
+        # Отзыв можно оставить только к своему резерву, get_object() вернет резерв
+        return Reserve.objects.select_related('room').filter(client_id=self.request.user.pk)
 
     def form_valid(self, form):
+        reserve = self.get_object()
         form.instance.author = self.request.user
-        form.instance.reserve = self.get_object()
-        form.instance.room = self.get_object().room
+        form.instance.reserve = reserve
+        form.instance.room = reserve.room
         return super().form_valid(form)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['day_in'] = self.get_object().day_in
-        context['day_out'] = self.get_object().day_out
-        context['room_reserve'] = self.get_object().room
+        reserve = self.get_object()
+        context['day_in'] = reserve.day_in
+        context['day_out'] = reserve.day_out
+        context['room_reserve'] = reserve.room
         return context
 
 
-class ReserveRoom(LoginRequiredMixin, DetailView):
+class ReserveRoom(LoginRequiredMixin, CachedObjectMixin, DetailView):
     """ Бронирование комнаты  """
     model = Room
     context_object_name = "room"
     template_name = "rooms/reserve_room.html"
+    slug_field = slug_url_kwarg = 'number'
+
+    def get(self, request, *args, **kwargs):
+        # Комната удерживается за клиентом, пока он переходит к оплате
+        self.hold_error = None
+        try:
+            services.hold_room(request.user, self.get_object(), utils.convert_str_to_date(request.GET['day_in']),
+                               utils.convert_str_to_date(request.GET['day_out']))
+        except services.BookingError as e:
+            self.hold_error = e.message
+        return super().get(request, *args, **kwargs)
 
-    def get_object(self, queryset=None):
-        return Room.objects.select_related('type', 'photos_of_room').get(number=self.kwargs.get("number"))
+    def get_queryset(self):
+        return Room.objects.with_gallery()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['regulations_list'] = self.get_object().get_regulations_list()
-        context['review_list'] = self.get_object().get_review_list()
-        context['num_of_review'] = len(context['review_list'])
+        context['regulations_list'] = self.object.get_regulations_list()
+        context['review_list'] = self.object.get_review_list()
+        context['num_of_review'] = self.object.review_count
         context['day_in'] = self.request.GET['day_in']
         context['day_out'] = self.request.GET['day_out']
         context['number_of_guests'] = self.request.GET['number_of_guests']
         context['days'] = utils.get_number_of_days(utils.convert_str_to_date(self.request.GET['day_in']),
                                                    utils.convert_str_to_date(self.request.GET['day_out']))
-        context['full_price'] = self.get_object().get_full_price(context['days'])
+        context['full_price'] = self.object.get_full_price(context['days'])
+        context['hold_error'] = self.hold_error
         return context
 
 
-class Cancel(LoginRequiredMixin, DeleteView):
+class Cancel(LoginRequiredMixin, CachedObjectMixin, DeleteView):
     """ Отмена брони """
-    model = Reserve()
+    model = Reserve
     template_name = 'rooms/cancel.html'
     success_url = reverse_lazy('all_reserves')
 
-    def get_object(self, queryset=None):
-        reserve = get_object_or_404(Reserve, pk=self.kwargs['pk'])
-        if not reserve.client == self.request.user:
-            raise Http404
-        return reserve
+    def get_queryset(self):
+        return Reserve.objects.select_related('room').filter(client_id=self.request.user.pk)
 
     def post(self, request, *args, **kwargs):
-        if not datetime.datetime.now().date() > self.get_object().day_out:
-            utils.send_cancel_email(request.user.email)
-        return super().post(request, *args, **kwargs)
+        # Письмо попадает в очередь, только если резерв действительно удален
+        with transaction.atomic():
+            if not datetime.datetime.now().date() > self.get_object().day_out:
+                utils.queue_cancel_email(request.user.email)
+            return super().post(request, *args, **kwargs)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-
-        if datetime.datetime.now().date() < self.get_object().day_in:
-            context['days'] = utils.get_number_of_days(self.get_object().day_in, self.get_object().day_out)
+        reserve = self.get_object()
+        today = datetime.datetime.now().date()
+        if today < reserve.day_in:
+            context['days'] = utils.get_number_of_days(reserve.day_in, reserve.day_out)
             context['delay'] = False
-        elif datetime.datetime.now().date() == self.get_object().day_in:
-            context['days'] = utils.get_number_of_days(self.get_object().day_in, self.get_object().day_out) - 1
+        elif today == reserve.day_in:
+            context['days'] = utils.get_number_of_days(reserve.day_in, reserve.day_out) - 1
             context['delay'] = False
         else:
-            if datetime.datetime.now().date() > self.get_object().day_out:
+            if today > reserve.day_out:
                 context['days'] = 0
                 context['delay'] = True
             else:
-                context['days'] = utils.get_number_of_days(datetime.datetime.now().date(), self.get_object().day_out)
+                context['days'] = utils.get_number_of_days(today, reserve.day_out)
                 context['delay'] = False
-        cost = self.get_object().room.price * context['days']
+        cost = reserve.room.price * context['days']
         context[
-            'message'] = f"Вам вернется стоимость за {context['days']} дней с {self.get_object().day_in} по {self.get_object().day_out} в размере {cost} рублей."
+            'message'] = f"Вам вернется стоимость за {context['days']} дней с {reserve.day_in} по {reserve.day_out} в размере {cost} рублей."
         return context
 
 
-class ListFreeRooms(LoginRequiredMixin, ListView):
+class ListFreeRooms(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """ Список свободных номеров """
     context_object_name = 'rooms'
     template_name = "rooms/list_free_rooms.html"
     paginate_by = 6
 
     def get_queryset(self):
-        free_rooms_list = Room.objects.select_related('type').filter(
-            number_of_guests__gte=int(self.request.GET['number_of_guests'][0]))
-        free_rooms_number_list = []
-        for room in free_rooms_list:
-            if utils.check_availability(room, utils.convert_str_to_date(self.request.GET['day_in']),
-                                        utils.convert_str_to_date(self.request.GET['day_out'])):
-                free_rooms_number_list.append(room.number)
-        if utils.check_dates_of_user(self.request.user,
-                                     utils.convert_str_to_date(self.request.GET['day_in']),
-                                     utils.convert_str_to_date(self.request.GET['day_out'])):
-            return Room.objects.select_related('type').filter(number__in=free_rooms_number_list).order_by('number')
+        return availability.search_free_rooms(utils.convert_str_to_date(self.request.GET['day_in']),
+                                              utils.convert_str_to_date(self.request.GET['day_out']),
+                                              int(self.request.GET['number_of_guests'][0]),
+                                              user=self.request.user)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -169,20 +203,23 @@ class Pay(LoginRequiredMixin, TemplateView):
     template_name = "rooms/pay.html"
 
     def get(self, request, *args, **kwargs):
-        if utils.check_dates_of_user(request.user, utils.convert_str_to_date(request.GET['day_in']),
-                                     utils.convert_str_to_date(request.GET['day_out'])):
-            reserve = Reserve(day_in=request.GET['day_in'], day_out=request.GET['day_out'],
-                              room=get_object_or_404(Room, number=self.kwargs.get("number")),
-                              number_of_guests=request.GET['number_of_guests'], client=request.user)
-            reserve.save()
-            utils.send_reserve_email(request.user.first_name, reserve.room, reserve.day_in, reserve.day_out,
-                                     reserve.number_of_guests, request.user.email)
+        self.error = None
+        room = get_object_or_404(Room, number=self.kwargs.get("number"))
+        try:
+            services.book_room(request.user, room, utils.convert_str_to_date(request.GET['day_in']),
+                               utils.convert_str_to_date(request.GET['day_out']),
+                               int(request.GET['number_of_guests']))
+        except services.BookingError as e:
+            self.error = e.message
         return super().get(request, *args, **kwargs)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['message'] = """ 
+        if self.error is None:
+            context['message'] = """ 
                     Номер успешно забронирован. Детали бронирования были отправлены вам на электронную почту. 
                     Так же информацию о брони вы можете посмотреть в разделе "Мои резервы". 
                     """
+        else:
+            context['message'] = self.error
         return context
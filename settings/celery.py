@@ -14,6 +14,16 @@ app.conf.beat_schedule = {
         # Ежедневно в полночь
         'schedule': crontab(minute=0, hour=0),
     },
+    'drop_expired_holds': {
+        'task': 'Room.tasks.drop_expired_holds',
+        # Каждые 5 минут
+        'schedule': crontab(minute='*/5'),
+    },
+    'send_outbox': {
+        'task': 'Room.tasks.send_outbox',
+        # Каждую минуту
+        'schedule': crontab(),
+    },
     'send_promotion': {
         'task': 'Account.tasks.send_promotion',
         # Каждый день в первый месяц каждого квартала(раз в 3 месяца)
@@ -0,0 +1,223 @@
+import smtplib
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.mail.backends import smtp
+
+# Ошибки, после которых соединение считается разорванным и письмо отправляется повторно через новое
+DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class SMTPConnectionPool:
+    """
+    Пул авторизованных SMTP-соединений процесса к одному серверу
+    Свободные соединения хранятся не дольше idle_timeout секунд и не больше size штук
+    """
+
+    def __init__(self, size: int, idle_timeout: float):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._lock = threading.Lock()
+        self.counters = {'sent': 0, 'failed': 0, 'connections': 0, 'reconnects': 0, 'sessions': 0,
+                         'latency_total': 0.0, 'latency_max': 0.0}
+
+    def acquire(self, connect: Callable[[], smtplib.SMTP]) -> smtplib.SMTP:
+        expired = []
+        with self._lock:
+            connection = None
+            while self._idle:
+                candidate, released = self._idle.pop()
+                if time.monotonic() - released < self.idle_timeout:
+                    connection = candidate
+                    break
+                expired.append(candidate)
+            self.counters['sessions'] += 1
+        for candidate in expired:
+            self.discard(candidate)
+        if connection is None:
+            connection = connect()
+            self.count('connections')
+        return connection
+
+    def release(self, connection: smtplib.SMTP):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((connection, time.monotonic()))
+                return
+        self.discard(connection)
+
+    @staticmethod
+    def discard(connection: smtplib.SMTP):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def count(self, counter: str, value: float = 1):
+        with self._lock:
+            self.counters[counter] += value
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            self.counters['latency_total'] += seconds
+            self.counters['latency_max'] = max(self.counters['latency_max'], seconds)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self.counters, idle=len(self._idle))
+        attempts = stats['sent'] + stats['failed']
+        stats['latency_avg'] = stats['latency_total'] / attempts if attempts else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self.discard(connection)
+
+
+class MessageBatcher:
+    """
+    Объединяет письма, отправленные разными потоками в течение window секунд, в одну SMTP-сессию
+    Первый поток окна ждет window секунд и отправляет письма всех потоков, остальные ждут результата
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = None
+
+    def submit(self, deliver: Callable[[list], None], messages: list) -> dict:
+        slot = {'messages': messages, 'sent': 0, 'error': None, 'done': threading.Event()}
+        with self._lock:
+            leader = self._pending is None
+            if leader:
+                self._pending = []
+            self._pending.append(slot)
+        if leader:
+            time.sleep(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, None
+            try:
+                deliver(batch)
+            finally:
+                for item in batch:
+                    item['done'].set()
+        slot['done'].wait()
+        return slot
+
+
+_pools: Dict[tuple, Tuple[SMTPConnectionPool, MessageBatcher]] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key: tuple) -> Tuple[SMTPConnectionPool, MessageBatcher]:
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = (SMTPConnectionPool(getattr(settings, 'EMAIL_POOL_SIZE', 4),
+                                              getattr(settings, 'EMAIL_POOL_IDLE_TIMEOUT', 60)),
+                           MessageBatcher(getattr(settings, 'EMAIL_BATCH_WINDOW', 0)))
+        return _pools[key]
+
+
+def get_stats() -> Dict[tuple, Dict[str, float]]:
+    """ Счетчики всех пулов процесса: отправлено, ошибок, соединений, переподключений, задержка отправки """
+    with _pools_lock:
+        pools = dict(_pools)
+    return {key: pool.stats() for key, (pool, _) in pools.items()}
+
+
+def reset_pools():
+    """ Закрыть свободные соединения и сбросить счетчики всех пулов процесса """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool, _ in pools:
+        pool.clear()
+
+
+class PooledEmailBackend(smtp.EmailBackend):
+    """
+    SMTP-бэкенд с пулом соединений процесса
+    Соединение после отправки возвращается в пул, а не закрывается. Разорванное соединение заменяется новым,
+    и письмо отправляется повторно. Письма из разных потоков в пределах EMAIL_BATCH_WINDOW секунд
+    уходят в одной сессии
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool, self.batcher = get_pool((self.host, self.port, self.username, self.use_tls, self.use_ssl))
+
+    def _connect(self) -> smtplib.SMTP:
+        self.connection = None
+        super().open()
+        connection, self.connection = self.connection, None
+        if connection is None:
+            raise smtplib.SMTPConnectError(-1, 'Не удалось подключиться к SMTP-серверу')
+        return connection
+
+    def open(self):
+        if self.connection:
+            return False
+        self.connection = self.pool.acquire(self._connect)
+        return True
+
+    def close(self):
+        if self.connection is not None:
+            self.pool.release(self.connection)
+            self.connection = None
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        if self.batcher.window:
+            slot = self.batcher.submit(self._deliver, list(email_messages))
+        else:
+            slot = {'messages': list(email_messages), 'sent': 0, 'error': None}
+            self._deliver([slot])
+        if slot['error'] is not None and not self.fail_silently:
+            raise slot['error']
+        return slot['sent']
+
+    def _deliver(self, batch: list):
+        """ Отправить письма всех частей пакета через одно соединение из пула """
+        with self._lock:
+            try:
+                self.open()
+            except Exception as e:
+                for slot in batch:
+                    slot['error'] = e
+                    self.pool.count('failed', len(slot['messages']))
+                return
+            try:
+                for slot in batch:
+                    for message in slot['messages']:
+                        started = time.perf_counter()
+                        try:
+                            if self._send_with_reconnect(message):
+                                slot['sent'] += 1
+                                self.pool.count('sent')
+                        except Exception as e:
+                            slot['error'] = slot['error'] or e
+                            self.pool.count('failed')
+                        self.pool.record_latency(time.perf_counter() - started)
+            finally:
+                if self.connection is not None:
+                    self.close()
+
+    def _send_with_reconnect(self, message) -> bool:
+        fail_silently, self.fail_silently = self.fail_silently, False
+        try:
+            try:
+                return self._send(message)
+            except DISCONNECT_ERRORS:
+                self.pool.discard(self.connection)
+                self.connection = None
+                self.connection = self._connect()
+                self.pool.count('reconnects')
+                return self._send(message)
+        finally:
+            self.fail_silently = fail_silently
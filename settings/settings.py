@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'Account',
     'Room',
@@ -88,7 +89,19 @@ DATABASES = {
         'PASSWORD': config.DB_PASSWORD,
         'HOST': config.DB_HOST,
         'PORT': config.DB_PORT,
+        # Полнотекстовый поиск по отзывам (Room.Review.search_vector) требует базу в UTF8
+        'TEST': {'CHARSET': 'UTF8', 'TEMPLATE': 'template0'},
+    }
+}
 
+# Версии и результаты кэшей поиска, страниц комнат и справочников должны быть общими для всех воркеров
+# и Celery, поэтому в продакшене кэш - Redis (тот же сервер, что у брокера Celery), при разработке - в памяти
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    } if DEBUG else {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
     }
 }
 
@@ -117,7 +130,15 @@ EMAIL_HOST_PASSWORD = config.EMAIL_HOST_PASSWORD
 EMAIL_HOST = config.EMAIL_HOST
 EMAIL_USE_TLS = config.EMAIL_USE_TLS
 EMAIL_PORT = config.EMAIL_PORT
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# В продакшене письма отправляются через пул SMTP-соединений процесса, при разработке - в консоль
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend' if DEBUG \
+    else 'settings.email_backends.PooledEmailBackend'
+# Свободных соединений в пуле и сколько секунд их держать открытыми
+EMAIL_POOL_SIZE = 4
+EMAIL_POOL_IDLE_TIMEOUT = 60
+# Письма разных потоков за это время (секунды) уходят в одной SMTP-сессии, 0 - отправлять сразу.
+# Первый поток окна всегда ждет его целиком, поэтому окно имеет смысл только при множестве одновременных отправок
+EMAIL_BATCH_WINDOW = 0
 
 PASSWORD_RESET_TIMEOUT_DAYS = 2
 ACCOUNT_ACTIVATION_DAYS = 2
@@ -132,6 +153,56 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# ----- ДОСТУПНОСТЬ КОМНАТ -----
+# Локальный для процесса индекс занятости (Room.availability_index). Для согласованности между воркерами
+# версия индекса хранится в общем кэше (CACHES)
+ROOM_AVAILABILITY_INDEX = False
+# Результаты поиска свободных комнат (pk) кэшируются по запросу и версии занятости, 0 - не кэшировать
+ROOM_SEARCH_CACHE_TIMEOUT = 60 * 5
+ROOM_SEARCH_LOCK_TIMEOUT = 10
+# Сколько секунд комната удерживается за клиентом между страницей бронирования и оплатой
+ROOM_BOOKING_HOLD_TTL = 60 * 10
+
+# ----- СТРАНИЦА КОМНАТЫ -----
+# Фрагменты страницы комнаты (карточка, отзывы, правила) кэшируются по версии комнаты и справочников,
+# версии меняются сигналами Room.signals. Время жизни фрагментов (секунды), 0 - не кэшировать
+ROOM_DETAIL_CACHE_TIMEOUT = 60 * 60
+
+# ----- СПРАВОЧНИКИ -----
+# Отели, типы комнат и правила (Room.reference) хранятся в LRU-кэше процесса (записей) и в общем кэше (секунды).
+# Версия справочников меняется сигналами Room.signals, процессы проверяют ее не чаще раза в интервал (секунды)
+REFERENCE_CACHE_SIZE = 512
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+REFERENCE_VERSION_CHECK_INTERVAL = 1
+
+# ----- ОЧЕРЕДЬ ПИСЕМ -----
+# Письма о бронях пишутся в Room.OutboxMessage и отправляются задачей Room.tasks.send_outbox
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 10
+# Задержка перед повторной отправкой (секунды), удваивается с каждой попыткой
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_MAX_RETRY_DELAY = 60 * 60
+
+# ----- РЕКЛАМНАЯ РАССЫЛКА -----
+# Писем в одной задаче Account.tasks.send_promotion_chunk (одно SMTP-соединение на пачку)
+PROMOTION_CHUNK_SIZE = 500
+# Не больше писем в секунду, 0 - без ограничения
+PROMOTION_RATE_LIMIT = 50
+PROMOTION_RETRY_DELAY = 60
+
+# ----- API -----
+# Токены (Account.tokens) проверяются HMAC и одним запросом по ключу, Basic-аутентификация оставлена для старых клиентов:
+# она хеширует пароль (PBKDF2) на каждом запросе
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'Account.api.authentication.BearerTokenAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+}
+# Срок действия токена API (секунды)
+API_TOKEN_TTL = 60 * 60 * 24 * 30
+
 # ----- CELERY -----
 CELERY_TIMEZONE = "Europe/Moscow"
 CELERY_TASK_TRACK_STARTED = True
@@ -24,6 +24,7 @@ urlpatterns = [
     path('', include('Account.urls')),
     path('', include('Room.urls')),
     path('api/', include('Room.api.urls')),
+    path('api/', include('Account.api.urls')),
 
 ]
 if settings.DEBUG: